@@ -0,0 +1,227 @@
+"""Band assets of scene records.
+
+`expand` turns a search record into the S3 objects of its bands and `download`
+fetches them with parallel byte-range GETs, many objects at once. Ranges are
+written in place in a `.part` file and checkpointed in a `.parts` file, so an
+interrupted download only fetches the missing ranges. Both files are only open
+while a range is written, the open files are bounded by the concurrency.
+Completed files are checked against their size and (single part uploads)
+their MD5 ETag.
+"""
+
+import os
+import hashlib
+import threading
+from concurrent import futures
+
+from aws_sat_api import aws, search
+
+landsat_bands = [
+    'B1', 'B2', 'B3', 'B4', 'B5', 'B6', 'B7', 'B8', 'B9', 'B10', 'B11', 'BQA']
+sentinel2_bands = [
+    'B01', 'B02', 'B03', 'B04', 'B05', 'B06', 'B07', 'B08', 'B8A', 'B09', 'B10', 'B11',
+    'B12']
+# L2A products sit in a directory per resolution (R10m, R20m, R60m), the bands are
+# read at their native resolution. There is no cirrus band (B10) in L2A.
+sentinel2_l2a_resolutions = {
+    'B01': 60, 'B02': 10, 'B03': 10, 'B04': 10, 'B05': 20, 'B06': 20, 'B07': 20,
+    'B08': 10, 'B8A': 20, 'B09': 60, 'B11': 20, 'B12': 20, 'AOT': 10, 'SCL': 20,
+    'TCI': 10, 'WVP': 10}
+cbers_bands = {
+    'MUX': [5, 6, 7, 8], 'AWFI': [13, 14, 15, 16], 'PAN5M': [1], 'PAN10M': [2, 3, 4]}
+cbers_bucket = 'cbers-pds'
+
+part_size = 8 * 1024 * 1024
+chunk_size = 1024 * 1024
+
+
+def _sentinel2_assets(path, bands, level):
+    """Return the (band, bucket, key, request_pays) of a Sentinel 2 scene level."""
+    bucket = f'{search.sentinel_bucket}-{level}'
+    names = bands or sentinel2_bands
+    if level == 'l1c':
+        return [(band, bucket, f'{path}{band}.jp2', True) for band in names]
+
+    return [
+        (band, bucket, f'{path}R{sentinel2_l2a_resolutions[band]}m/{band}.jp2', True)
+        for band in names if band in sentinel2_l2a_resolutions]
+
+
+def expand(record, bands=None, level='l1c'):
+    """Return the band objects of a scene record.
+
+    Sentinel 2 bands not produced at a level (B10 in L2A) are skipped.
+
+    :param record: Landsat-8, Sentinel-2 (`path` key) or CBERS record.
+    :param bands: Bands to keep (e.g ['B4', 'B5'] or [6, 7] for CBERS), default all.
+    :param level: Sentinel 2 processing level of the record, joint records
+        (`levels`) are expanded for each of their levels.
+    :returns: List of dicts (scene_id, band, bucket, key, request_pays).
+    """
+    if 'utm_zone' in record:
+        levels = list(record['levels']) if 'levels' in record else [level]
+        assets = [
+            asset for name in levels
+            for asset in _sentinel2_assets(record['path'], bands, name)]
+    elif record.get('satellite') == 'CBERS':
+        names = bands or cbers_bands[record['sensor']]
+        key = f"{record['key']}/{record['scene_id']}"
+        assets = [
+            (int(band), cbers_bucket, f'{key}_BAND{int(band)}.tif', False)
+            for band in names]
+    else:
+        names = bands or landsat_bands
+        assets = [
+            (band, search.landsat_bucket, f"{record['key']}_{band}.TIF", False)
+            for band in names]
+
+    return [
+        {'scene_id': record['scene_id'], 'band': band, 'bucket': bucket, 'key': key,
+         'request_pays': request_pays}
+        for band, bucket, key, request_pays in assets]
+
+
+def _ranges(size, part_size):
+    starts = range(0, size, part_size)
+    return [(start, min(start + part_size, size) - 1) for start in starts]
+
+
+def _read_parts(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(int(line) for line in f if line.strip())
+
+
+def _md5(path):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class _Download(object):
+    """State of one object download (part file, checkpoint and remaining ranges)."""
+
+    def __init__(self, asset, path, info, part_size):
+        self.asset = asset
+        self.path = path
+        self.info = info
+        self.ranges = _ranges(info['size'], part_size)
+        self.done = _read_parts(f'{path}.parts')
+        self.remaining = len(self.ranges) - len(self.done)
+        self.error = None
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        mode = 'r+b' if os.path.exists(f'{path}.part') else 'w+b'
+        with open(f'{path}.part', mode) as f, open(f'{path}.parts', 'a'):
+            f.truncate(info['size'])
+
+    def fetch(self, index):
+        """Stream a range to its offset in the part file."""
+        start, end = self.ranges[index]
+        body = aws.get_object_range(
+            self.asset['bucket'], self.asset['key'], start, end,
+            request_pays=self.asset['request_pays'])
+
+        offset = start
+        with open(f'{self.path}.part', 'r+b') as f:
+            for chunk in body.iter_chunks(chunk_size):
+                os.pwrite(f.fileno(), chunk, offset)
+                offset += len(chunk)
+        if offset != end + 1:
+            raise IOError(f"Incomplete range {start}-{end} of {self.asset['key']}")
+
+        with self.lock:
+            with open(f'{self.path}.parts', 'a') as checkpoint:
+                checkpoint.write(f'{index}\n')
+            self.remaining -= 1
+            return self.remaining == 0
+
+    def fail(self, err):
+        """Record a failed range, return True once no range is left."""
+        with self.lock:
+            self.error = self.error or f'{type(err).__name__}: {err}'
+            self.remaining -= 1
+            return self.remaining == 0
+
+    def finish(self):
+        """Verify the part file and move it in place."""
+        if self.error is not None:
+            return dict(self.asset, path=self.path, status='error', error=self.error)
+
+        size = os.path.getsize(f'{self.path}.part')
+        etag = self.info['etag']
+        # Multipart ETags are not a MD5 of the content, only the size is checked.
+        corrupted = size != self.info['size'] or (
+            '-' not in etag and _md5(f'{self.path}.part') != etag)
+        if corrupted:
+            # Corrupted: start over on the next run.
+            os.remove(f'{self.path}.part')
+            os.remove(f'{self.path}.parts')
+            return dict(
+                self.asset, path=self.path, status='error', error='Checksum mismatch')
+
+        os.replace(f'{self.path}.part', self.path)
+        os.remove(f'{self.path}.parts')
+        return dict(self.asset, path=self.path, status='downloaded', size=size)
+
+
+def _start(asset, head, outdir, part_size):
+    """Return the result of an asset already complete (or failed).
+
+    Otherwise return its `_Download`.
+    """
+    path = os.path.join(outdir, asset['key'])
+    try:
+        info = head.result()
+    except Exception as err:
+        error = f'{type(err).__name__}: {err}'
+        return dict(asset, path=path, status='error', error=error)
+
+    if os.path.exists(path) and os.path.getsize(path) == info['size']:
+        return dict(asset, path=path, status='skipped', size=info['size'])
+
+    state = _Download(asset, path, info, part_size)
+    return state if state.remaining else state.finish()
+
+
+def download(assets, outdir, concurrency=16, part_size=part_size):
+    """Download assets (see `expand`) with parallel byte-range GETs.
+
+    Files are written to `outdir`/`key`; existing complete files are skipped and
+    partial ones resumed.
+
+    :param assets: Asset dicts.
+    :param outdir: Output directory.
+    :param concurrency: Number of concurrent range requests (over all objects).
+    :param part_size: Range size in bytes.
+    :returns: Generator of asset dicts with `path`, `status` ('downloaded',
+        'skipped' or 'error') and `size` or `error`, as objects complete.
+    """
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        heads = {}
+        for asset in assets:
+            heads[executor.submit(aws.head_object, asset['bucket'], asset['key'],
+                                  request_pays=asset['request_pays'])] = asset
+
+        jobs = {}
+        for head in futures.as_completed(heads):
+            state = _start(heads[head], head, outdir, part_size)
+            if isinstance(state, dict):
+                yield state
+                continue
+            for index in range(len(state.ranges)):
+                if index not in state.done:
+                    jobs[executor.submit(state.fetch, index)] = state
+
+        for job in futures.as_completed(jobs):
+            state = jobs[job]
+            try:
+                complete = job.result()
+            except Exception as err:
+                complete = state.fail(err)
+            if complete:
+                yield state.finish()
@@ -1,17 +1,229 @@
 """AWS S3 functions."""
 
 import os
+import threading
+import contextvars
+from functools import lru_cache, partial
+from contextlib import contextmanager
 
 from boto3.session import Session as boto3_session
+from botocore import UNSIGNED
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from aws_sat_api import tracing, unsigned
+from aws_sat_api.cache import backend_errors
 
 region = os.environ.get('AWS_REGION', 'us-east-1')
+max_pool_connections = int(os.environ.get('MAX_POOL_CONNECTIONS', 50))
+
+# Prefixes known to be empty are not listed again (e.g `cache.NegativeCache()`).
+negative_cache = None
+
+# Listings (for `listing_cache_ttl` seconds) and objects (scene metadata never
+# change) are read from this cache backend first (e.g `cache.MemoryCache()`).
+cache = None
+listing_cache_ttl = int(os.environ.get('LISTING_CACHE_TTL', 3600))
+
+# Cache lookups batched by `prefetch`, misses are recorded as `_missing`.
+_prefetched = {}
+_prefetch_lock = threading.Lock()
+_missing = object()
+
+# Requests wait for this rate limiter (e.g `throttle.RateLimiter(100)`).
+rate_limiter = None
+
+# Slow requests are duplicated after an adaptive delay (e.g `hedge.Hedger()`).
+hedger = None
+
+# Requests are counted against this budget (e.g `throttle.RequestBudget(1000)`)
+# and fail with `errors.RequestBudgetExceeded` once it is used up.
+request_budget = None
+# Budget of the current search (see `search_budget`), replaces `request_budget`.
+_search_budget = contextvars.ContextVar('search_budget', default=None)
+
+
+@lru_cache(maxsize=None)
+def region_client(region_name, anonymous=False):
+    """Return a pooled S3 client for a region.
+
+    Clients are thread safe and cached, so every thread working against the same
+    region shares one connection pool. Anonymous clients send unsigned requests.
+    """
+    session = boto3_session(region_name=region_name)
+    config = Config(
+        max_pool_connections=max_pool_connections,
+        signature_version=UNSIGNED if anonymous else None)
+    return session.client('s3', config=config)
+
+
+@lru_cache(maxsize=None)
+def get_bucket_region(bucket):
+    """Return the region hosting a bucket.
+
+    S3 sends the `x-amz-bucket-region` header with every HEAD bucket response
+    (even 301 and 403 errors), so the region is discovered with a single unsigned
+    request (no credentials needed, see `unsigned`) and cached for the life of
+    the process.
+    """
+    s3 = region_client(region, anonymous=True)
+    try:
+        response = s3.head_bucket(Bucket=bucket)
+    except ClientError as e:
+        response = e.response
+
+    headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+    return headers.get('x-amz-bucket-region', region)
+
+
+def get_client(bucket):
+    """Return an S3 client matching the bucket region."""
+    return region_client(get_bucket_region(bucket))
+
+
+def listing_key(bucket, prefix):
+    """Return the cache key of a listing."""
+    return f'list:{bucket}/{prefix}'
+
+
+def object_key(bucket, key):
+    """Return the cache key of an object."""
+    return f'get:{bucket}/{key}'
+
+
+@contextmanager
+def prefetch(keys):
+    """Look up cache keys in one batch (`get_many`) for the enclosed requests.
+
+    Within the block, `list_directory` and `get_object` read those keys from the
+    batch instead of sending one cache lookup each.
+    """
+    keys = list(keys)
+    if cache is None or not keys:
+        yield
+        return
+
+    try:
+        hits = cache.get_many(keys)
+    except backend_errors:
+        hits = {}
+    batch = {key: hits.get(key, _missing) for key in keys}
+    with _prefetch_lock:
+        _prefetched.update(batch)
+    try:
+        yield
+    finally:
+        with _prefetch_lock:
+            for key in batch:
+                _prefetched.pop(key, None)
+
+
+def _cache_get(key):
+    """Return a cached value (None if missing or unreachable).
+
+    The prefetched batch is read first.
+    """
+    value = _prefetched.get(key)
+    if value is _missing:
+        return None
+    if value is not None:
+        return value
+    try:
+        return cache.get(key)
+    except backend_errors:
+        return None
+
+
+def _cache_set(key, value, ttl=None):
+    """Cache a value, ignoring backend outages."""
+    try:
+        cache.set(key, value, ttl=ttl)
+    except backend_errors:
+        pass
+
+
+def list_directory(bucket, prefix, s3=None, request_pays=False, anonymous=False):
+    """AWS s3 list directory.
 
+    Set `anonymous=True` to send unsigned requests (public buckets only).
+    Requests are hedged when `hedger` is set and listings are cached in `cache`.
+    """
+    with tracing.span('s3.list', bucket=bucket, prefix=prefix) as span:
+        if negative_cache is not None and negative_cache.is_empty(bucket, prefix):
+            if span is not None:
+                span['negative_cache'] = True
+            return []
+
+        cache_key = listing_key(bucket, prefix)
+        if cache is not None:
+            directories = _cache_get(cache_key)
+            if directories is not None:
+                if span is not None:
+                    span['cache'] = True
+                return directories
+
+        request = partial(
+            _list_directory, bucket, prefix, s3=s3, request_pays=request_pays,
+            anonymous=anonymous, span=span)
+        if hedger is None:
+            directories = request()
+        else:
+            directories = hedger.call('s3.list', request, span=span)
+        if not directories and negative_cache is not None:
+            negative_cache.add(bucket, prefix)
+        if cache is not None:
+            _cache_set(cache_key, directories, ttl=listing_cache_ttl)
+
+        return directories
+
+
+def current_budget():
+    """Return the request budget of the current search, else `request_budget`."""
+    budget = _search_budget.get()
+    return budget if budget is not None else request_budget
+
+
+@contextmanager
+def search_budget(budget):
+    """Count the requests of the current context against `budget`.
+
+    The budget follows the calls submitted with `contextvars.copy_context()`
+    (e.g the search thread pools), so concurrent searches can have their own.
+    """
+    token = _search_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _search_budget.reset(token)
+
+
+def _throttle():
+    """Take a request from the budget and wait for the rate limiter."""
+    budget = current_budget()
+    if budget is not None:
+        budget.acquire()
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+
+
+def _retries(response):
+    """Return the number of retries botocore needed for a response."""
+    return response.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+
+
+def _list_directory(bucket, prefix, s3=None, request_pays=False, anonymous=False,
+                    span=None):
+    """List directory request."""
+    _throttle()
+
+    if anonymous:
+        if request_pays:
+            raise ValueError(
+                'Anonymous requests are not allowed on requester-pays buckets.')
+        return unsigned.list_directory(bucket, prefix, get_bucket_region(bucket))
 
-def list_directory(bucket, prefix, s3=None, request_pays=False):
-    """AWS s3 list directory."""
     if not s3:
-        session = boto3_session(region_name=region)
-        s3 = session.client('s3')
+        s3 = get_client(bucket)
 
     pag = s3.get_paginator('list_objects_v2')
 
@@ -25,17 +237,54 @@ def list_directory(bucket, prefix, s3=None, request_pays=False):
 
     directories = []
     for subset in pag.paginate(**params):
+        if span is not None:
+            span['retries'] = span.get('retries', 0) + _retries(subset)
         if 'CommonPrefixes' in subset.keys():
             directories.extend(subset.get('CommonPrefixes'))
 
     return [r['Prefix'] for r in directories]
 
 
-def get_object(bucket, key, s3=None, request_pays=False):
-    """AWS s3 get object content."""
+def get_object(bucket, key, s3=None, request_pays=False, anonymous=False):
+    """AWS s3 get object content.
+
+    Set `anonymous=True` to send unsigned requests (public buckets only).
+    Requests are hedged when `hedger` is set and objects are cached in `cache`.
+    """
+    with tracing.span('s3.get', bucket=bucket, key=key) as span:
+        cache_key = object_key(bucket, key)
+        if cache is not None:
+            content = _cache_get(cache_key)
+            if content is not None:
+                if span is not None:
+                    span['cache'] = True
+                return content
+
+        request = partial(
+            _get_object, bucket, key, s3=s3, request_pays=request_pays,
+            anonymous=anonymous, span=span)
+        if hedger is None:
+            content = request()
+        else:
+            content = hedger.call('s3.get', request, span=span)
+        if cache is not None:
+            _cache_set(cache_key, content)
+
+        return content
+
+
+def _get_object(bucket, key, s3=None, request_pays=False, anonymous=False, span=None):
+    """Get object request."""
+    _throttle()
+
+    if anonymous:
+        if request_pays:
+            raise ValueError(
+                'Anonymous requests are not allowed on requester-pays buckets.')
+        return unsigned.get_object(bucket, key, get_bucket_region(bucket))
+
     if not s3:
-        session = boto3_session(region_name=region)
-        s3 = session.client('s3')
+        s3 = get_client(bucket)
 
     params = {
         'Bucket': bucket,
@@ -45,4 +294,34 @@ def get_object(bucket, key, s3=None, request_pays=False):
         params['RequestPayer'] = 'requester'
 
     response = s3.get_object(**params)
+    if span is not None:
+        span['retries'] = _retries(response)
     return response['Body'].read()
+
+
+def head_object(bucket, key, request_pays=False):
+    """Return an object size and ETag."""
+    with tracing.span('s3.head', bucket=bucket, key=key):
+        _throttle()
+
+        params = {'Bucket': bucket, 'Key': key}
+        if request_pays:
+            params['RequestPayer'] = 'requester'
+
+        response = get_client(bucket).head_object(**params)
+        return {'size': response['ContentLength'], 'etag': response['ETag'].strip('"')}
+
+
+def get_object_range(bucket, key, start, end, request_pays=False):
+    """Return a stream of the object bytes between start and end (inclusive)."""
+    with tracing.span('s3.get', bucket=bucket, key=key, range=f'{start}-{end}') as span:
+        _throttle()
+
+        params = {'Bucket': bucket, 'Key': key, 'Range': f'bytes={start}-{end}'}
+        if request_pays:
+            params['RequestPayer'] = 'requester'
+
+        response = get_client(bucket).get_object(**params)
+        if span is not None:
+            span['retries'] = _retries(response)
+        return response['Body']
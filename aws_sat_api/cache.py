@@ -0,0 +1,463 @@
+"""Cache backends."""
+
+import os
+import re
+import json
+import math
+import time
+import queue
+import shutil
+import socket
+import struct
+import hashlib
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+from aws_sat_api.errors import RedisError
+
+# Errors of an unreachable or failing backend (e.g Redis down, disk full). The
+# shared backends treat them as misses on reads and ignore them on writes, so
+# an outage slows searches down instead of failing them.
+backend_errors = (OSError, RedisError)
+
+
+class CacheBackend(object):
+    """Key/value cache interface.
+
+    Values are JSON serializable objects or bytes (S3 objects). Backends
+    override `get_many`/`set_many` when they can batch lookups in one round-trip.
+    """
+
+    def get(self, key, default=None):
+        """Return the value for key if present and not expired."""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        """Set value for key, optionally expiring after `ttl` seconds."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove key from the cache."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove all keys from the cache."""
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """Return a dict of the keys found in the cache."""
+        values = {key: self.get(key) for key in keys}
+        return {key: value for key, value in values.items() if value is not None}
+
+    def set_many(self, items, ttl=None):
+        """Set several (key, value) items."""
+        for key, value in dict(items).items():
+            self.set(key, value, ttl=ttl)
+
+
+def _dumps(value):
+    """Serialize a value, bytes are stored as is."""
+    if isinstance(value, bytes):
+        return b'b' + value
+    return b'j' + json.dumps(value).encode('utf-8')
+
+
+def _loads(data):
+    """Deserialize a value written by `_dumps`."""
+    if data[:1] == b'b':
+        return bytes(data[1:])
+    return json.loads(data[1:].decode('utf-8'))
+
+
+class MemoryCache(CacheBackend):
+    """Thread safe in-memory key/value cache.
+
+    Values are kept as is, not serialized. Store JSON serializable objects or
+    bytes (S3 objects), as the other backends only accept those.
+    """
+
+    def __init__(self):
+        """Initialize empty cache."""
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        value, expires = item
+        if expires is not None and expires < now:
+            del self._data[key]
+            return None
+
+        return value
+
+    def get(self, key, default=None):
+        """Return the value for key if present and not expired."""
+        with self._lock:
+            value = self._get(key, time.time())
+        return default if value is None else value
+
+    def get_many(self, keys):
+        """Return a dict of the keys found in the cache."""
+        now = time.time()
+        with self._lock:
+            values = {key: self._get(key, now) for key in keys}
+        return {key: value for key, value in values.items() if value is not None}
+
+    def set(self, key, value, ttl=None):
+        """Set value for key, optionally expiring after `ttl` seconds."""
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+
+    def delete(self, key):
+        """Remove key from the cache."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all keys from the cache."""
+        with self._lock:
+            self._data.clear()
+
+
+class DiskCache(CacheBackend):
+    """Local directory cache, shared by the processes of a host.
+
+    Each key is stored in its own file (expiry header and serialized value),
+    written to a temporary file and renamed, so readers never see partial values.
+    """
+
+    def __init__(self, directory):
+        """Initialize cache in directory."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name[:2], name)
+
+    def get(self, key, default=None):
+        """Return the value for key if present and not expired."""
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            expires, = struct.unpack('<d', data[:8])
+            if expires and expires < time.time():
+                self.delete(key)
+                return default
+            return _loads(data[8:])
+        except (struct.error, ValueError) + backend_errors:
+            # Missing, unreadable or truncated file.
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Set value for key, optionally expiring after `ttl` seconds."""
+        path = self._path(key)
+        expires = time.time() + ttl if ttl is not None else 0
+        tmp = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(struct.pack('<d', expires) + _dumps(value))
+            os.replace(tmp, path)
+        except backend_errors:
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def delete(self, key):
+        """Remove key from the cache."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Remove all keys from the cache."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+
+class RedisCache(CacheBackend):
+    """Redis cache, shared by every process and host using the same server.
+
+    Speaks the Redis protocol (RESP) over pooled sockets, without client
+    dependency. `get_many` is a single MGET and `set_many` a pipeline, so a
+    search checks all its keys in one round-trip.
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0, prefix='awssat:', timeout=5):
+        """Initialize cache."""
+        self.host = host
+        self.port = port
+        self.db = db
+        self.prefix = prefix
+        self.timeout = timeout
+        self._connections = queue.LifoQueue()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        conn = (sock, sock.makefile('rb'))
+        if self.db:
+            self._send(conn, [('SELECT', self.db)])
+        return conn
+
+    @staticmethod
+    def _encode(command):
+        args = [a if isinstance(a, bytes) else str(a).encode('utf-8') for a in command]
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    @classmethod
+    def _read(cls, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by the server')
+
+        kind, value = line[:1], line[1:-2]
+        if kind == b'+':
+            return value.decode('utf-8')
+        if kind == b'-':
+            return RedisError(value.decode('utf-8'))
+        if kind == b':':
+            return int(value)
+        if kind == b'$':
+            size = int(value)
+            if size < 0:
+                return None
+            return reader.read(size + 2)[:-2]
+        if kind == b'*':
+            size = int(value)
+            if size < 0:
+                return None
+            return [cls._read(reader) for _ in range(size)]
+        raise RedisError(f'Invalid reply: {line!r}')
+
+    def _send(self, conn, commands):
+        sock, reader = conn
+        sock.sendall(b''.join(self._encode(c) for c in commands))
+        replies = [self._read(reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def execute(self, *commands):
+        """Send commands in one round-trip (pipeline) and return their replies."""
+        try:
+            conn = self._connections.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        try:
+            return self._send(conn, commands)
+        except OSError:
+            conn[0].close()
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._connections.put(conn)
+
+    def get(self, key, default=None):
+        """Return the value for key if present and not expired.
+
+        The default is returned if the server is unreachable.
+        """
+        try:
+            data, = self.execute(('GET', self.prefix + key))
+        except backend_errors:
+            return default
+        return default if data is None else _loads(data)
+
+    def get_many(self, keys):
+        """Return a dict of the keys found in the cache (one MGET)."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values, = self.execute(['MGET'] + [self.prefix + key for key in keys])
+        except backend_errors:
+            return {}
+        return {
+            key: _loads(data) for key, data in zip(keys, values) if data is not None}
+
+    @staticmethod
+    def _set(key, value, ttl):
+        if ttl is not None and ttl <= 0:
+            # Already expired (Redis rejects non-positive expiries).
+            return ['DEL', key]
+        command = ['SET', key, _dumps(value)]
+        if ttl is not None:
+            command += ['PX', max(1, int(ttl * 1000))]
+        return command
+
+    def set(self, key, value, ttl=None):
+        """Set value for key, optionally expiring after `ttl` seconds.
+
+        Nothing is written if the server is unreachable.
+        """
+        self.set_many([(key, value)], ttl=ttl)
+
+    def set_many(self, items, ttl=None):
+        """Set several (key, value) items in one pipeline."""
+        commands = [
+            self._set(self.prefix + key, value, ttl)
+            for key, value in dict(items).items()]
+        if not commands:
+            return
+        try:
+            self.execute(*commands)
+        except backend_errors:
+            pass
+
+    def delete(self, key):
+        """Remove key from the cache (no-op if unreachable)."""
+        try:
+            self.execute(('DEL', self.prefix + key))
+        except backend_errors:
+            pass
+
+    def clear(self):
+        """Remove all the keys with the cache prefix (stops if unreachable)."""
+        cursor = '0'
+        try:
+            while True:
+                (cursor, keys), = self.execute(
+                    ('SCAN', cursor, 'MATCH', self.prefix + '*', 'COUNT', 1000))
+                if keys:
+                    self.execute(['DEL'] + keys)
+                cursor = cursor.decode('utf-8') if isinstance(cursor, bytes) else cursor
+                if cursor == '0':
+                    break
+        except backend_errors:
+            pass
+
+
+def from_url(url):
+    """Return a cache backend from its url.
+
+    'memory://', 'file:///path/to/dir' or 'redis://host:port/db'.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == 'memory':
+        return MemoryCache()
+    if parsed.scheme == 'file':
+        return DiskCache(parsed.netloc + parsed.path)
+    if parsed.scheme == 'redis':
+        db = int(parsed.path.strip('/') or 0)
+        return RedisCache(parsed.hostname or 'localhost', parsed.port or 6379, db=db)
+    raise ValueError(f'Unsupported cache url: {url}')
+
+
+# Year, month and day of dated prefixes (e.g Sentinel-2 'tiles/22/K/HV/2017/7/').
+_date_prefix = re.compile(r'/(\d{4})/(?:(\d{1,2})/)?(?:(\d{1,2})/)?$')
+
+
+def _prefix_end(prefix):
+    """Return the last day covered by a dated prefix (None if not dated)."""
+    match = _date_prefix.search(prefix)
+    if match is None:
+        return None
+    year, month, day = (int(x) if x else None for x in match.groups())
+    if day is not None:
+        return date(year, month, day)
+    if month is not None:
+        return date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return date(year, 12, 31)
+
+
+class NegativeCache(object):
+    """Record S3 prefixes known to be empty, for `ttl` seconds.
+
+    Dated prefixes (year, month or day) ending less than `recent_days` ago can
+    still receive new acquisitions, they are only kept for `recent_ttl` seconds.
+    """
+
+    def __init__(self, ttl=86400, backend=None, recent_ttl=300, recent_days=7):
+        """Initialize negative cache."""
+        self.ttl = ttl
+        self.recent_ttl = recent_ttl
+        self.recent_days = recent_days
+        self.backend = backend if backend is not None else MemoryCache()
+
+    @staticmethod
+    def _key(bucket, prefix):
+        return f'empty:{bucket}/{prefix}'
+
+    def _ttl(self, prefix):
+        end = _prefix_end(prefix)
+        recent = datetime.now(timezone.utc).date() - timedelta(days=self.recent_days)
+        if end is not None and end >= recent:
+            return min(self.ttl, self.recent_ttl)
+        return self.ttl
+
+    def is_empty(self, bucket, prefix):
+        """Check if a prefix is known to be empty."""
+        return self.backend.get(self._key(bucket, prefix), False)
+
+    def add(self, bucket, prefix):
+        """Record an empty prefix."""
+        self.backend.set(self._key(bucket, prefix), True, ttl=self._ttl(prefix))
+
+
+class BloomFilter(object):
+    """Bloom filter of strings (e.g the tiles and path/rows with data).
+
+    Items are hashed once with blake2b and the bit positions are derived by
+    double hashing.
+    """
+
+    def __init__(self, size, num_hashes, bits=None):
+        """Initialize filter of `size` bits."""
+        self.size = size
+        self.num_hashes = num_hashes
+        self.bits = bytearray(bits) if bits is not None else bytearray((size + 7) // 8)
+
+    @classmethod
+    def create(cls, items, error_rate=0.01):
+        """Create a filter sized for items with the expected false positive rate."""
+        items = list(items)
+        count = max(len(items), 1)
+        size = max(8, int(math.ceil(-count * math.log(error_rate) / math.log(2) ** 2)))
+        num_hashes = max(1, int(round(size / count * math.log(2))))
+        bloom = cls(size, num_hashes)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.num_hashes))
+
+    def add(self, item):
+        """Add item."""
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        """Check if item may be in the filter (no false negatives)."""
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def save(self, path):
+        """Write filter to file."""
+        with open(path, 'wb') as f:
+            f.write(struct.pack('<QI', self.size, self.num_hashes))
+            f.write(self.bits)
+
+    @classmethod
+    def load(cls, path):
+        """Read filter from file."""
+        with open(path, 'rb') as f:
+            size, num_hashes = struct.unpack('<QI', f.read(12))
+            return cls(size, num_hashes, f.read())
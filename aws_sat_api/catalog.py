@@ -0,0 +1,249 @@
+"""Memory-mapped binary scene catalog.
+
+File layout (little-endian):
+
+- header: magic, version, record count, string table offset and size.
+- records: fixed-width rows sorted by (sensor, tile, level, acquisition date),
+  with the tile, scene id and full JSON record stored as offsets in the string
+  table. The level tells the Sentinel 2 single level (l1c, l2a) and joint
+  records apart, a flag marks the records with metadata (full search).
+- string table: length-prefixed UTF-8 strings.
+
+The file is read through `mmap`, so opening a catalog costs nothing and many
+processes share the same page-cached data.
+"""
+
+import json
+import math
+import mmap
+import struct
+
+from aws_sat_api.cache import BloomFilter
+from aws_sat_api.errors import InvalidCatalog
+
+MAGIC = b'ASAC'
+VERSION = 1
+
+SENSORS = ['landsat', 'sentinel2', 'cbers']
+
+# Row level codes, 0 is used by the Landsat and CBERS records.
+LEVELS = [None, 'l1c', 'l2a', 'joint']
+
+header_struct = struct.Struct('<4sHHIQQ4x')
+record_struct = struct.Struct('<BBBxIIfII')
+length_struct = struct.Struct('<I')
+
+
+def record_key(record):
+    """Return the (sensor, tile) of a search result record."""
+    if 'latitude_band' in record:
+        utm = str(record['utm_zone']).lstrip('0')
+        return 'sentinel2', f"{utm}{record['latitude_band']}{record['grid_square']}"
+
+    if record.get('satellite') == 'CBERS':
+        return 'cbers', f"{record['sensor']}/{record['path']}/{record['row']}"
+
+    return 'landsat', f"{record['path']}/{record['row']}"
+
+
+def record_cloud(record):
+    """Return the cloud coverage of a search result record (None if unknown).
+
+    Joint Sentinel 2 records have it in their level records.
+    """
+    clouds = [r.get('cloud_coverage') for r in _metadata(record)]
+    return next((cloud for cloud in clouds if cloud is not None), None)
+
+
+def _level(sensor, record, level):
+    """Return the row level code of a record."""
+    if sensor != 'sentinel2':
+        return 0
+    if 'levels' in record:
+        return LEVELS.index('joint')
+    return LEVELS.index(level)
+
+
+def _metadata(record):
+    """Return the records holding the metadata (the level records of joint records)."""
+    return list(record['levels'].values()) if 'levels' in record else [record]
+
+
+def _is_complete(record):
+    """Check that neither the record nor its levels have a `status` (error...)."""
+    return all('status' not in r for r in [record] + _metadata(record))
+
+
+def write(path, records, level='l1c'):
+    """Write search result records to a catalog file.
+
+    Records with a `status` (failed, timed out or partial) are skipped.
+
+    :param path: Catalog file path.
+    :param records: Search result records.
+    :param level: Sentinel 2 processing level of the single level records.
+    """
+    if level not in ['l1c', 'l2a']:
+        raise ValueError('Sentinel 2 Level must be "l1c" or "l2a"')
+
+    strings = bytearray()
+    offsets = {}
+
+    def _string(value):
+        if value not in offsets:
+            data = value.encode('utf-8')
+            offsets[value] = len(strings)
+            strings.extend(length_struct.pack(len(data)))
+            strings.extend(data)
+        return offsets[value]
+
+    rows = []
+    for record in records:
+        if not _is_complete(record):
+            continue
+        sensor, tile = record_key(record)
+        metadata = _metadata(record)
+        cloud = record_cloud(record)
+        rows.append((
+            SENSORS.index(sensor),
+            tile,
+            _level(sensor, record, level),
+            int(record['acquisition_date']),
+            all('cloud_coverage' in r for r in metadata),
+            float('nan') if cloud is None else float(cloud),
+            record['scene_id'],
+            json.dumps(record, separators=(',', ':'), sort_keys=True)))
+
+    rows.sort(key=lambda r: (r[0], r[1], r[2], r[3], r[6]))
+
+    body = bytearray()
+    for sensor, tile, code, date, full, cloud, scene_id, doc in rows:
+        body.extend(record_struct.pack(
+            sensor, code, full, _string(tile), date, cloud, _string(scene_id),
+            _string(doc)))
+
+    strings_offset = header_struct.size + len(body)
+    with open(path, 'wb') as f:
+        f.write(header_struct.pack(
+            MAGIC, VERSION, 0, len(rows), strings_offset, len(strings)))
+        f.write(body)
+        f.write(strings)
+
+    return len(rows)
+
+
+class Catalog(object):
+    """Read-only memory-mapped catalog.
+
+    Can be used as a search backend: `search.sentinel2(..., catalog=Catalog(path))`.
+    """
+
+    def __init__(self, path):
+        """Open and map catalog file."""
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = header_struct.unpack_from(self._mm, 0)
+        magic, version, _, count, strings_offset, _ = header
+        if magic != MAGIC or version != VERSION:
+            raise InvalidCatalog(f'{path} is not a valid catalog file')
+
+        self._count = count
+        self._strings_offset = strings_offset
+
+    def __len__(self):
+        """Number of records."""
+        return self._count
+
+    def close(self):
+        """Unmap catalog file."""
+        self._mm.close()
+
+    def _row(self, i):
+        offset = header_struct.size + i * record_struct.size
+        return record_struct.unpack_from(self._mm, offset)
+
+    def _string(self, offset):
+        start = self._strings_offset + offset
+        (length,) = length_struct.unpack_from(self._mm, start)
+        return self._mm[start + 4:start + 4 + length].decode('utf-8')
+
+    def _key(self, i):
+        sensor, code, _, tile, date, _, _, _ = self._row(i)
+        return sensor, self._string(tile), code, date
+
+    def _bisect(self, key, right=False):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k = self._key(mid)
+            if k < key or (right and k == key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def tiles(self):
+        """Return the (sensor, tile) of the catalog records, without duplicates."""
+        tiles = []
+        for i in range(self._count):
+            sensor, tile, _, _ = self._key(i)
+            key = (SENSORS[sensor], tile)
+            if not tiles or tiles[-1] != key:
+                tiles.append(key)
+        return tiles
+
+    def lookup(self, sensor, tile, start=None, end=None, max_cloud=None,
+               level='l1c', levels=None, full=False):
+        """Return the records for a tile, optionally between two YYYYMMDD dates.
+
+        :param sensor: 'landsat', 'sentinel2' or 'cbers'.
+        :param tile: Tile key (e.g '22KHV', '178/119' or 'MUX/217/063').
+        :param start: First acquisition date (YYYYMMDD).
+        :param end: Last acquisition date (YYYYMMDD).
+        :param max_cloud: Maximum cloud coverage.
+        :param level: Sentinel 2 processing level.
+        :param levels: Sentinel 2 processing levels of joint records (overrides
+            `level`), the other levels are removed from the records.
+        :param full: Only return the records with metadata.
+        """
+        code = SENSORS.index(sensor)
+        joint = {'levels': levels} if levels is not None else {}
+        level_code = _level(sensor, joint, level)
+        start = int(start) if start else 0
+        end = int(end) if end else 99999999
+        lo = self._bisect((code, tile, level_code, start))
+        hi = self._bisect((code, tile, level_code, end), right=True)
+
+        results = []
+        for i in range(lo, hi):
+            _, _, has_metadata, _, _, cloud, _, doc = self._row(i)
+            if full and not has_metadata:
+                continue
+            if max_cloud is not None and (math.isnan(cloud) or cloud > max_cloud):
+                continue
+            record = json.loads(self._string(doc))
+            if levels is not None:
+                record['levels'] = {
+                    k: v for k, v in record['levels'].items() if k in levels}
+                if not record['levels']:
+                    continue
+            results.append(record)
+
+        return results
+
+
+def build_tiles_filter(records=(), catalog=None, index=None, error_rate=0.01):
+    """Create the bloom filter of the tiles with data (see `search.tiles_filter`).
+
+    :param records: Search result records (e.g the crawler JSON lines output).
+    :param catalog: `Catalog`.
+    :param index: Landsat `scene_list.SceneList`.
+    :param error_rate: Expected false positive rate.
+    """
+    tiles = set('{}:{}'.format(*record_key(record)) for record in records)
+    if catalog is not None:
+        tiles.update(f'{sensor}:{tile}' for sensor, tile in catalog.tiles())
+    if index is not None:
+        tiles.update(f'landsat:{path}/{row}' for path, row in index.tiles())
+    return BloomFilter.create(sorted(tiles), error_rate=error_rate)
@@ -0,0 +1,163 @@
+"""Resumable full-archive crawler.
+
+The bucket keyspace is split in shards (UTM zones for Sentinel-2, WRS paths for
+Landsat-8) crawled by a process pool, each process using the search thread pools.
+Every shard writes its records to `{shard}.jsonl` and checkpoints each finished
+tile in `{shard}.progress`, so an interrupted crawl resumes where it stopped and
+a new run retries the tiles which failed.
+"""
+
+import os
+import json
+from concurrent import futures
+
+from aws_sat_api import aws, search
+
+sensors = ['landsat', 'sentinel2']
+
+
+def list_shards(sensor):
+    """Return the shards of a sensor keyspace."""
+    if sensor == 'sentinel2':
+        return [f'sentinel2-{zone:02d}' for zone in range(1, 61)]
+    if sensor == 'landsat':
+        return [f'landsat-{path:03d}' for path in range(1, 234)]
+    raise ValueError(f'Invalid sensor: {sensor}')
+
+
+def list_tiles(shard, level='l1c'):
+    """Return the tiles of a shard, as search keyword arguments."""
+    sensor, key = shard.split('-')
+    if sensor == 'sentinel2':
+        bucket = f'{search.sentinel_bucket}-{level}'
+        utm = key.lstrip('0')
+        bands = aws.list_directory(bucket, f'tiles/{utm}/', request_pays=True)
+        tiles = []
+        for band in bands:
+            for grid in aws.list_directory(bucket, band, request_pays=True):
+                _, _, lat, square, _ = grid.split('/')
+                tiles.append(dict(utm=utm, lat=lat, grid=square))
+        return tiles
+
+    # Rows of the collection 1 and of the pre-collection (`L8/`) archives.
+    rows = set()
+    for prefix in [f'c1/L8/{key}/', f'L8/{key}/']:
+        listing = aws.list_directory(search.landsat_bucket, prefix)
+        rows.update(r.strip('/').split('/')[-1] for r in listing)
+    return [dict(path=key, row=row) for row in sorted(rows)]
+
+
+def _tile_key(tile):
+    return '/'.join(str(tile[k]) for k in sorted(tile))
+
+
+def _read_progress(progress_path):
+    """Return the finished tiles and the records file size after the last one."""
+    done = set()
+    offset = 0
+    if os.path.exists(progress_path):
+        with open(progress_path) as f:
+            for line in f:
+                tile, size = line.rstrip('\n').split('\t')
+                done.add(tile)
+                offset = int(size)
+    return done, offset
+
+
+def crawl_shard(shard, outdir, full=True, level='l1c'):
+    """Crawl one shard, resuming from its checkpoint.
+
+    Tiles with scenes whose metadata failed (or timed out) are not written nor
+    checkpointed and the shard is only marked done once every tile succeeded.
+
+    Returns a summary dict (shard, tiles, records, skipped, failed).
+    """
+    records_path = os.path.join(outdir, f'{shard}.jsonl')
+    progress_path = os.path.join(outdir, f'{shard}.progress')
+    done_path = os.path.join(outdir, f'{shard}.done')
+
+    summary = {'shard': shard, 'tiles': 0, 'records': 0, 'skipped': 0, 'failed': 0}
+    if os.path.exists(done_path):
+        with open(done_path) as f:
+            return json.load(f)
+
+    done, offset = _read_progress(progress_path)
+    sensor = shard.split('-')[0]
+
+    with open(records_path, 'ab') as records, open(progress_path, 'a') as progress:
+        # Drop records written after the last checkpoint.
+        records.truncate(offset)
+
+        for tile in list_tiles(shard, level=level):
+            key = _tile_key(tile)
+            if key in done:
+                summary['skipped'] += 1
+                continue
+
+            if sensor == 'sentinel2':
+                scenes = search.sentinel2(**tile, full=full, level=level)
+            else:
+                scenes = search.landsat(**tile, full=full)
+
+            if any('status' in scene for scene in scenes):
+                # Not checkpointed, the tile is crawled again on the next run.
+                summary['failed'] += 1
+                continue
+
+            for scene in scenes:
+                records.write(json.dumps(scene).encode('utf-8') + b'\n')
+                summary['records'] += 1
+            records.flush()
+            os.fsync(records.fileno())
+
+            progress.write(f'{key}\t{records.tell()}\n')
+            progress.flush()
+            summary['tiles'] += 1
+
+    if not summary['failed']:
+        with open(done_path, 'w') as f:
+            json.dump(summary, f)
+
+    return summary
+
+
+def _crawl_shard(shard, outdir, full=True, level='l1c'):
+    """Crawl one shard, returning its error as summary if it fails."""
+    try:
+        return crawl_shard(shard, outdir, full=full, level=level)
+    except Exception as err:
+        return {'shard': shard, 'error': f'{type(err).__name__}: {err}'}
+
+
+def crawl(sensor, outdir, shards=None, processes=None, full=True, level='l1c'):
+    """Crawl a sensor archive into sharded JSON lines files.
+
+    :param sensor: 'landsat' or 'sentinel2'.
+    :param outdir: Output directory (records and checkpoints).
+    :param shards: Shards to crawl (default: all, see `list_shards`).
+    :param processes: Number of processes (default: CPU count), 1 runs in-process.
+    :param full: Full search.
+    :param level: Sentinel 2 processing level.
+    :returns: Generator of shard summaries, as shards complete. A failed shard
+        summary has an `error` and the other shards go on (run again to retry it).
+    """
+    shards = shards or list_shards(sensor)
+    processes = processes or os.cpu_count()
+    os.makedirs(outdir, exist_ok=True)
+
+    if processes <= 1:
+        for shard in shards:
+            yield _crawl_shard(shard, outdir, full=full, level=level)
+        return
+
+    with futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        jobs = {
+            executor.submit(_crawl_shard, shard, outdir, full, level): shard
+            for shard in shards}
+        for job in futures.as_completed(jobs):
+            try:
+                summary = job.result()
+            except Exception as err:
+                # Worker process killed.
+                summary = {'shard': jobs[job], 'error': f'{type(err).__name__}: {err}'}
+            yield summary
@@ -15,3 +15,15 @@ class InvalidSentinelSceneId(SatApiError):
 
 class InvalidCBERSSceneId(SatApiError):
     """Invalid CBERS scene id."""
+
+
+class InvalidCatalog(SatApiError):
+    """Invalid catalog file."""
+
+
+class RedisError(SatApiError):
+    """Redis error reply."""
+
+
+class RequestBudgetExceeded(SatApiError):
+    """S3 request budget used up."""
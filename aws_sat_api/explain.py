@@ -0,0 +1,186 @@
+"""Request estimates.
+
+Return the S3 requests (LIST and GET) a search would send, without sending any.
+Listings found in `aws.cache` or `aws.negative_cache` are used as is, so the
+estimates are exact on a warm cache. Otherwise the number of scenes is derived
+from the archive dates and the revisit time of the sensor.
+
+The query cache (`cache=` option of the searches) is not taken into account,
+estimates are then an upper bound.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from aws_sat_api import aws, search, utils
+
+# Archive start (and end) dates of each listed prefix.
+landsat_archives = {
+    'L8': (date(2013, 4, 11), date(2017, 5, 1)), 'c1/L8': (date(2013, 4, 11), None)}
+sentinel2_archives = {'l1c': date(2015, 6, 27), 'l2a': date(2018, 12, 1)}
+cbers_archive = date(2014, 12, 8)
+
+# Revisit time (days) of a tile.
+landsat_revisit = 16
+sentinel2_revisit = 10
+sentinel2b_revisit = 5
+sentinel2b_start = date(2017, 7, 1)
+cbers_revisit = {'MUX': 26, 'AWFI': 5, 'PAN5M': 52, 'PAN10M': 52}
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def _may_exist(sensor, tile):
+    """Check `search.tiles_filter`, filtered tiles are searched without request."""
+    return search.tiles_filter is None or f'{sensor}:{tile}' in search.tiles_filter
+
+
+def _scenes(start, end, revisit):
+    """Return the number of acquisitions expected between two dates."""
+    days = (end - start).days + 1
+    return -(-days // revisit) if days > 0 else 0
+
+
+def _cached_listing(bucket, prefix):
+    """Return a listing known without request (None otherwise)."""
+    if aws.negative_cache is not None and aws.negative_cache.is_empty(bucket, prefix):
+        return []
+    if aws.cache is not None:
+        return aws.cache.get(aws.listing_key(bucket, prefix))
+    return None
+
+
+def _cached(bucket, key):
+    """Check if an object is in `aws.cache`."""
+    if aws.cache is None:
+        return False
+    return aws.cache.get(aws.object_key(bucket, key)) is not None
+
+
+def _estimate(sensor, tile, requests=0, gets=0, scenes=0, requester_pays=False,
+              exact=False):
+    return {
+        'sensor': sensor, 'tile': tile, 'list': requests, 'get': gets, 'scenes': scenes,
+        'requester_pays': requester_pays, 'exact': exact}
+
+
+def landsat(path, row, full=False, index=None, catalog=None, fields=None):
+    """Estimate the requests of `search.landsat`."""
+    path = utils.zeroPad(path, 3)
+    row = utils.zeroPad(row, 3)
+    tile = f'{path}/{row}'
+    if catalog is not None or not _may_exist('landsat', tile):
+        return _estimate('landsat', tile, exact=True)
+
+    if fields is not None:
+        sources = set(search.plan_fields('landsat', fields, index=index).values())
+        if 'metadata' in sources:
+            full, index = True, None
+        else:
+            full = 'index' in sources
+
+    # Same index use as the search: skipped until loaded, no listing while fresh.
+    index = search._loaded_index(index)
+    if index is not None and index.fresh:
+        scenes = len(index.lookup(path, row, refresh=False))
+        return _estimate('landsat', tile, scenes=scenes, exact=True)
+
+    requests = gets = scenes = 0
+    exact = True
+    for prefix, (start, end) in landsat_archives.items():
+        listing = _cached_listing(search.landsat_bucket, f'{prefix}/{path}/{row}/')
+        if listing is None:
+            requests += 1
+            exact = False
+            count = _scenes(start, end or _today(), landsat_revisit)
+            scenes += count
+            gets += count
+            continue
+
+        scenes += len(listing)
+        for key in listing:
+            scene_id = key.strip('/').split('/')[-1]
+            if not _cached(search.landsat_bucket, f'{key}{scene_id}_MTL.json'):
+                gets += 1
+
+    if index is not None:
+        # Indexed scenes are served without metadata request.
+        gets = max(0, gets - len(index.lookup(path, row, refresh=False)))
+
+    gets = gets if full else 0
+    return _estimate('landsat', tile, requests, gets, scenes, exact=exact)
+
+
+def sentinel2(utm, lat, grid, full=False, level='l1c', levels=None, start_date=None,
+              end_date=None, catalog=None, fields=None):
+    """Estimate the requests of `search.sentinel2`.
+
+    The tiles tree is listed per year, month and day, one request each.
+    """
+    utm = str(utm).lstrip('0')
+    tile = f'{utm}{lat}{grid}'
+    levels = levels or [level]
+    start = (start_date or datetime(2015, 1, 1)).astimezone(timezone.utc).date()
+    end = (end_date or datetime.now(timezone.utc)).astimezone(timezone.utc).date()
+    if catalog is not None or not _may_exist('sentinel2', tile):
+        return _estimate('sentinel2', tile, requester_pays=True, exact=True)
+
+    if fields is not None:
+        full = 'metadata' in search.plan_fields('sentinel2', fields).values()
+
+    requests = scenes = 0
+    for name in levels:
+        first = max(start, sentinel2_archives[name])
+        requests += end.year - start.year + 1
+        if first > end:
+            continue
+
+        months = (end.year - first.year) * 12 + end.month - first.month + 1
+        sentinel2a_end = min(end, sentinel2b_start - timedelta(days=1))
+        count = _scenes(first, sentinel2a_end, sentinel2_revisit) + \
+            _scenes(max(first, sentinel2b_start), end, sentinel2b_revisit)
+        # One listing per month and per acquisition day (holding the versions).
+        requests += months + count
+        scenes += count
+
+    return _estimate(
+        'sentinel2', tile, requests, scenes if full else 0, scenes, requester_pays=True)
+
+
+def cbers(path, row, sensor='MUX', full=False, catalog=None, fields=None):
+    """Estimate the requests of `search.cbers`."""
+    path = utils.zeroPad(path, 3)
+    row = utils.zeroPad(row, 3)
+    tile = f'{sensor}/{path}/{row}'
+    if catalog is not None or not _may_exist('cbers', tile):
+        return _estimate('cbers', tile, exact=True)
+
+    if fields is not None:
+        full = 'metadata' in search.plan_fields('cbers', fields).values()
+
+    prefix = f'CBERS4/{sensor}/{path}/{row}/'
+    listing = _cached_listing(search.cbers_bucket, prefix)
+    if listing is None:
+        scenes = _scenes(cbers_archive, _today(), cbers_revisit[sensor])
+        return _estimate('cbers', tile, 1, scenes if full else 0, scenes)
+
+    band = search.cbers_metadata_band[sensor]
+    gets = 0
+    for key in listing:
+        scene_id = key.strip('/').split('/')[-1]
+        key = f'{prefix}{scene_id}/{scene_id}_BAND{band}.xml'
+        if not _cached(search.cbers_bucket, key):
+            gets += 1
+
+    return _estimate('cbers', tile, 0, gets if full else 0, len(listing), exact=True)
+
+
+def total(estimates):
+    """Sum estimates."""
+    summary = {'list': 0, 'get': 0, 'scenes': 0, 'exact': True}
+    for estimate in estimates:
+        for key in ['list', 'get', 'scenes']:
+            summary[key] += estimate[key]
+        summary['exact'] = summary['exact'] and estimate['exact']
+    return summary
@@ -0,0 +1,259 @@
+"""Geometry functions."""
+
+import re
+import math
+from functools import lru_cache
+
+mgrs_columns = ['ABCDEFGH', 'JKLMNPQR', 'STUVWXYZ']
+mgrs_rows = 'ABCDEFGHJKLMNPQRSTUV'
+mgrs_bands = 'CDEFGHJKLMNPQRSTUVWX'
+
+# Minimum UTM northing of each latitude band, used to find the 2000 km cycle
+# of a 100 km square row letter (from NGA GeoTrans).
+band_min_northing = {
+    'C': 1100000, 'D': 2000000, 'E': 2800000, 'F': 3700000, 'G': 4600000,
+    'H': 5500000, 'J': 6400000, 'K': 7300000, 'L': 8200000, 'M': 9100000,
+    'N': 0, 'P': 800000, 'Q': 1700000, 'R': 2600000, 'S': 3500000,
+    'T': 4400000, 'U': 5300000, 'V': 6200000, 'W': 7000000, 'X': 7900000}
+
+# Sentinel-2 tiles are 109.8 km squares aligned on a 60 m grid.
+s2_tile_size = 109800
+s2_grid_step = 60
+
+
+def mgrs_square_origin(utm, lat, grid):
+    """Return the UTM (easting, northing) of a MGRS 100 km square lower left corner."""
+    utm = int(utm)
+    lat = lat.upper()
+    grid = grid.upper()
+
+    easting = (mgrs_columns[(utm - 1) % 3].index(grid[0]) + 1) * 100000
+
+    row = mgrs_rows.index(grid[1])
+    if utm % 2 == 0:
+        row -= 5
+    northing = (row % 20) * 100000
+    while northing < band_min_northing[lat]:
+        northing += 2000000
+
+    return easting, northing
+
+
+def s2_tile_geometry(utm, lat, grid):
+    """Return the Sentinel-2 tile footprint for a MGRS tile.
+
+    The geometry matches the `tileGeometry` of the tile tileInfo.json documents
+    (UTM coordinates with a CRS definition), so it can be computed without request.
+    """
+    easting, northing = mgrs_square_origin(utm, lat, grid)
+    xmin = float(math.floor(easting / s2_grid_step) * s2_grid_step)
+    ymax = float(math.ceil((northing + 100000) / s2_grid_step) * s2_grid_step)
+    xmax = xmin + s2_tile_size
+    ymin = ymax - s2_tile_size
+
+    epsg = (32600 if lat.upper() >= 'N' else 32700) + int(utm)
+    crs = f'urn:ogc:def:crs:EPSG:8.8.1:{epsg}'
+    return {
+        'type': 'Polygon',
+        'crs': {'type': 'name', 'properties': {'name': crs}},
+        'coordinates': [[
+            [xmin, ymax], [xmax, ymax], [xmax, ymin], [xmin, ymin], [xmin, ymax]]]}
+
+
+# WGS84 ellipsoid and UTM projection parameters.
+wgs84_a = 6378137.0
+wgs84_f = 1 / 298.257223563
+utm_k0 = 0.9996
+utm_false_easting = 500000.0
+utm_false_northing_south = 10000000.0
+
+geometry_encodings = ['geojson', 'flat', 'polyline']
+
+
+def _krueger_coefficients():
+    """Return the rectifying radius and the inverse Krüger series coefficients."""
+    n = wgs84_f / (2 - wgs84_f)
+    radius = wgs84_a / (1 + n) * (1 + n ** 2 / 4 + n ** 4 / 64)
+    beta = [
+        n / 2 - 2 * n ** 2 / 3 + 37 * n ** 3 / 96,
+        n ** 2 / 48 + n ** 3 / 15,
+        17 * n ** 3 / 480]
+    delta = [
+        2 * n - 2 * n ** 2 / 3 - 2 * n ** 3,
+        7 * n ** 2 / 3 - 8 * n ** 3 / 5,
+        56 * n ** 3 / 15]
+    return radius, beta, delta
+
+
+utm_radius, utm_beta, utm_delta = _krueger_coefficients()
+
+
+def utm_to_wgs84(easting, northing, zone, south=False):
+    """Return the (longitude, latitude) of UTM coordinates.
+
+    Krüger series, millimeter accuracy.
+    """
+    northing = northing - utm_false_northing_south if south else northing
+    xi = northing / (utm_k0 * utm_radius)
+    eta = (easting - utm_false_easting) / (utm_k0 * utm_radius)
+
+    xi_p, eta_p = xi, eta
+    for j, beta in enumerate(utm_beta, 1):
+        xi_p -= beta * math.sin(2 * j * xi) * math.cosh(2 * j * eta)
+        eta_p -= beta * math.cos(2 * j * xi) * math.sinh(2 * j * eta)
+
+    chi = math.asin(math.sin(xi_p) / math.cosh(eta_p))
+    lat = chi + sum(
+        delta * math.sin(2 * j * chi) for j, delta in enumerate(utm_delta, 1))
+    lon = zone * 6 - 183 + math.degrees(math.atan2(math.sinh(eta_p), math.cos(xi_p)))
+    return lon, math.degrees(lat)
+
+
+def _utm_zone(geometry):
+    """Return the (zone, south) of a geometry with a UTM CRS, None otherwise."""
+    name = geometry.get('crs', {}).get('properties', {}).get('name', '')
+    match = re.search(r'EPSG:(?:[0-9.]*:)?(32[67])([0-9]{2})$', name)
+    if not match:
+        return None
+    return int(match.group(2)), match.group(1) == '327'
+
+
+def _map_rings(geometry, func):
+    """Apply func to the rings (position lists) of a (Multi)Polygon or LineString."""
+    coords = geometry['coordinates']
+    if geometry['type'] == 'MultiPolygon':
+        coords = [[func(ring) for ring in polygon] for polygon in coords]
+    elif geometry['type'] in ['Polygon', 'MultiLineString']:
+        coords = [func(ring) for ring in coords]
+    else:
+        coords = func(coords)
+    return dict(geometry, coordinates=coords)
+
+
+@lru_cache(maxsize=4096)
+def _reproject_ring(ring, zone, south):
+    return tuple(utm_to_wgs84(x, y, zone, south) for x, y in ring)
+
+
+def to_wgs84(geometry):
+    """Reproject a geometry in UTM (e.g S2 tileGeometry) to longitude/latitude.
+
+    Geometries without a UTM CRS (Landsat-8 and CBERS footprints are already in
+    longitude/latitude) are returned unchanged. Rings are memoized, so the
+    geometry shared by all the scenes of a tile is only reprojected once.
+    """
+    utm = _utm_zone(geometry)
+    if utm is None:
+        return geometry
+
+    def _reproject(ring):
+        return [list(p) for p in _reproject_ring(tuple(map(tuple, ring)), *utm)]
+
+    geometry = _map_rings(geometry, _reproject)
+    geometry.pop('crs', None)
+    return geometry
+
+
+def quantize(geometry, precision):
+    """Round coordinates to `precision` decimals, dropping repeated positions."""
+    def _quantize(ring):
+        result = []
+        for x, y in ring:
+            point = [round(x, precision), round(y, precision)]
+            if not result or result[-1] != point:
+                result.append(point)
+        return result
+
+    return _map_rings(geometry, _quantize)
+
+
+def _encode_value(value):
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+def encode_polyline(ring, precision=5):
+    """Encode positions with the encoded polyline algorithm (x, y order)."""
+    factor = 10 ** precision
+    previous = (0, 0)
+    chunks = []
+    for x, y in ring:
+        point = (int(round(x * factor)), int(round(y * factor)))
+        chunks.append(_encode_value(point[0] - previous[0]))
+        chunks.append(_encode_value(point[1] - previous[1]))
+        previous = point
+    return ''.join(chunks)
+
+
+def decode_polyline(encoded, precision=5):
+    """Decode an encoded polyline to positions."""
+    factor = 10 ** precision
+    values = []
+    value, shift = 0, 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+
+    ring, x, y = [], 0, 0
+    for dx, dy in zip(values[0::2], values[1::2]):
+        x, y = x + dx, y + dy
+        ring.append([x / factor, y / factor])
+    return ring
+
+
+def encode(geometry, encoding='geojson', precision=5):
+    """Encode geometry coordinates.
+
+    'geojson' returns the geometry, 'flat' replaces each ring by a flat
+    [x0, y0, x1, y1, ...] array and 'polyline' by an encoded polyline string
+    (with `precision` decimals). The encoding is recorded in `encoding`.
+    """
+    if encoding == 'geojson':
+        return geometry
+    if encoding == 'flat':
+        geometry = _map_rings(geometry, lambda ring: [c for p in ring for c in p])
+    elif encoding == 'polyline':
+        geometry = _map_rings(geometry, lambda ring: encode_polyline(ring, precision))
+        geometry['precision'] = precision
+    else:
+        raise ValueError(f'Invalid geometry encoding: {encoding}')
+    geometry['encoding'] = encoding
+    return geometry
+
+
+def format_geometry(geometry, wgs84=False, precision=None, encoding='geojson'):
+    """Reproject, quantize and encode an output geometry."""
+    if wgs84:
+        geometry = to_wgs84(geometry)
+    if precision is not None:
+        geometry = quantize(geometry, precision)
+    if encoding != 'geojson':
+        precision = 5 if precision is None else precision
+        geometry = encode(geometry, encoding, precision=precision)
+    return geometry
+
+
+def format_records(records, wgs84=False, precision=None, encoding='geojson'):
+    """Format the geometry of records (and of their levels), see `format_geometry`."""
+    if not wgs84 and precision is None and encoding == 'geojson':
+        return records
+
+    def _format(record):
+        if record.get('geometry'):
+            geometry = format_geometry(record['geometry'], wgs84, precision, encoding)
+            record = dict(record, geometry=geometry)
+        if record.get('levels'):
+            record = dict(record, levels={
+                level: _format(info) for level, info in record['levels'].items()})
+        return record
+
+    return [_format(record) for record in records]
@@ -0,0 +1,220 @@
+"""AWS Lambda handler.
+
+The clients (see `aws.region_client`), query and negative caches and the search
+thread pool are module-level state, created on the first invocation and reused
+by the next ones while the execution environment stays warm.
+
+Results are returned as a gzip-compressed JSON array. When the compressed payload
+is larger than `max_response_size` it is written to an object store (S3 bucket
+`RESULTS_BUCKET`) and a reference to it is returned instead.
+
+Event (direct invocation, or API Gateway `pathParameters`/`queryStringParameters`)::
+
+    {"sensor": "sentinel2", "utm": "22", "lat": "K", "grid": "HV", "full": "true"}
+
+With `MAX_REQUESTS`, each invocation sends at most that many S3 requests and
+partial results are flagged with the `X-Partial-Results: request-budget` header.
+Results missing listings dropped at the `timeout` are flagged with
+`X-Partial-Results: timeout`.
+
+Output geometries can be reprojected (`wgs84`), quantized (`precision`) and
+encoded (`geometry_encoding`, see `geometry.encode`).
+"""
+
+import os
+import json
+import uuid
+import zlib
+import base64
+from concurrent import futures
+from datetime import datetime, timezone
+
+from aws_sat_api import aws, geometry, search
+from aws_sat_api.cache import MemoryCache, NegativeCache, from_url
+from aws_sat_api.errors import SatApiError
+from aws_sat_api.throttle import RequestBudget
+
+# Lambda responses are limited to 6MB, base64 encoding adds a third.
+max_response_size = int(os.environ.get('MAX_RESPONSE_SIZE', 4 * 1024 * 1024))
+# Shared cache backend url (e.g redis://cache.local:6379/0), in memory by default.
+cache_url = os.environ.get('CACHE_URL')
+negative_cache_ttl = int(os.environ.get('NEGATIVE_CACHE_TTL', 3600))
+results_bucket = os.environ.get('RESULTS_BUCKET')
+results_prefix = os.environ.get('RESULTS_PREFIX', 'results')
+results_expires = int(os.environ.get('RESULTS_EXPIRES', 3600))
+# S3 requests allowed per invocation, results are partial once used up.
+max_requests = int(os.environ.get('MAX_REQUESTS', 0)) or None
+
+# Warm state.
+cache = None
+store = None
+
+
+class S3Store(object):
+    """Store offloaded results in a S3 bucket."""
+
+    def __init__(self, bucket, prefix='', expires=3600):
+        """Initialize store."""
+        self.bucket = bucket
+        self.prefix = prefix
+        self.expires = expires
+
+    def put(self, name, body, content_type, content_encoding=None):
+        """Write an object and return its reference (location and pre-signed url)."""
+        key = f'{self.prefix}/{name}' if self.prefix else name
+        s3 = aws.get_client(self.bucket)
+        extra = {'ContentEncoding': content_encoding} if content_encoding else {}
+        s3.put_object(
+            Bucket=self.bucket, Key=key, Body=body, ContentType=content_type, **extra)
+        url = s3.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=self.expires)
+        return {'location': f's3://{self.bucket}/{key}', 'url': url}
+
+
+class LocalStore(object):
+    """Store offloaded results in a local directory (local stand-in of `S3Store`)."""
+
+    def __init__(self, directory):
+        """Initialize store."""
+        self.directory = directory
+
+    def put(self, name, body, content_type, content_encoding=None):
+        """Write a file and return its reference."""
+        path = os.path.abspath(os.path.join(self.directory, name))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(body)
+        return {'location': path, 'url': f'file://{path}'}
+
+
+def _warm():
+    """Create the state shared by the invocations."""
+    global cache, store
+    if cache is None:
+        cache = from_url(cache_url) if cache_url else MemoryCache()
+        if cache_url and aws.cache is None:
+            aws.cache = cache
+    if aws.negative_cache is None:
+        aws.negative_cache = NegativeCache(
+            ttl=negative_cache_ttl, backend=cache if cache_url else None)
+    if search.executor is None:
+        search.executor = futures.ThreadPoolExecutor(max_workers=search.max_worker)
+    if store is None and results_bucket:
+        store = S3Store(results_bucket, results_prefix, expires=results_expires)
+
+
+def _params(event):
+    """Merge direct invocation and API Gateway parameters."""
+    params = {
+        k: v for k, v in event.items()
+        if k not in ['pathParameters', 'queryStringParameters']}
+    params.update(event.get('pathParameters') or {})
+    params.update(event.get('queryStringParameters') or {})
+    return params
+
+
+def _bool(value, default):
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ['true', '1', 'yes']
+
+
+def _date(value):
+    if value is None:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+
+def _list(value):
+    if value is None or isinstance(value, list):
+        return value
+    return value.split(',')
+
+
+def _search(params):
+    """Run the search described by the event parameters."""
+    sensor = params.get('sensor')
+    timeout = float(params['timeout']) if params.get('timeout') else None
+    fields = _list(params.get('fields'))
+
+    if sensor == 'landsat':
+        return search.landsat(
+            params['path'], params['row'], full=_bool(params.get('full'), True),
+            cache=cache, timeout=timeout, fields=fields)
+
+    if sensor == 'sentinel2':
+        levels = _list(params.get('levels'))
+        return search.sentinel2(
+            params['utm'], params['lat'], params['grid'],
+            full=_bool(params.get('full'), True),
+            level=params.get('level', 'l1c'), levels=levels,
+            start_date=_date(params.get('start_date')),
+            end_date=_date(params.get('end_date')),
+            cache=cache, timeout=timeout, fields=fields)
+
+    if sensor == 'cbers':
+        return search.cbers(
+            params['path'], params['row'], sensor=params.get('cbers_sensor', 'MUX'),
+            full=_bool(params.get('full'), False), timeout=timeout, fields=fields)
+
+    raise ValueError(f'Invalid sensor: {sensor}')
+
+
+def _compress(records):
+    """Return records as a gzip-compressed JSON array, encoded one at a time."""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    chunks = [compressor.compress(b'[')]
+    for i, record in enumerate(records):
+        prefix = b',' if i else b''
+        chunks.append(compressor.compress(prefix + json.dumps(record).encode('utf-8')))
+    chunks.append(compressor.compress(b']'))
+    chunks.append(compressor.flush())
+    return b''.join(chunks)
+
+
+def _response(status, body, headers=None, encoded=False):
+    headers = dict({'Content-Type': 'application/json'}, **(headers or {}))
+    if not encoded:
+        body = json.dumps(body)
+    return {
+        'statusCode': status, 'headers': headers, 'isBase64Encoded': encoded,
+        'body': body}
+
+
+def handler(event, context=None):
+    """Lambda entry point."""
+    _warm()
+    params = _params(event)
+    budget = aws.request_budget = RequestBudget(max_requests) if max_requests else None
+    try:
+        results = _search(params)
+        records = geometry.format_records(
+            results, wgs84=_bool(params.get('wgs84'), False),
+            precision=int(params['precision']) if params.get('precision') else None,
+            encoding=params.get('geometry_encoding', 'geojson'))
+    except (SatApiError, ValueError, KeyError) as err:
+        return _response(400, {'errorMessage': f'{type(err).__name__}: {err}'})
+    finally:
+        aws.request_budget = None
+
+    partial = {}
+    if budget is not None and budget.exhausted:
+        partial = {'X-Partial-Results': 'request-budget'}
+    elif getattr(results, 'partial', False):
+        partial = {'X-Partial-Results': 'timeout'}
+    body = _compress(records)
+    if len(body) <= max_response_size:
+        headers = {'Content-Encoding': 'gzip', **partial}
+        return _response(200, base64.b64encode(body).decode(), headers, encoded=True)
+
+    if store is None:
+        message = f'Response too large ({len(body)} bytes)'
+        return _response(413, {'errorMessage': message})
+
+    request_id = getattr(context, 'aws_request_id', None) or str(uuid.uuid4())
+    reference = store.put(f'{request_id}.json.gz', body, 'application/json', 'gzip')
+    reference.update(count=len(records), size=len(body))
+    return _response(303, reference, {'Location': reference['url'], **partial})
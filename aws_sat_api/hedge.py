@@ -0,0 +1,106 @@
+"""Hedged requests.
+
+A request still running after the `percentile` of the recent latencies of its
+operation is duplicated and the first answer wins. Hedges are capped to a
+fraction (`budget`) of the requests, so the extra cost stays bounded.
+
+Enable for the S3 requests with `aws.hedger = Hedger()`.
+"""
+
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent import futures
+
+
+class Hedger(object):
+    """Hedged requests policy, with per-operation adaptive thresholds."""
+
+    def __init__(self, percentile=95, budget=0.05, min_samples=20, window=1000,
+                 max_workers=100):
+        """Initialize hedger.
+
+        :param percentile: Latency percentile after which a request is hedged.
+        :param budget: Maximum ratio of hedged requests.
+        :param min_samples: Latencies to record before hedging an operation.
+        :param window: Number of recent latencies kept per operation.
+        :param max_workers: Threads running the requests and their hedges.
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        self.requests = 0
+        self.hedges = 0
+        self._latencies = {}
+        self._thresholds = {}
+        self._lock = threading.Lock()
+        self._executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    def threshold(self, op):
+        """Return the hedging delay (seconds) of an operation, None while learning."""
+        return self._thresholds.get(op)
+
+    def record(self, op, latency):
+        """Record the latency of a completed request."""
+        with self._lock:
+            latencies = self._latencies.setdefault(op, deque(maxlen=self.window))
+            latencies.append(latency)
+            # Sorting the window on every request would cost more than it saves.
+            if len(latencies) >= self.min_samples and (
+                    op not in self._thresholds or len(latencies) % 10 == 0):
+                values = sorted(latencies)
+                index = min(len(values) - 1, int(len(values) * self.percentile / 100))
+                self._thresholds[op] = values[index]
+
+    def _acquire(self):
+        """Take a hedge from the budget."""
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def _submit(self, op, func):
+        start = time.monotonic()
+        # Run in the caller context (e.g its search request budget).
+        future = self._executor.submit(contextvars.copy_context().run, func)
+
+        def _done(f):
+            if f.exception() is None:
+                self.record(op, time.monotonic() - start)
+
+        future.add_done_callback(_done)
+        return future
+
+    def call(self, op, func, span=None):
+        """Call func, hedged after the threshold of op, and return the first answer.
+
+        :param op: Operation name (latencies are tracked per operation).
+        :param func: Function without arguments.
+        :param span: Tracing span, marked `hedged` when a hedge is sent.
+        """
+        with self._lock:
+            self.requests += 1
+
+        primary = self._submit(op, func)
+        threshold = self.threshold(op)
+        try:
+            return primary.result(timeout=threshold)
+        except futures.TimeoutError:
+            if threshold is None or not self._acquire():
+                return primary.result()
+
+        if span is not None:
+            span['hedged'] = True
+
+        attempts = [primary, self._submit(op, func)]
+        done, pending = futures.wait(attempts, return_when=futures.FIRST_COMPLETED)
+        first = done.pop()
+        if first.exception() is None:
+            return first.result()
+
+        # The first answer failed, fall back on the other attempt.
+        other = (pending or done).pop()
+        return other.result()
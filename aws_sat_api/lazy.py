@@ -0,0 +1,135 @@
+"""Lazy scene records.
+
+Searches with `lazy=True` return `LazyRecord`s, simple records whose metadata
+fields (e.g `geometry` or `cloud_coverage`) are fetched on first access. The
+records of a search share a `Loader`, which coalesces the accesses pending at
+the same time (e.g from several threads) into one concurrent batch. `load`
+fetches a chosen subset of records (e.g after filtering on dates) at once.
+
+Serializing a record (e.g `json.dumps`) only writes the fields already loaded.
+"""
+
+import time
+import threading
+from concurrent import futures
+
+
+class Loader(object):
+    """Fetch the metadata of lazy records in concurrent batches."""
+
+    def __init__(self, fetch, window=0.005, max_workers=50, executor=None):
+        """Initialize loader.
+
+        :param fetch: Function returning the full metadata of a record.
+        :param window: Seconds an access waits for others to join its batch.
+        :param max_workers: Concurrent fetches of a batch.
+        :param executor: Thread pool running the fetches, one per batch by default.
+        """
+        self.fetch = fetch
+        self.window = window
+        self.max_workers = max_workers
+        self.executor = executor
+        self.batches = 0
+        self._pending = []
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def _submit(self, records):
+        """Queue the records not requested yet.
+
+        Returns their futures and whether the caller must run the next batch.
+        """
+        with self._lock:
+            fs = []
+            for record in records:
+                if record._future is None:
+                    record._future = futures.Future()
+                    self._pending.append(record)
+                fs.append(record._future)
+            leader = bool(self._pending) and not self._scheduled
+            self._scheduled = self._scheduled or leader
+        return fs, leader
+
+    def _run(self):
+        """Fetch the pending records."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._scheduled = False
+            self.batches += 1
+
+        def _worker(record):
+            try:
+                record._future.set_result(self.fetch(record))
+            except Exception as err:
+                record._future.set_exception(err)
+
+        if self.executor is not None:
+            list(self.executor.map(_worker, batch))
+            return
+
+        max_workers = min(len(batch), self.max_workers)
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(_worker, batch))
+
+    def request(self, record):
+        """Return the metadata of a record, batched with the other pending accesses."""
+        (future,), leader = self._submit([record])
+        if leader:
+            time.sleep(self.window)
+            self._run()
+        return future.result()
+
+    def load(self, records):
+        """Fetch the metadata of records in one batch."""
+        fs, leader = self._submit(records)
+        if leader:
+            self._run()
+        futures.wait(fs)
+
+
+class LazyRecord(dict):
+    """Scene record fetching its metadata `fields` on first access."""
+
+    def __init__(self, info, loader, fields):
+        """Initialize record."""
+        super().__init__(info)
+        self.loaded = False
+        self._loader = loader
+        self._fields = frozenset(fields)
+        self._future = None
+
+    def _load(self):
+        if not self.loaded:
+            self.update(self._loader.request(self))
+            self.loaded = True
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            self._load()
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        """Return a field, fetching the metadata first if needed."""
+        if key in self._fields:
+            self._load()
+        return super().get(key, default)
+
+
+def load(records):
+    """Fetch the metadata of lazy records, in one concurrent batch per search.
+
+    :param records: Records (non-lazy or loaded records are skipped).
+    :returns: The records.
+    """
+    records = list(records)
+    batches = {}
+    for record in records:
+        if isinstance(record, LazyRecord) and not record.loaded:
+            batches.setdefault(record._loader, []).append(record)
+
+    for loader, batch in batches.items():
+        loader.load(batch)
+        for record in batch:
+            record._load()
+
+    return records
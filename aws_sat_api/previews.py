@@ -0,0 +1,166 @@
+"""Bulk download of the scene previews (`thumbURL` and `browseURL`).
+
+Downloads run in a thread pool over a keep-alive urllib3 connection pool sized
+to the concurrency, so ten thousand thumbnails reuse a handful of connections.
+Files are streamed in chunks to a directory (`DirectoryStore`) or kept in a
+bounded in-memory LRU (`LRUStore`).
+"""
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent import futures
+from urllib.parse import urlparse
+
+import urllib3
+
+chunk_size = 64 * 1024
+preview_fields = ['thumbURL', 'browseURL']
+
+
+class DirectoryStore(object):
+    """Write previews to a local directory."""
+
+    def __init__(self, directory):
+        """Initialize store."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        """Return the path of a preview."""
+        return os.path.join(self.directory, name)
+
+    def exists(self, name):
+        """Check if a preview is already stored."""
+        return os.path.exists(self.path(name))
+
+    def write(self, name, chunks):
+        """Stream chunks to the preview file (renamed once complete)."""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp, self.path(name))
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+
+class LRUStore(object):
+    """Keep previews in memory, evicting the least recently used over `max_bytes`."""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        """Initialize store."""
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def exists(self, name):
+        """Check if a preview is in memory."""
+        with self._lock:
+            return name in self._data
+
+    def get(self, name):
+        """Return a preview content (None if missing)."""
+        with self._lock:
+            if name not in self._data:
+                return None
+            self._data.move_to_end(name)
+            return self._data[name]
+
+    def write(self, name, chunks):
+        """Store a preview."""
+        data = b''.join(chunks)
+        with self._lock:
+            if name in self._data:
+                self.size -= len(self._data.pop(name))
+            self._data[name] = data
+            self.size += len(data)
+            while self.size > self.max_bytes and len(self._data) > 1:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def preview_urls(record, fields=None):
+    """Return the (file name, url) of a record previews."""
+    fields = fields or preview_fields
+    urls = []
+    for field in fields:
+        url = record.get(field)
+        if url:
+            ext = os.path.splitext(urlparse(url).path)[1] or '.jpg'
+            name = f"{record['scene_id']}_{field[:-3].lower()}{ext}"
+            urls.append((name, url))
+    return urls
+
+
+def _fetch(http, url, store, name, retries):
+    """Stream an url to the store, retrying interrupted transfers."""
+    for attempt in range(retries + 1):
+        response = http.request('GET', url, preload_content=False)
+        try:
+            if response.status >= 400:
+                raise urllib3.exceptions.HTTPError(f'HTTP {response.status} for {url}')
+
+            size = [0]
+
+            def _chunks():
+                for chunk in response.stream(chunk_size):
+                    size[0] += len(chunk)
+                    yield chunk
+
+            store.write(name, _chunks())
+            return size[0]
+        except (urllib3.exceptions.ProtocolError, urllib3.exceptions.ReadTimeoutError):
+            if attempt == retries:
+                raise
+        finally:
+            response.release_conn()
+
+
+def download(records, store, fields=None, concurrency=32, retries=3):
+    """Download the previews of records.
+
+    :param records: Scene records (with `scene_id` and preview urls).
+    :param store: `DirectoryStore` or `LRUStore`.
+    :param fields: Preview fields (default: thumbURL and browseURL).
+    :param concurrency: Number of concurrent downloads (and pooled connections).
+    :param retries: Retries of failed connections, 5xx responses and interrupted
+        transfers.
+    :returns: Generator of dicts (name, url, status: 'downloaded', 'skipped'
+        or 'error', size or error), as downloads complete.
+    """
+    http = urllib3.PoolManager(
+        num_pools=16, maxsize=concurrency, block=True,
+        retries=urllib3.Retry(
+            total=retries, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]))
+
+    def _worker(name, url):
+        if store.exists(name):
+            return {'name': name, 'url': url, 'status': 'skipped'}
+        try:
+            size = _fetch(http, url, store, name, retries)
+            return {'name': name, 'url': url, 'status': 'downloaded', 'size': size}
+        except Exception as err:
+            error = f'{type(err).__name__}: {err}'
+            return {'name': name, 'url': url, 'status': 'error', 'error': error}
+
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Submit in bounded windows so huge result sets do not queue all at once.
+        pending = set()
+        for record in records:
+            for name, url in preview_urls(record, fields):
+                pending.add(executor.submit(_worker, name, url))
+                if len(pending) >= concurrency * 4:
+                    done, pending = futures.wait(
+                        pending, return_when=futures.FIRST_COMPLETED)
+                    for f in done:
+                        yield f.result()
+
+        for f in futures.as_completed(pending):
+            yield f.result()
+
+    http.clear()
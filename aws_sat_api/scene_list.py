@@ -0,0 +1,160 @@
+"""Landsat-8 scene_list index."""
+
+import os
+import csv
+import gzip
+import time
+import bisect
+import threading
+from collections import defaultdict
+
+from aws_sat_api import unsigned
+from aws_sat_api.utils import zeroPad
+
+scene_list_url = 'https://landsat-pds.s3.amazonaws.com/c1/L8/scene_list.gz'
+cache_dir = os.environ.get(
+    'SCENE_LIST_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'aws_sat_api'))
+max_age = int(os.environ.get('SCENE_LIST_MAX_AGE', 86400))
+
+
+class SceneList(object):
+    """Local index of the `landsat-pds` Collection 1 scene_list.
+
+    The gzipped scene list is downloaded once and refreshed with a conditional
+    request (ETag) when older than `max_age` seconds. It is parsed as a stream into
+    an in-memory index keyed by path/row, with the scenes sorted by acquisition date.
+
+    Searches never wait for a download or parse: they use the loaded index, if
+    any, and leave the refresh to a background thread (see `prepare`).
+    """
+
+    def __init__(self, directory=cache_dir, url=scene_list_url, max_age=max_age):
+        """Initialize index."""
+        self.url = url
+        self.max_age = max_age
+        self.path = os.path.join(directory, 'scene_list.gz')
+        self._index = None
+        self._last_date = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+
+    def refresh(self, force=False):
+        """Download the scene list if missing, stale or modified.
+
+        Returns True when a new version was downloaded.
+        """
+        if not force and os.path.exists(self.path) \
+                and time.time() - os.path.getmtime(self.path) < self.max_age:
+            return False
+
+        headers = {}
+        etag_path = f'{self.path}.etag'
+        if os.path.exists(self.path) and os.path.exists(etag_path):
+            with open(etag_path) as f:
+                headers['If-None-Match'] = f.read().strip()
+
+        response = unsigned.http.request(
+            'GET', self.url, headers=headers, preload_content=False)
+        try:
+            if response.status == 304:
+                os.utime(self.path)
+                return False
+
+            unsigned._raise_for_status(response, 'GetObject')
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.stream(1024 * 1024):
+                    f.write(chunk)
+            os.replace(tmp_path, self.path)
+
+            etag = response.headers.get('ETag')
+            if etag:
+                with open(etag_path, 'w') as f:
+                    f.write(etag)
+        finally:
+            response.release_conn()
+
+        self._index = None
+        return True
+
+    def load(self):
+        """Parse the local scene list into the path/row index."""
+        index = defaultdict(list)
+        last_date = ''
+        with gzip.open(self.path, 'rt', newline='') as f:
+            for row in csv.DictReader(f):
+                date = row['acquisitionDate'][0:10].replace('-', '')
+                scene = {
+                    'scene_id': row['productId'],
+                    'acquisition_date': date,
+                    'cloud_coverage': float(row['cloudCover']),
+                    'bbox': [
+                        float(row['min_lon']), float(row['min_lat']),
+                        float(row['max_lon']), float(row['max_lat'])]}
+                index[(zeroPad(row['path'], 3), zeroPad(row['row'], 3))].append(scene)
+                last_date = max(last_date, date)
+
+        for scenes in index.values():
+            scenes.sort(key=lambda s: s['acquisition_date'])
+
+        # scenes and dates are swapped in at once, for the searches reading the index
+        self._last_date = last_date
+        self._index = {
+            k: (v, [s['acquisition_date'] for s in v]) for k, v in index.items()}
+
+    def update(self):
+        """Refresh and load the index if needed, waiting for the download."""
+        with self._lock:
+            if self.refresh() or self._index is None:
+                self.load()
+
+    @property
+    def fresh(self):
+        """True when the loaded index comes from a scene list younger than `max_age`."""
+        try:
+            age = time.time() - os.path.getmtime(self.path)
+        except OSError:
+            return False
+        return self._index is not None and age < self.max_age
+
+    def prepare(self):
+        """Return True if the index is loaded, without blocking.
+
+        When the index is not loaded or not fresh, it is refreshed and loaded in a
+        background thread (one at a time).
+        """
+        if not self.fresh:
+            with self._refresh_lock:
+                if self._refresh_thread is None or not self._refresh_thread.is_alive():
+                    thread = threading.Thread(target=self.update, daemon=True)
+                    thread.start()
+                    self._refresh_thread = thread
+        return self._index is not None
+
+    @property
+    def last_date(self):
+        """Most recent acquisition date (YYYYMMDD) in the index."""
+        self.update()
+        return self._last_date
+
+    def lookup(self, path, row, start=None, end=None, refresh=True):
+        """Return the scenes for a path/row, optionally between two YYYYMMDD dates.
+
+        :param refresh: Refresh and load the index first if needed, else the loaded
+            index is used as is (see `prepare`).
+        """
+        if refresh:
+            self.update()
+        key = (zeroPad(path, 3), zeroPad(row, 3))
+        scenes, dates = self._index.get(key, ([], []))
+        lo = bisect.bisect_left(dates, start) if start else 0
+        hi = bisect.bisect_right(dates, end) if end else len(scenes)
+        return scenes[lo:hi]
+
+    def tiles(self):
+        """Return the path/rows of the index, as (path, row) tuples."""
+        self.update()
+        return sorted(self._index)
@@ -5,13 +5,53 @@ import json
 
 import click
 
-from aws_sat_api import search
+from aws_sat_api import (
+    assets as band_assets,
+    aws,
+    cache,
+    crawler,
+    explain as estimates,
+    geometry,
+    previews as preview_images,
+    search,
+    tracing,
+    warm as cache_warm,
+)
+from aws_sat_api.catalog import Catalog, build_tiles_filter, write as write_catalog
+from aws_sat_api.scene_list import SceneList
+from aws_sat_api.throttle import RequestBudget
 
 
 @click.group(short_help="AWS Satellite API")
-def awssat():
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write a Chrome trace (Perfetto) of the search stages and S3 requests",
+)
+@click.option(
+    "--max-requests",
+    type=int,
+    help="Stop sending S3 requests after this number, returning partial results",
+)
+@click.pass_context
+def awssat(ctx, trace, max_requests):
     """Search."""
-    pass
+    if trace:
+        ctx.with_resource(tracing.tracing(path=trace))
+
+    if max_requests is not None:
+        budget = RequestBudget(max_requests)
+        aws.request_budget = budget
+
+        def _close():
+            aws.request_budget = None
+            if budget.exhausted:
+                click.echo(
+                    f"Request budget of {max_requests} used up, results are partial",
+                    err=True,
+                )
+
+        ctx.call_on_close(_close)
 
 
 class CustomType:
@@ -56,6 +96,54 @@ class CustomType:
     s2tile = S2Tile()
 
 
+def _fields(value):
+    """Parse fields option."""
+    return value.split(",") if value else None
+
+
+def _echo_estimates(results):
+    """Print request estimates, one per tile, and their total."""
+    results = list(results)
+    for result in results:
+        click.echo(json.dumps(result))
+    click.echo(json.dumps(estimates.total(results)), err=True)
+
+
+explain_option = click.option(
+    "--explain",
+    is_flag=True,
+    default=False,
+    help="Print the estimated S3 requests instead of searching",
+)
+
+
+def geometry_options(func):
+    """Add the output geometry options to a command."""
+    options = [
+        click.option(
+            "--wgs84",
+            is_flag=True,
+            default=False,
+            help="Reproject geometries to longitude/latitude",
+        ),
+        click.option(
+            "--precision",
+            type=int,
+            default=None,
+            help="Round coordinates to this number of decimals",
+        ),
+        click.option(
+            "--geometry-encoding",
+            type=click.Choice(geometry.geometry_encodings),
+            default="geojson",
+            help="Geometry coordinates encoding",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
 @awssat.command(name="landsat")
 @click.option(
     "--path",
@@ -80,11 +168,37 @@ class CustomType:
     default=True,
     help="full"
 )
+@click.option(
+    "--anonymous",
+    is_flag=True,
+    default=False,
+    help="Use unsigned requests"
+)
+@click.option(
+    "--scene-list",
+    is_flag=True,
+    default=False,
+    help="Use the local scene_list index"
+)
+@click.option(
+    "--fields",
+    type=str,
+    help="Comma separated list of output fields",
+)
+@explain_option
+@geometry_options
 def landsat(
     path,
     row,
     pathrow,
     full,
+    anonymous,
+    scene_list,
+    fields,
+    explain,
+    wgs84,
+    precision,
+    geometry_encoding,
 ):
     """Landsat search CLI."""
     # TODO: add tests for pathrow and path+row options
@@ -93,8 +207,24 @@ def landsat(
     else:
         pr_info = [dict(path=path, row=row)]
 
+    index = None
+    if scene_list:
+        # searches do not wait for the index, the command loads it first
+        index = SceneList()
+        index.update()
+
+    if explain:
+        _echo_estimates(
+            estimates.landsat(**el, full=full, index=index, fields=_fields(fields))
+            for el in pr_info
+        )
+        return
+
     for el in pr_info:
-        for scene in search.landsat(**el, full=full):
+        scenes = search.landsat(
+            **el, full=full, anonymous=anonymous, index=index, fields=_fields(fields))
+        scenes = geometry.format_records(scenes, wgs84, precision, geometry_encoding)
+        for scene in scenes:
             click.echo(json.dumps(scene))
 
 
@@ -126,14 +256,22 @@ def landsat(
 @click.option(
     "--level",
     type=click.Choice(['l1c', 'l2a']),
-    default='l1c',
-    help="level",
+    multiple=True,
+    default=['l1c'],
+    help="level (repeat to search levels jointly)",
 )
 @click.option(
     "--full/--simple",
     default=True,
     help="full"
 )
+@click.option(
+    "--fields",
+    type=str,
+    help="Comma separated list of output fields",
+)
+@explain_option
+@geometry_options
 def sentinel(
     utm,
     lat,
@@ -141,6 +279,11 @@ def sentinel(
     tile,
     level,
     full,
+    fields,
+    explain,
+    wgs84,
+    precision,
+    geometry_encoding,
 ):
     """Sentinel search CLI."""
     # TODO: add tests for tile and utm+grid+lat options
@@ -153,8 +296,21 @@ def sentinel(
     else:
         tile_info = [dict(utm=utm, lat=lat, grid=grid)]
 
+    if len(level) > 1:
+        level_info = dict(levels=list(level))
+    else:
+        level_info = dict(level=level[0])
+
+    if explain:
+        _echo_estimates(
+            estimates.sentinel2(**el, **level_info, full=full, fields=_fields(fields))
+            for el in tile_info)
+        return
+
     for el in tile_info:
-        for scene in search.sentinel2(**el, level=level, full=full):
+        scenes = search.sentinel2(**el, **level_info, full=full, fields=_fields(fields))
+        scenes = geometry.format_records(scenes, wgs84, precision, geometry_encoding)
+        for scene in scenes:
             click.echo(json.dumps(scene))
 
 
@@ -184,11 +340,29 @@ def sentinel(
     default="MUX",
     help="CBERS4 sensor",
 )
+@click.option(
+    "--full/--simple",
+    default=False,
+    help="full"
+)
+@click.option(
+    "--fields",
+    type=str,
+    help="Comma separated list of output fields",
+)
+@explain_option
+@geometry_options
 def cbers(
     path,
     row,
     pathrow,
     sensor,
+    full,
+    fields,
+    explain,
+    wgs84,
+    precision,
+    geometry_encoding,
 ):
     """CBERS search CLI."""
     # TODO: add tests for pathrow and path+row options
@@ -197,6 +371,291 @@ def cbers(
     else:
         pr_info = [dict(path=path, row=row)]
 
+    if explain:
+        _echo_estimates(
+            estimates.cbers(**el, sensor=sensor, full=full, fields=_fields(fields))
+            for el in pr_info
+        )
+        return
+
     for el in pr_info:
-        for scene in search.cbers(**el, sensor=sensor):
+        scenes = search.cbers(**el, sensor=sensor, full=full, fields=_fields(fields))
+        scenes = geometry.format_records(scenes, wgs84, precision, geometry_encoding)
+        for scene in scenes:
             click.echo(json.dumps(scene))
+
+
+@awssat.command(name="catalog")
+@click.argument("output", type=click.Path(dir_okay=False, writable=True))
+@click.argument("input", type=click.File("r"), default="-")
+@click.option(
+    "--level",
+    type=click.Choice(["l1c", "l2a"]),
+    default="l1c",
+    help="Processing level of the Sentinel 2 results (single level searches)",
+)
+def catalog(output, input, level):
+    """Write search results (JSON lines) to a catalog file.
+
+    Results with a status (error, timeout, partial) are skipped.
+    """
+    records = (json.loads(line) for line in input if line.strip())
+    count = write_catalog(output, records, level=level)
+    click.echo(f"{count} records written to {output}", err=True)
+
+
+@awssat.command(name="tiles-filter")
+@click.argument("output", type=click.Path(dir_okay=False, writable=True))
+@click.argument("input", type=click.File("r"), required=False)
+@click.option(
+    "--catalog",
+    "catalog_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Add the tiles of a catalog file",
+)
+@click.option(
+    "--scene-list",
+    is_flag=True,
+    default=False,
+    help="Add the Landsat-8 path/rows of the scene_list index",
+)
+@click.option(
+    "--error-rate",
+    type=float,
+    default=0.01,
+    help="False positive rate",
+)
+def tiles_filter(output, input, catalog_path, scene_list, error_rate):
+    """Write the bloom filter of the tiles with data (search.tiles_filter).
+
+    Tiles are read from search results or crawler output (JSON lines), a
+    catalog and/or the Landsat-8 scene_list.
+    """
+    records = (json.loads(line) for line in input if line.strip()) if input else []
+    tiles_catalog = Catalog(catalog_path) if catalog_path else None
+    index = SceneList() if scene_list else None
+    try:
+        bloom = build_tiles_filter(
+            records, catalog=tiles_catalog, index=index, error_rate=error_rate)
+    finally:
+        if tiles_catalog is not None:
+            tiles_catalog.close()
+
+    bloom.save(output)
+    click.echo(f"Tiles filter of {bloom.size} bits written to {output}", err=True)
+
+
+@awssat.command(name="scenes")
+@click.argument("scene_ids", nargs=-1)
+@click.option(
+    "--level",
+    type=click.Choice(['l1c', 'l2a']),
+    default='l1c',
+    help="Sentinel-2 level",
+)
+@click.option(
+    "--full/--simple",
+    default=True,
+    help="full"
+)
+def scenes(scene_ids, level, full):
+    """Get scenes from their ids (arguments or stdin lines)."""
+    if not scene_ids:
+        stdin = click.get_text_stream("stdin")
+        scene_ids = [line.strip() for line in stdin if line.strip()]
+
+    for scene in search.get_scenes(list(scene_ids), full=full, level=level):
+        click.echo(json.dumps(scene))
+
+
+@awssat.command(name="crawl")
+@click.argument("sensor", type=click.Choice(crawler.sensors))
+@click.argument("outdir", type=click.Path(file_okay=False))
+@click.option(
+    "--shard",
+    "shards",
+    multiple=True,
+    help="Shard to crawl (e.g sentinel2-22 or landsat-178), default to all",
+)
+@click.option(
+    "--processes",
+    type=int,
+    default=None,
+    help="Number of processes (default to CPU count)",
+)
+@click.option(
+    "--level",
+    type=click.Choice(['l1c', 'l2a']),
+    default='l1c',
+    help="Sentinel-2 level",
+)
+@click.option(
+    "--full/--simple",
+    default=True,
+    help="full"
+)
+def crawl(sensor, outdir, shards, processes, level, full):
+    """Crawl a full archive into sharded JSON lines files (resumable)."""
+    for summary in crawler.crawl(
+        sensor, outdir, shards=list(shards), processes=processes, full=full, level=level
+    ):
+        click.echo(json.dumps(summary), err=True)
+
+
+@awssat.command(name="stats")
+@click.argument("input", type=click.File("r"), default="-")
+@click.option(
+    "--max-cloud",
+    type=float,
+    default=10,
+    help="Maximum cloud coverage of a cloud free scene",
+)
+def stats(input, max_cloud):
+    """Per-tile revisit and cloud statistics of search results (JSON lines)."""
+    try:
+        from aws_sat_api import stats as tile_stats
+    except ImportError:
+        raise click.ClickException(
+            "numpy is required, install with: pip install aws-sat-api[stats]"
+        )
+
+    records = (json.loads(line) for line in input if line.strip())
+    table = tile_stats.load(records)
+    for tile in tile_stats.summary(table, max_cloud=max_cloud):
+        click.echo(json.dumps(tile))
+
+
+@awssat.command(name="warm")
+@click.argument("aoi", type=click.File("r"), default="-")
+@click.option(
+    "--cache",
+    "cache_url",
+    type=str,
+    default="memory://",
+    help="Cache backend url (file:// or redis://, memory:// is lost on exit)",
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=8,
+    help="Number of tiles searched at once",
+)
+@click.option(
+    "--rate",
+    type=float,
+    default=None,
+    help="Maximum S3 requests per second",
+)
+@click.option(
+    "--level",
+    type=click.Choice(['l1c', 'l2a']),
+    default='l1c',
+    help="Sentinel-2 level",
+)
+@click.option(
+    "--full/--simple",
+    default=True,
+    help="full"
+)
+def warm(aoi, cache_url, concurrency, rate, level, full):
+    """Pre-populate the cache with the tiles of an AOI list (e.g sentinel2:22KHV).
+
+    Only shared backends (file:// or redis://) outlive the command, the default
+    memory:// cache is dropped when it exits (e.g to measure the requests sent).
+    """
+    try:
+        aws.cache = cache.from_url(cache_url)
+        if cache_url.startswith('memory://'):
+            click.echo(
+                "memory:// cache is lost on exit, use a file:// or redis:// cache",
+                err=True,
+            )
+        tiles = cache_warm.read_aoi(aoi)
+        for progress in cache_warm.warm(
+                tiles, full=full, level=level, concurrency=concurrency, rate=rate):
+            click.echo(json.dumps(progress), err=True)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+
+
+@awssat.command(name="previews")
+@click.argument("outdir", type=click.Path(file_okay=False))
+@click.argument("input", type=click.File("r"), default="-")
+@click.option(
+    "--field",
+    "fields",
+    type=click.Choice(preview_images.preview_fields),
+    multiple=True,
+    help="Preview to download (default to all)",
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=32,
+    help="Number of concurrent downloads",
+)
+@click.option(
+    "--retries",
+    type=int,
+    default=3,
+    help="Retries per download",
+)
+def previews(outdir, input, fields, concurrency, retries):
+    """Download the previews of search results (JSON lines)."""
+    records = (json.loads(line) for line in input if line.strip())
+    store = preview_images.DirectoryStore(outdir)
+    counts = {'downloaded': 0, 'skipped': 0, 'error': 0}
+    for result in preview_images.download(
+        records,
+        store,
+        fields=list(fields) or None,
+        concurrency=concurrency,
+        retries=retries,
+    ):
+        counts[result['status']] += 1
+        if result['status'] == 'error':
+            click.echo(json.dumps(result), err=True)
+    click.echo(json.dumps(counts), err=True)
+
+
+@awssat.command(name="assets")
+@click.argument("outdir", type=click.Path(file_okay=False))
+@click.argument("input", type=click.File("r"), default="-")
+@click.option(
+    "--band",
+    "bands",
+    multiple=True,
+    help="Band to download (e.g B4, B8A or 6 for CBERS), default to all",
+)
+@click.option(
+    "--level",
+    type=click.Choice(["l1c", "l2a"]),
+    default="l1c",
+    help="Sentinel 2 processing level of the single level records",
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=16,
+    help="Number of concurrent range requests",
+)
+@click.option(
+    "--part-size",
+    type=int,
+    default=8,
+    help="Range size in MB",
+)
+def assets(outdir, input, bands, level, concurrency, part_size):
+    """Download the band files of search results (JSON lines)."""
+    records = (json.loads(line) for line in input if line.strip())
+    objects = [
+        asset for record in records
+        for asset in band_assets.expand(record, bands=list(bands) or None, level=level)]
+    counts = {'downloaded': 0, 'skipped': 0, 'error': 0}
+    for result in band_assets.download(
+        objects, outdir, concurrency=concurrency, part_size=part_size * 1024 * 1024
+    ):
+        counts[result['status']] += 1
+        if result['status'] == 'error':
+            click.echo(json.dumps(result), err=True)
+    click.echo(json.dumps(counts), err=True)
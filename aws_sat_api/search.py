@@ -2,26 +2,293 @@
 
 import os
 import json
+import time
+import heapq
 import itertools
+import threading
+import contextvars
 from functools import partial
+from contextlib import contextmanager, nullcontext
 from concurrent import futures
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Union
 
-from boto3.session import Session as boto3_session
+from aws_sat_api import utils, aws, geometry, lazy, tracing
+from aws_sat_api.errors import RequestBudgetExceeded
+from aws_sat_api.throttle import RequestBudget
 
-from aws_sat_api import utils, aws
+max_worker = int(os.environ.get('MAX_WORKER', 50))
+sealed_after_days = int(os.environ.get('SEALED_AFTER_DAYS', 7))
+# Serializes the read-merge-write of sealed query cache entries.
+_sealed_lock = threading.Lock()
 
-region = os.environ.get('AWS_REGION', 'us-east-1')
-max_worker = os.environ.get('MAX_WORKER', 50)
+# Bloom filter (`cache.BloomFilter`) of the tiles with data, keyed as
+# 'landsat:{path}/{row}', 'sentinel2:{utm}{lat}{grid}' or 'cbers:{sensor}/{path}/{row}'.
+# Searches on other tiles return without any request.
+tiles_filter = None
+
+# Long-lived thread pool (`concurrent.futures.ThreadPoolExecutor`) used by every
+# search instead of a pool per call (e.g kept warm across Lambda invocations).
+executor = None
 
 landsat_bucket = 'landsat-pds'
 cbers_bucket = 'cbers-meta-pds'
 sentinel_bucket = 'sentinel-s2'
 
+# Band whose XML document holds the scene metadata, for each CBERS-4 sensor.
+cbers_metadata_band = {'MUX': 6, 'AWFI': 14, 'PAN5M': 1, 'PAN10M': 4}
+
+
+# Sources of each output field, from the cheapest to the most expensive:
+# 'key' (parsed from the scene id or path), 'grid' (computed from the tile),
+# 'index' (Landsat scene_list index, bounding box geometry) and 'metadata'
+# (per-scene GET).
+field_sources = {
+    'landsat': {
+        'key': [
+            'scene_id', 'satellite', 'sensor', 'path', 'row', 'acquisition_date', 'key',
+            'browseURL', 'thumbURL', 'category', 'collection', 'correction_level',
+            'ingestion_date', 'acquisitionYear', 'acquisitionJulianDay',
+            'groundStationIdentifier', 'archiveVersion'],
+        'index': ['cloud_coverage', 'geometry'],
+        'metadata': [
+            'cloud_coverage', 'cloud_coverage_land', 'sun_azimuth', 'sun_elevation',
+            'geometry']},
+    'sentinel2': {
+        'key': [
+            'path', 'utm_zone', 'latitude_band', 'grid_square', 'num',
+            'acquisition_date', 'browseURL'],
+        'grid': ['geometry'],
+        'metadata': ['sat', 'scene_id', 'coverage', 'cloud_coverage']},
+    'cbers': {
+        'key': [
+            'scene_id', 'satellite', 'version', 'sensor', 'path', 'row',
+            'acquisition_date', 'processing_level', 'key', 'browseURL', 'thumbURL'],
+        'metadata': ['cloud_coverage', 'sun_azimuth', 'sun_elevation', 'geometry']}}
+
+
+# Fields fetched on access by lazy records (see `lazy.LazyRecord`).
+lazy_fields = {
+    'landsat': [
+        'cloud_coverage', 'cloud_coverage_land', 'sun_azimuth', 'sun_elevation',
+        'geometry'],
+    'sentinel2': ['coverage', 'cloud_coverage', 'geometry'],
+    'cbers': ['cloud_coverage', 'sun_azimuth', 'sun_elevation', 'geometry']}
+
+
+def plan_fields(sensor, fields, index=None):
+    """Return the cheapest source of each requested field.
+
+    :param sensor: 'landsat', 'sentinel2' or 'cbers'.
+    :param fields: Output fields.
+    :param index: Landsat scene_list index, if available.
+    """
+    sources = field_sources[sensor]
+    plan = {}
+    for field in fields:
+        for source in ['key', 'grid', 'index', 'metadata']:
+            if source == 'index' and index is None:
+                continue
+            if field in sources.get(source, []):
+                plan[field] = source
+                break
+        else:
+            raise ValueError(f'Invalid {sensor} field: {field}')
+
+    return plan
+
+
+def _project(record, fields):
+    """Keep the requested fields (and the scene status) of a record."""
+    keep = set(fields) | {'status', 'error', 'levels'}
+    projected = {k: v for k, v in record.items() if k in keep}
+    if 'levels' in projected:
+        projected['levels'] = {
+            level: {k: v for k, v in info.items() if k in keep}
+            for level, info in projected['levels'].items()}
+    return projected
+
+
+def _lazy_records(sensor, records, fetch):
+    """Return lazy records sharing one loader (see `lazy`)."""
+    loader = lazy.Loader(fetch, max_workers=max_worker, executor=executor)
+    return [lazy.LazyRecord(record, loader, lazy_fields[sensor]) for record in records]
+
+
+def _check_lazy(lazy, fields):
+    """Check that the lazy option is used with simple records."""
+    if lazy and fields is not None:
+        raise ValueError('The lazy and fields options are exclusive.')
+
+
+def _catalog_lookup(catalog, sensor, tile, fields, **kwargs):
+    """Return the catalog records of a tile, keeping the requested fields."""
+    results = catalog.lookup(sensor, tile, **kwargs)
+    if fields is not None:
+        results = [_project(r, fields) for r in results]
+    return results
+
+
+def _may_exist(sensor, tile):
+    """Check if a tile may have data according to `tiles_filter`."""
+    return tiles_filter is None or f'{sensor}:{tile}' in tiles_filter
+
+
+def _scene_error(key, err):
+    """Return a machine-readable error for a failed metadata fetch."""
+    return {'key': key, 'type': type(err).__name__, 'message': str(err)}
+
+
+def _scene_status(err):
+    """Return the status of a scene whose metadata fetch failed."""
+    return 'budget' if isinstance(err, RequestBudgetExceeded) else 'error'
+
+
+def _list_directory(bucket, prefix, **kwargs):
+    """List a prefix, or return nothing once the request budget is used up.
+
+    The budget counts the refused request (see `_rejected`), the search results
+    are then partial and never sealed.
+    """
+    try:
+        return aws.list_directory(bucket, prefix, **kwargs)
+    except RequestBudgetExceeded:
+        return []
+
+
+@contextmanager
+def _pool(max_workers, deadline=None):
+    """Thread pool which does not wait for calls still running after a deadline.
+
+    The shared `executor` is used when set, and never shut down.
+    """
+    if executor is not None:
+        yield executor
+        return
+
+    pool = futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        yield pool
+    finally:
+        pool.shutdown(wait=deadline is None)
+
+
+def _submit(executor, func, *args):
+    """Submit a call running in a copy of the current context (e.g the budget)."""
+    return executor.submit(contextvars.copy_context().run, func, *args)
+
+
+def _budget(max_requests):
+    """Return the request budget scope of a search (`max_requests` at most)."""
+    if max_requests is None:
+        return nullcontext()
+    return aws.search_budget(RequestBudget(max_requests))
+
+
+def _rejected():
+    """Return the number of requests refused by the current request budget."""
+    budget = aws.current_budget()
+    return budget.rejected if budget is not None else 0
+
+
+def _map(executor, func, items, deadline=None, on_timeout=None):
+    """Map func over items and return the results in order.
+
+    When a deadline (`_Deadline`) is set, calls not completed by then are
+    cancelled and replaced by `on_timeout(item)`, or dropped if it is None (the
+    deadline is then marked `dropped`). Nothing is submitted once the deadline
+    has passed.
+    """
+    items = list(items)
+    if _timed_out(deadline):
+        return _expired(items, deadline, on_timeout)
+
+    fs = [_submit(executor, func, item) for item in items]
+    if deadline is None:
+        return [f.result() for f in fs]
+
+    futures.wait(fs, timeout=_remaining(deadline))
+
+    results = []
+    for item, f in zip(items, fs):
+        if f.done():
+            results.append(f.result())
+        else:
+            f.cancel()
+            results.extend(_expired([item], deadline, on_timeout))
+
+    return results
+
+
+def _expired(items, deadline, on_timeout):
+    """Return `on_timeout(item)` for items not completed by a deadline, or drop them."""
+    if on_timeout is not None:
+        return [on_timeout(item) for item in items]
+    if items:
+        deadline.dropped = True
+    return []
+
+
+class _Deadline(object):
+    """Search deadline (time.monotonic() value), `dropped` once calls were dropped."""
+
+    def __init__(self, timeout):
+        self.time = time.monotonic() + timeout
+        self.dropped = False
+
+
+class SearchResults(list):
+    """Search records, `partial` when the timeout or request budget dropped listings."""
+
+    def __init__(self, records=(), partial=False):
+        """Initialize results."""
+        super().__init__(records)
+        self.partial = partial
+
+
+def _deadline(timeout):
+    """Return the deadline for a timeout in seconds."""
+    return _Deadline(timeout) if timeout is not None else None
+
+
+def _remaining(deadline):
+    """Return the seconds left before a deadline (None without deadline)."""
+    return max(0, deadline.time - time.monotonic()) if deadline is not None else None
+
+
+def _timed_out(deadline):
+    """Check if a deadline has passed."""
+    return deadline is not None and time.monotonic() >= deadline.time
+
+
+def _results(records, deadline, rejected):
+    """Return the records of a search, partial if listings were dropped.
+
+    :param deadline: Search deadline, marked when it dropped listings.
+    :param rejected: Requests refused by the budget when the search started.
+    """
+    dropped = deadline is not None and deadline.dropped
+    return SearchResults(records, partial=dropped or _rejected() > rejected)
+
+
+def _is_partial(results):
+    """Check if search results are partial (see `SearchResults`)."""
+    return getattr(results, 'partial', False)
+
+
+def _is_complete(record):
+    """Check that neither the record nor its levels failed or timed out."""
+    levels = record.get('levels', {}).values()
+    return 'status' not in record and all('status' not in level for level in levels)
+
 
 def get_s2_info(bucket, scene_path, full=False, s3=None, request_pays=False):
-    """Return Sentinel metadata."""
+    """Return Sentinel metadata.
+
+    If the tileInfo.json fetch fails, `status` is set to 'error' and `error`
+    describes the failure.
+    It is set to 'budget' when the request budget (`aws.request_budget`) is used up.
+    """
     scene_info = scene_path.split('/')
 
     year = scene_info[4]
@@ -55,14 +322,19 @@ def get_s2_info(bucket, scene_path, full=False, s3=None, request_pays=False):
             info['coverage'] = data.get('dataCoveragePercentage')
             info['cloud_coverage'] = data.get('cloudyPixelPercentage')
             info['scene_id'] = f'{sat_name}_tile_{acquisition_date}_{utm}{latitude_band}{grid_square}_{num}'
-        except:
-            print(f'Could not get info from {scene_path}tileInfo.json')
+        except Exception as err:
+            info['status'] = _scene_status(err)
+            info['error'] = _scene_error(f'{scene_path}tileInfo.json', err)
 
     return info
 
 
-def get_l8_info(scene_id, full=False, s3=None):
-    """Return Landsat-8 metadata."""
+def get_l8_info(scene_id, full=False, s3=None, anonymous=False):
+    """Return Landsat-8 metadata.
+
+    If the MTL fetch fails, `status` is set to 'error' and `error` describes the failure.
+    It is set to 'budget' when the request budget (`aws.request_budget`) is used up.
+    """
     info = utils.landsat_parse_scene_id(scene_id)
     aws_url = f'https://{landsat_bucket}.s3.amazonaws.com'
     scene_key = info["key"]
@@ -71,7 +343,7 @@ def get_l8_info(scene_id, full=False, s3=None):
 
     if full:
         try:
-            data = json.loads(aws.get_object(landsat_bucket, f'{scene_key}_MTL.json', s3=s3))
+            data = json.loads(aws.get_object(landsat_bucket, f'{scene_key}_MTL.json', s3=s3, anonymous=anonymous))
             image_attr = data['L1_METADATA_FILE']['IMAGE_ATTRIBUTES']
             prod_meta = data['L1_METADATA_FILE']['PRODUCT_METADATA']
 
@@ -88,73 +360,542 @@ def get_l8_info(scene_id, full=False, s3=None):
                     [prod_meta['CORNER_LR_LON_PRODUCT'], prod_meta['CORNER_LR_LAT_PRODUCT']],
                     [prod_meta['CORNER_UR_LON_PRODUCT'], prod_meta['CORNER_UR_LAT_PRODUCT']]
                 ]]}
-        except:
-            print(f'Could not get info from {scene_key}_MTL.json')
+        except Exception as err:
+            info['status'] = _scene_status(err)
+            info['error'] = _scene_error(f'{scene_key}_MTL.json', err)
+
+    return info
+
+
+def _sealed_date():
+    """Return the last acquisition date (YYYYMMDD) considered immutable."""
+    sealed = datetime.now(timezone.utc) - timedelta(days=sealed_after_days)
+    return sealed.strftime('%Y%m%d')
+
+
+def _sealed_search(cache, key, start, end, search_func, deadline=None):
+    """Serve the sealed part of a date range from cache and search the recent tail.
+
+    Archives are append-only, acquisitions older than `sealed_after_days` never
+    change. They are cached permanently and only the days after are searched again.
+
+    :param cache: Cache backend.
+    :param key: Query cache key.
+    :param start: Start date (datetime.date).
+    :param end: End date (datetime.date).
+    :param search_func: Function returning the scenes between two dates.
+    :param deadline: Search deadline, partial results (or cut by the request
+        budget) are never cached.
+    """
+    start_str = start.strftime('%Y%m%d')
+    sealed_str = min(end.strftime('%Y%m%d'), _sealed_date())
+    if sealed_str < start_str:
+        return list(search_func(start, end))
+
+    sealed_end = datetime.strptime(sealed_str, '%Y%m%d').date()
+    rejected = _rejected()
+
+    entry = cache.get(key)
+    if entry and entry['start'] <= start_str and sealed_str <= entry['end']:
+        results = [
+            r for r in entry['records']
+            if start_str <= r['acquisition_date'] <= sealed_str]
+        if sealed_end < end:
+            results.extend(search_func(sealed_end + timedelta(days=1), end))
+        return results
+
+    results = list(search_func(start, end))
+    records = [r for r in results if r['acquisition_date'] <= sealed_str]
+    complete = all(_is_complete(r) for r in records)
+    if _timed_out(deadline) or _rejected() > rejected or not complete:
+        return results
+
+    with _sealed_lock:
+        # Read again, a concurrent search may have sealed a range meanwhile.
+        entry = cache.get(key)
+        if entry and entry['start'] <= sealed_str and start_str <= entry['end']:
+            # Overlapping ranges, extend the sealed interval.
+            merged = {r['scene_id']: r for r in entry['records'] + records}
+            records = sorted(merged.values(), key=lambda r: r['acquisition_date'])
+            start_str = min(start_str, entry['start'])
+            sealed_str = max(sealed_str, entry['end'])
+
+        cache.set(key, {'start': start_str, 'end': sealed_str, 'records': records})
+    return results
+
+
+def get_l8_index_info(scene, full=False):
+    """Return Landsat-8 metadata from a scene_list index entry.
+
+    In full mode, the cloud coverage comes from the index and the geometry
+    is the scene bounding box. The index has no sun angles nor land cloud
+    coverage, so these records are flagged `partial` (request those `fields`
+    to have them read from the MTL).
+    """
+    info = get_l8_info(scene['scene_id'])
+    if full:
+        xmin, ymin, xmax, ymax = scene['bbox']
+        info['partial'] = True
+        info['cloud_coverage'] = scene['cloud_coverage']
+        info['geometry'] = {
+            'type': 'Polygon',
+            'coordinates': [[
+                [xmax, ymax], [xmin, ymax], [xmin, ymin], [xmax, ymin], [xmax, ymax]]]}
 
     return info
 
 
-def landsat(path, row, full=False):
-    """Get Landsat scenes."""
+def landsat(path, row, full=False, anonymous=False, cache=None, timeout=None,
+            index=None, catalog=None, fields=None, lazy=False, max_requests=None):
+    """Get Landsat scenes.
+
+    `landsat-pds` is a public bucket, set `anonymous=True` to use unsigned requests.
+
+    When a cache backend is given, metadata of scenes acquired more than
+    `sealed_after_days` ago are cached permanently and only new scenes are fetched.
+
+    When `timeout` (in seconds) is reached, outstanding requests are cancelled and
+    the scenes whose metadata were not fetched are returned with status 'timeout'.
+    Listings not completed in time are dropped and the results (`SearchResults`)
+    are flagged `partial`.
+
+    When a scene_list index (`aws_sat_api.scene_list.SceneList`) is given, the
+    indexed scenes are served from it without metadata requests. The path/row
+    prefixes are only listed, to find the scenes newer than the index, once it is
+    older than `max_age`; it is then refreshed in the background, searches never
+    wait for the scene list download. Indexed
+    scenes have a bounding box geometry and no sun angles nor land cloud
+    coverage, they are flagged `partial` (see `get_l8_index_info`).
+
+    When a catalog (`aws_sat_api.catalog.Catalog`) is given, the scenes are read
+    from it and no request is sent.
+
+    When `fields` is set, only those fields are returned and metadata are only
+    fetched if a field cannot be read from the scene id or the index
+    (see `plan_fields`).
+
+    When `lazy` is set, simple records are returned and the MTL of a scene is only
+    fetched when one of its metadata fields is accessed (see `lazy.LazyRecord`).
+
+    With `max_requests`, the search sends at most that many S3 requests (see
+    `throttle.RequestBudget`). Scenes over the budget get status 'budget' and
+    the results are flagged `partial` if a listing was dropped.
+    """
+    _check_lazy(lazy, fields)
     path = utils.zeroPad(path, 3)
     row = utils.zeroPad(row, 3)
+    deadline = _deadline(timeout)
+
+    if fields is not None:
+        sources = set(plan_fields('landsat', fields, index=index).values())
+        if 'metadata' in sources:
+            full, index = True, None
+        else:
+            full = 'index' in sources
+
+    if catalog is not None:
+        return _catalog_lookup(catalog, 'landsat', f'{path}/{row}', fields)
+
+    if not _may_exist('landsat', f'{path}/{row}'):
+        return []
+
+    with _budget(max_requests):
+        rejected = _rejected()
+        results = _landsat_scenes(
+            path, row, full and not lazy, anonymous, cache, deadline, index)
+        if fields is not None:
+            results = [_project(r, fields) for r in results]
+        elif lazy:
+            results = _lazy_records(
+                'landsat', results,
+                lambda r: get_l8_info(r['scene_id'], full=True, anonymous=anonymous))
+        return _results(results, deadline, rejected)
+
 
-    levels = ['L8', 'c1/L8']
-    prefixes = [f'{l}/{path}/{row}/' for l in levels]
+def _l8_metadata_keys(scene_ids, full):
+    """Return the cache keys of the scenes MTL (none in simple mode)."""
+    if not full:
+        return []
+    keys = [utils.landsat_parse_scene_id(scene_id)['key'] for scene_id in scene_ids]
+    return [aws.object_key(landsat_bucket, f'{key}_MTL.json') for key in keys]
 
-    # WARNING: This is fast but not thread safe
-    session = boto3_session(region_name=region)
-    s3 = session.client('s3')
 
-    _ls_worker = partial(aws.list_directory, landsat_bucket, s3=s3)
-    with futures.ThreadPoolExecutor(max_workers=2) as executor:
-        results = executor.map(_ls_worker, prefixes)
+def _loaded_index(index):
+    """Return the scene_list index if loaded, None otherwise (see `SceneList.prepare`)."""
+    return index if index is not None and index.prepare() else None
+
+
+def _landsat_scenes(path, row, full, anonymous, cache, deadline, index):
+    """List Landsat path/row and return the scenes metadata.
+
+    The path/row is not listed while the index is fresh. An index not loaded yet
+    is not used, it is loaded in the background.
+    """
+    index = _loaded_index(index)
+    prefixes = []
+    if index is None or not index.fresh:
+        prefixes = [f'{collection}/{path}/{row}/' for collection in ['L8', 'c1/L8']]
+
+    _ls_worker = partial(_list_directory, landsat_bucket, anonymous=anonymous)
+    listing_keys = [aws.listing_key(landsat_bucket, prefix) for prefix in prefixes]
+    with tracing.span('landsat.list', path=path, row=row), \
+            _pool(2, deadline) as executor, aws.prefetch(listing_keys):
+        results = _map(executor, _ls_worker, prefixes, deadline=deadline)
         results = itertools.chain.from_iterable(results)
 
     scene_ids = [os.path.basename(key.strip('/')) for key in results]
 
-    _info_worker = partial(get_l8_info, full=full, s3=s3)
-    with futures.ThreadPoolExecutor(max_workers=max_worker) as executor:
-        results = executor.map(_info_worker, scene_ids)
+    indexed = []
+    if index is not None:
+        indexed = index.lookup(path, row, refresh=False)
+        known = set(s['scene_id'] for s in indexed)
+        scene_ids = [scene_id for scene_id in scene_ids if scene_id not in known]
+        indexed = [get_l8_index_info(scene, full=full) for scene in indexed]
 
-    return results
+    _info_worker = partial(get_l8_info, full=full, anonymous=anonymous)
+
+    def _on_timeout(scene_id):
+        return dict(get_l8_info(scene_id), status='timeout')
+
+    if cache is None:
+        with tracing.span('landsat.info', scenes=len(scene_ids)), \
+                _pool(max_worker, deadline) as executor, \
+                aws.prefetch(_l8_metadata_keys(scene_ids, full)):
+            results = _map(executor, _info_worker, scene_ids,
+                           deadline=deadline, on_timeout=_on_timeout)
+
+        return indexed + results
+
+    key = f'landsat:{path}-{row}:{int(full)}'
+    sealed = cache.get(key, {})
+    missing = [scene_id for scene_id in scene_ids if scene_id not in sealed]
+    with tracing.span('landsat.info', scenes=len(missing)), \
+            _pool(max_worker, deadline) as executor, \
+            aws.prefetch(_l8_metadata_keys(missing, full)):
+        fetched = _map(executor, _info_worker, missing,
+                       deadline=deadline, on_timeout=_on_timeout)
+        fetched = dict(zip(missing, fetched))
+
+    sealed_str = _sealed_date()
+    new_sealed = {
+        scene_id: info for scene_id, info in fetched.items()
+        if info['acquisition_date'] <= sealed_str and _is_complete(info)}
+    if new_sealed:
+        cache.set(key, {**sealed, **new_sealed})
+
+    return indexed + [
+        sealed.get(scene_id) or fetched[scene_id] for scene_id in scene_ids]
+
+
+def get_cbers_info(scene_id, full=False, s3=None):
+    """Return CBERS metadata.
+
+    If the metadata fetch fails, `status` is set to 'error' and `error` describes the failure.
+    It is set to 'budget' when the request budget (`aws.request_budget`) is used up.
+    """
+    info = utils.cbers_parse_scene_id(scene_id)
+    scene_key = info["key"]
+    preview_id = '_'.join(scene_id.split('_')[0:-1])
+    info['thumbURL'] = f'https://s3.amazonaws.com/{cbers_bucket}/{scene_key}/{preview_id}_small.jpeg'
+    info['browseURL'] = f'https://s3.amazonaws.com/{cbers_bucket}/{scene_key}/{preview_id}.jpg'
+
+    if full:
+        band = cbers_metadata_band[info['sensor']]
+        try:
+            data = utils.cbers_parse_metadata(
+                aws.get_object(cbers_bucket, f'{scene_key}/{scene_id}_BAND{band}.xml', s3=s3))
+
+            info['sun_azimuth'] = data.get('sun_azimuth')
+            info['sun_elevation'] = data.get('sun_elevation')
+            info['cloud_coverage'] = data.get('cloud_coverage')
+            info['geometry'] = {
+                'type': 'Polygon',
+                'coordinates': [[
+                    [data['ur_lon'], data['ur_lat']],
+                    [data['ul_lon'], data['ul_lat']],
+                    [data['ll_lon'], data['ll_lat']],
+                    [data['lr_lon'], data['lr_lat']],
+                    [data['ur_lon'], data['ur_lat']]
+                ]]}
+        except Exception as err:
+            info['status'] = _scene_status(err)
+            info['error'] = _scene_error(f'{scene_key}/{scene_id}_BAND{band}.xml', err)
+
+    return info
 
 
-def cbers(path, row, sensor='MUX'):
+def cbers(path, row, sensor='MUX', full=False, timeout=None, catalog=None, fields=None,
+          lazy=False, max_requests=None):
     """Get CBERS scenes.
 
     Valid values for sensor are: 'MUX', 'AWFI', 'PAN5M' and 'PAN10M'.
+
+    When `timeout` (in seconds) is reached, outstanding requests are cancelled and
+    the scenes whose metadata were not fetched are returned with status 'timeout'.
+
+    When a catalog (`aws_sat_api.catalog.Catalog`) is given, the scenes are read
+    from it and no request is sent.
+
+    When `fields` is set, only those fields are returned and metadata are only
+    fetched if a field cannot be read from the scene id (see `plan_fields`).
+
+    When `lazy` is set, simple records are returned and the metadata of a scene are
+    only fetched when one of its metadata fields is accessed.
+
+    With `max_requests`, the search sends at most that many S3 requests, see `landsat`.
     """
+    _check_lazy(lazy, fields)
     path = utils.zeroPad(path, 3)
     row = utils.zeroPad(row, 3)
+    deadline = _deadline(timeout)
+
+    if fields is not None:
+        full = 'metadata' in plan_fields('cbers', fields).values()
+    full = full and not lazy
 
+    if catalog is not None:
+        return _catalog_lookup(catalog, 'cbers', f'{sensor}/{path}/{row}', fields)
+
+    if not _may_exist('cbers', f'{sensor}/{path}/{row}'):
+        return []
+
+    with _budget(max_requests):
+        rejected = _rejected()
+        results = _cbers_scenes(sensor, path, row, full, deadline)
+        if fields is not None:
+            results = [_project(r, fields) for r in results]
+        elif lazy:
+            results = _lazy_records(
+                'cbers', results, lambda r: get_cbers_info(r['scene_id'], full=True))
+        return _results(results, deadline, rejected)
+
+
+def _cbers_scenes(sensor, path, row, full, deadline):
+    """List CBERS path/row and return the scenes metadata."""
     prefix = f'CBERS4/{sensor}/{path}/{row}/'
 
-    session = boto3_session(region_name=region)
-    s3 = session.client('s3')
+    _ls_worker = partial(_list_directory, cbers_bucket)
+    with tracing.span('cbers.list', prefix=prefix), _pool(1, deadline) as executor:
+        results = _map(executor, _ls_worker, [prefix], deadline=deadline)
+    scene_ids = [
+        os.path.basename(key.strip('/'))
+        for key in itertools.chain.from_iterable(results)]
 
-    results = aws.list_directory(cbers_bucket, prefix, s3=s3)
-    scene_ids = [os.path.basename(key.strip('/')) for key in results]
-    results = []
-    for scene_id in scene_ids:
-        info = utils.cbers_parse_scene_id(scene_id)
-        scene_key = info["key"]
-        preview_id = '_'.join(scene_id.split('_')[0:-1])
-        info['thumbURL'] = f'https://s3.amazonaws.com/{cbers_bucket}/{scene_key}/{preview_id}_small.jpeg'
-        info['browseURL'] = f'https://s3.amazonaws.com/{cbers_bucket}/{scene_key}/{preview_id}.jpg'
-        results.append(info)
+    def _on_timeout(scene_id):
+        return dict(get_cbers_info(scene_id), status='timeout')
+
+    metadata_keys = []
+    if full:
+        band = cbers_metadata_band[sensor]
+        metadata_keys = [
+            aws.object_key(cbers_bucket, f'{prefix}{scene_id}/{scene_id}_BAND{band}.xml')
+            for scene_id in scene_ids]
+
+    _info_worker = partial(get_cbers_info, full=full)
+    with tracing.span('cbers.info', scenes=len(scene_ids)), \
+            _pool(max_worker, deadline) as executor, aws.prefetch(metadata_keys):
+        return _map(executor, _info_worker, scene_ids,
+                    deadline=deadline, on_timeout=_on_timeout)
+
+
+def _list_stage(executor, dirs, request_pays=False, deadline=None):
+    """List (bucket, prefix) pairs and return the (bucket, sub-directory) pairs.
+
+    Listings not completed by the deadline are dropped.
+    """
+    def _worker(item):
+        bucket, prefix = item
+        listing = _list_directory(bucket, prefix, request_pays=request_pays)
+        return [(bucket, p) for p in listing]
+
+    with aws.prefetch(aws.listing_key(bucket, prefix) for bucket, prefix in dirs):
+        results = _map(executor, _worker, dirs, deadline=deadline)
+    return list(itertools.chain.from_iterable(results))
+
+
+def _sentinel2_scenes(levels, utm, lat, grid, full, start, end, deadline=None):
+    """Walk the Sentinel 2 tiles tree and return the scenes between two dates.
+
+    The buckets of every processing level are traversed together, each stage
+    sharing the same worker pool. Returns a list of (level, scene info) tuples.
+    """
+    request_pays = True
+    buckets = {f'{sentinel_bucket}-{level}': level for level in levels}
+
+    years = range(start.year, end.year + 1)
+    prefixes = [(b, f'tiles/{utm}/{lat}/{grid}/{y}/') for b in buckets for y in years]
+
+    with _pool(max_worker, deadline) as executor:
+        with tracing.span('sentinel2.years', prefixes=len(prefixes)):
+            months_dirs = _list_stage(
+                executor, prefixes, request_pays=request_pays, deadline=deadline)
+
+        # Skip months outside the date interval.
+        months_dirs = [
+            (b, item) for b, item in months_dirs
+            if (start.year, start.month) <= tuple(int(i) for i in item.split("/")[4:6]) <= (end.year, end.month)]
+
+        with tracing.span('sentinel2.months', prefixes=len(months_dirs)):
+            days_dirs = _list_stage(
+                executor, months_dirs, request_pays=request_pays, deadline=deadline)
+
+        # Now, filter by date intervals.
+        selected_days = []
+        for bucket, item in days_dirs:
+            item_date = datetime(*[int(i) for i in item.split("/")[4:7]], tzinfo=timezone.utc)
+            if start <= item_date.date() <= end:
+                selected_days.append((bucket, item))
+
+        with tracing.span('sentinel2.days', prefixes=len(selected_days)):
+            version_dirs = _list_stage(
+                executor, selected_days, request_pays=request_pays, deadline=deadline)
+
+        def _info_worker(item):
+            bucket, scene_path = item
+            info = get_s2_info(
+                bucket, scene_path, full=full, request_pays=request_pays)
+            return buckets[bucket], info
+
+        def _on_timeout(item):
+            bucket, scene_path = item
+            info = dict(get_s2_info(bucket, scene_path), status='timeout')
+            return buckets[bucket], info
+
+        metadata_keys = []
+        if full:
+            metadata_keys = [
+                aws.object_key(b, f'{p}tileInfo.json') for b, p in version_dirs]
+        with tracing.span('sentinel2.info', scenes=len(version_dirs)), \
+                aws.prefetch(metadata_keys):
+            results = _map(executor, _info_worker, version_dirs,
+                           deadline=deadline, on_timeout=_on_timeout)
+
+    return results
+
+
+s2_acquisition_keys = [
+    'sat', 'path', 'utm_zone', 'latitude_band', 'grid_square', 'num',
+    'acquisition_date', 'scene_id']
+
+
+def _sentinel2_join(scenes):
+    """Merge scenes from different processing levels into one record per acquisition.
+
+    The acquisition keys come from a level whose tileInfo.json was read when there is
+    one, the satellite (`sat`, `scene_id`) of the other levels defaults to S2A.
+    """
+    records = {}
+    complete = set()
+    for level, info in scenes:
+        record = records.get(info['path'])
+        if record is None:
+            record = {k: info[k] for k in s2_acquisition_keys}
+            record['levels'] = {}
+            records[info['path']] = record
+        elif info['path'] not in complete:
+            record.update({k: info[k] for k in s2_acquisition_keys})
+
+        if 'status' not in info:
+            complete.add(info['path'])
+
+        record['levels'][level] = {
+            k: v for k, v in info.items() if k not in s2_acquisition_keys}
+
+    return list(records.values())
+
+
+def _sentinel2_levels(level, levels, lazy, fields):
+    """Check the processing levels and lazy option, return the levels to search."""
+    joint = levels is not None
+    levels = levels if joint else [level]
+    if not levels or any(name not in ['l1c', 'l2a'] for name in levels):
+        raise Exception('Sentinel 2 Level must be "l1c" or "l2a"')
+    _check_lazy(lazy, fields)
+    if lazy and joint:
+        raise ValueError('Lazy records are only returned by single level searches.')
+    return levels
+
+
+def _sentinel2_plan(utm, lat, grid, full, fields):
+    """Return the full option needed by the fields.
+
+    The tile geometry is also returned if it is computed from the grid.
+    """
+    if fields is None:
+        return full, None
+
+    plan = plan_fields('sentinel2', fields)
+    tile_geometry = None
+    if plan.get('geometry') == 'grid':
+        tile_geometry = geometry.s2_tile_geometry(utm, lat, grid)
+    return 'metadata' in plan.values(), tile_geometry
+
+
+def _sentinel2_output(results, fields, tile_geometry, lazy, level):
+    """Project the records on the fields, or make them lazy."""
+    if fields is not None:
+        if tile_geometry is not None:
+            results = [dict(r, geometry=tile_geometry) for r in results]
+        return [_project(r, fields) for r in results]
+
+    if lazy:
+        bucket = f'{sentinel_bucket}-{level}'
+        return _lazy_records(
+            'sentinel2', results,
+            lambda r: get_s2_info(bucket, r['path'], full=True, request_pays=True))
 
     return results
 
 
+def _sentinel2_search(levels, joint, utm, lat, grid, full, start_date, end_date,
+                      cache, deadline):
+    """Search the Sentinel 2 tiles tree, through the sealed query cache if given."""
+    def search_func(start, end):
+        with tracing.span('sentinel2', tile=f'{utm}{lat}{grid}',
+                          start=str(start), end=str(end)):
+            scenes = _sentinel2_scenes(
+                levels, utm, lat, grid, full, start, end, deadline=deadline)
+        if joint:
+            return _sentinel2_join(scenes)
+        return [info for _, info in scenes]
+
+    if cache is None:
+        return search_func(start_date.date(), end_date.date())
+
+    # One sealed entry per year, shared with the yearly searches of `search`.
+    level_key = '+'.join(levels)
+    results = []
+    for year_start, year_end in _year_ranges(start_date, end_date):
+        key = f'sentinel2:{utm}{lat}{grid}:{level_key}:{int(full)}:{year_start.year}'
+        results.extend(_sealed_search(
+            cache, key, year_start.date(), year_end.date(), search_func,
+            deadline=deadline))
+    return results
+
+
 def sentinel2(utm: Union[str, int], lat: str, grid: str,
               full: bool=False, level: str='l1c',
-              start_date: datetime=None, end_date: datetime=None):
+              start_date: datetime=None, end_date: datetime=None,
+              cache=None, levels: list=None, timeout: float=None,
+              catalog=None, fields: list=None, lazy: bool=False,
+              max_requests: int=None):
     """Get Sentinel 2 scenes.
 
     The start_date and end_date are optional.
      If no date is defined the function will search images between 2015 and now.
 
+    When a cache backend is given, the sealed part of the date range (older than
+    `sealed_after_days`) is served from cache and only the recent tail is searched.
+
+    When `levels` is set (e.g ['l1c', 'l2a']), all the level buckets are searched in
+    a single traversal and one record is returned per acquisition, with the available
+    levels and their metadata in `levels`.
+
+    When `timeout` is reached, outstanding requests are cancelled and the scenes
+    found so far are returned. Scenes whose metadata were not fetched in time get
+    status 'timeout', failed ones get status 'error' with an `error` description.
+    If listings were dropped, the results (`SearchResults`) are flagged `partial`.
+
     :param utm: Grid zone designator.
     :param lat: Latitude band.
     :param grid: Grid square.
@@ -162,12 +903,19 @@ def sentinel2(utm: Union[str, int], lat: str, grid: str,
     :param level: Processing level ('l1c' or 'l2a').
     :param start_date: Start date in UTC.
     :param end_date: End date in UTC.
+    :param cache: Query cache backend (e.g `aws_sat_api.cache.MemoryCache()`).
+    :param levels: Processing levels to search jointly (overrides `level`).
+    :param timeout: Search timeout in seconds.
+    :param catalog: Catalog backend (`aws_sat_api.catalog.Catalog`),
+        no request is sent.
+    :param fields: Output fields, tileInfo.json is only fetched when needed
+        (see `plan_fields`).
+    :param lazy: Return simple records fetching their tileInfo.json when a metadata
+        field is accessed (see `lazy.LazyRecord`), single level searches only.
+    :param max_requests: Maximum number of S3 requests (see `landsat`).
     """
-    if level not in ['l1c', 'l2a']:
-        raise Exception('Sentinel 2 Level must be "l1c" or "l2a"')
-
-    s2_bucket = f'{sentinel_bucket}-{level}'
-    request_pays = True
+    joint = levels is not None
+    levels = _sentinel2_levels(level, levels, lazy, fields)
 
     start_date = start_date or datetime(2015, 1, 1)
     end_date = end_date or datetime.now(timezone.utc)
@@ -182,41 +930,292 @@ def sentinel2(utm: Union[str, int], lat: str, grid: str,
     if start_date.year < 2015:
         raise ValueError(f"Start date out of range {start_date.year} < 2015.")
 
-    years = range(start_date.year, end_date.year + 1)
-
     utm = str(utm).lstrip('0')
+    deadline = _deadline(timeout)
+
+    full, tile_geometry = _sentinel2_plan(utm, lat, grid, full, fields)
+    full = full and not lazy
+
+    if catalog is not None:
+        return _catalog_lookup(
+            catalog, 'sentinel2', f'{utm}{lat}{grid}', fields,
+            start=start_date.strftime('%Y%m%d'), end=end_date.strftime('%Y%m%d'),
+            level=level, levels=levels if joint else None, full=full)
+
+    if not _may_exist('sentinel2', f'{utm}{lat}{grid}'):
+        return []
+
+    with _budget(max_requests):
+        rejected = _rejected()
+        results = _sentinel2_search(
+            levels, joint, utm, lat, grid, full, start_date, end_date, cache, deadline)
+        results = _sentinel2_output(results, fields, tile_geometry, lazy, level)
+        return _results(results, deadline, rejected)
+
+
+def _scene_worker(scene_id, full=False, level='l1c'):
+    """Return the metadata of a Landsat-8, Sentinel-2 or CBERS scene id."""
+    seed = {'scene_id': scene_id}
+    try:
+        if scene_id.startswith('S2'):
+            meta = utils.sentinel2_parse_scene_id(scene_id)
+            seed['sat'] = meta['sat']
+            bucket = f'{sentinel_bucket}-{level}'
+            info = get_s2_info(bucket, meta['key'], full=full, request_pays=True)
+            if not full or 'status' in info:
+                # the satellite is only read from tileInfo.json, the id knows it too
+                info.update(seed)
+            return info
+
+        if scene_id.startswith('CBERS'):
+            return get_cbers_info(scene_id, full=full)
+
+        return get_l8_info(scene_id, full=full)
+    except Exception as err:
+        return dict(seed, status='error', error=_scene_error(None, err))
+
+
+def _scene_metadata_keys(scene_ids, full, level):
+    """Return the cache keys of the scenes metadata (none in simple mode).
+
+    Invalid ids are skipped, their error is reported by `_scene_worker`.
+    """
+    if not full:
+        return []
 
-    prefixes = [f'tiles/{utm}/{lat}/{grid}/{y}/' for y in years]
+    keys = []
+    for scene_id in scene_ids:
+        try:
+            if scene_id.startswith('S2'):
+                key = utils.sentinel2_parse_scene_id(scene_id)['key']
+                keys.append(aws.object_key(
+                    f'{sentinel_bucket}-{level}', f'{key}tileInfo.json'))
+            elif scene_id.startswith('CBERS'):
+                meta = utils.cbers_parse_scene_id(scene_id)
+                band = cbers_metadata_band[meta['sensor']]
+                keys.append(aws.object_key(
+                    cbers_bucket, f'{meta["key"]}/{scene_id}_BAND{band}.xml'))
+            else:
+                keys.extend(_l8_metadata_keys([scene_id], full))
+        except Exception:
+            continue
+    return keys
 
-    # WARNING: This is fast but not thread safe
-    session = boto3_session(region_name=region)
-    s3 = session.client('s3')
 
-    _ls_worker = partial(aws.list_directory, s2_bucket, s3=s3, request_pays=request_pays)
-    with futures.ThreadPoolExecutor(max_workers=max_worker) as executor:
-        results = executor.map(_ls_worker, prefixes)
-        months_dirs = itertools.chain.from_iterable(results)
+def get_scenes(scene_ids, full=True, level='l1c', timeout=None):
+    """Get scenes metadata from their ids, without listing.
 
-    _ls_worker = partial(aws.list_directory, s2_bucket, s3=s3, request_pays=request_pays)
-    with futures.ThreadPoolExecutor(max_workers=max_worker) as executor:
-        results = executor.map(_ls_worker, months_dirs)
-        # print(list(results))
-        days_dirs = itertools.chain.from_iterable(results)
+    Ids can mix Landsat-8, Sentinel-2 (e.g S2A_tile_20171009_38SNG_1) and CBERS
+    scenes. The metadata keys are derived from the ids and fetched in one batch.
+    Invalid ids, failed or timed out fetches are returned with a `status`.
 
-    # Now, filter by date intervals.
-    selected_days = []
-    for item in days_dirs:
-        item_date = datetime(*[int(i) for i in item.split("/")[4:7]], tzinfo=timezone.utc)
-        if start_date.date() <= item_date.date() <= end_date.date():
-            selected_days.append(item)
+    :param scene_ids: Scene ids.
+    :param full: Fetch scene metadata.
+    :param level: Sentinel 2 processing level ('l1c' or 'l2a').
+    :param timeout: Timeout in seconds.
+    """
+    if level not in ['l1c', 'l2a']:
+        raise Exception('Sentinel 2 Level must be "l1c" or "l2a"')
+
+    deadline = _deadline(timeout)
 
-    _ls_worker = partial(aws.list_directory, s2_bucket, s3=s3, request_pays=request_pays)
-    with futures.ThreadPoolExecutor(max_workers=max_worker) as executor:
-        results = executor.map(_ls_worker, selected_days)
-        version_dirs = itertools.chain.from_iterable(results)
+    def _on_timeout(scene_id):
+        info = _scene_worker(scene_id, level=level)
+        if 'status' not in info:
+            info['status'] = 'timeout'
+        return info
 
-    _info_worker = partial(get_s2_info, s2_bucket, full=full, s3=s3, request_pays=request_pays)
-    with futures.ThreadPoolExecutor(max_workers=max_worker) as executor:
-        results = executor.map(_info_worker, version_dirs)
+    _info_worker = partial(_scene_worker, full=full, level=level)
+    with tracing.span('scenes', scenes=len(scene_ids)), \
+            _pool(max_worker, deadline) as executor, \
+            aws.prefetch(_scene_metadata_keys(scene_ids, full, level)):
+        results = _map(executor, _info_worker, scene_ids,
+                       deadline=deadline, on_timeout=_on_timeout)
 
     return results
+
+
+search_sensors = ['landsat', 'sentinel2', 'cbers']
+
+
+def _year_ranges(start, end):
+    """Split a date range in calendar years."""
+    for year in range(start.year, end.year + 1):
+        yield max(start, datetime(year, 1, 1, tzinfo=timezone.utc)), \
+            min(end, datetime(year, 12, 31, 23, 59, 59, tzinfo=timezone.utc))
+
+
+def _substream(future, tile):
+    """Return the records of a substream.
+
+    They follow an 'error' or 'partial' record if the substream failed or is partial.
+    """
+    try:
+        records = future.result()
+    except Exception as err:
+        return [{'tile': tile, 'status': 'error', 'error': _scene_error(None, err)}]
+    if _is_partial(records):
+        return [{'tile': tile, 'status': 'partial'}] + records
+    return records
+
+
+def _merge(jobs, deadline=None):
+    """Merge sorted substreams in acquisition date order, as they complete.
+
+    `jobs` maps the futures of the substreams to (sensor, lower bound, tile) where
+    the lower bound is the earliest acquisition date (YYYYMMDD) a substream can hold.
+    A record is yielded once no pending substream can hold an earlier one.
+
+    A failed substream is yielded right away as a record with status 'error'
+    (and the `tile` searched), the others go on. Partial substreams are reported
+    with a 'partial' record and the ones not completed by the deadline with a
+    'timeout' record.
+    """
+    pending = dict(jobs)
+    heap = []
+    counter = itertools.count()
+
+    def _push(sensor, records):
+        record = next(records, None)
+        if record is not None:
+            # Error records (no date) come first.
+            date = record.get('acquisition_date', '')
+            heapq.heappush(heap, (date, next(counter), sensor, record, records))
+
+    def _pop():
+        _, _, sensor, record, records = heapq.heappop(heap)
+        _push(sensor, records)
+        return sensor, record
+
+    try:
+        for f in futures.as_completed(list(jobs), timeout=_remaining(deadline)):
+            sensor, _, tile = pending.pop(f)
+            _push(sensor, iter(_substream(f, tile)))
+            bound = min((b for _, b, _ in pending.values()), default=None)
+            while heap and (bound is None or heap[0][0] < bound):
+                yield _pop()
+    except futures.TimeoutError:
+        for sensor, _, tile in pending.values():
+            yield sensor, {'tile': tile, 'status': 'timeout'}
+
+    while heap:
+        yield _pop()
+
+
+def search(sensors, tiles, start_date=None, end_date=None, full=False, level='l1c',
+           cache=None, timeout=None, fields=None, max_requests=None):
+    """Search several sensors and tiles, in acquisition date order.
+
+    The per-sensor searches run concurrently and their sorted results are merged
+    with a heap. Sentinel-2 searches are split by year, so the oldest scenes are
+    yielded while the recent years are still being listed. Landsat-8 and CBERS
+    results are filtered on the date range.
+
+    With `timeout`, all the searches share the same deadline and the ones not
+    completed by then are reported with a record with status 'timeout' and the
+    searched `tile`. Searches with dropped listings (timeout or `max_requests`)
+    are reported with a 'partial' record. A failed search yields a record with
+    status 'error' and the searched `tile`, the other searches go on.
+
+    :param sensors: Sensors to search ('landsat', 'sentinel2', 'cbers').
+    :param tiles: Tiles by sensor, as keyword arguments of the sensor search, e.g
+        {'landsat': [{'path': '178', 'row': '119'}],
+         'sentinel2': [{'utm': 22, 'lat': 'K', 'grid': 'HV'}],
+         'cbers': [{'path': '217', 'row': '063', 'sensor': 'MUX'}]}
+    :param start_date: Start date in UTC.
+    :param end_date: End date in UTC.
+    :param full: Full search.
+    :param level: Sentinel 2 processing level ('l1c' or 'l2a').
+    :param cache: Query cache backend.
+    :param timeout: Search timeout in seconds.
+    :param fields: Output fields (`acquisition_date` is always returned).
+    :param max_requests: Maximum number of S3 requests, shared by all the searches.
+    :returns: Generator of (sensor, record) tuples.
+    """
+    # Validated here rather than in the generator, so errors raise on call.
+    if any(s not in search_sensors for s in sensors):
+        raise ValueError(f'Invalid sensors: {sensors}')
+
+    start_date = (start_date or datetime(2013, 1, 1)).astimezone(timezone.utc)
+    end_date = (end_date or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    if start_date > end_date:
+        raise ValueError("Invalid date range (start_date > end_date).")
+
+    budget = RequestBudget(max_requests) if max_requests is not None else None
+    return _search(sensors, tiles, start_date, end_date, full, level, cache,
+                   timeout, fields, budget)
+
+
+def _search_tasks(sensors, tiles, start_date, end_date, runs):
+    """Return the (sensor, lower bound, run, args) searches of `search`.
+
+    Sentinel-2 tiles are searched per year (see `_year_ranges`), the other
+    sensors once per tile.
+    """
+    start = start_date.strftime('%Y%m%d')
+    tasks = []
+    for sensor in sensors:
+        for tile in tiles.get(sensor, []):
+            if sensor != 'sentinel2':
+                tasks.append((sensor, start, runs[sensor], (tile,)))
+            elif end_date.year >= 2015:
+                s2_start = max(start_date, datetime(2015, 1, 1, tzinfo=timezone.utc))
+                for year_start, year_end in _year_ranges(s2_start, end_date):
+                    bound = year_start.strftime('%Y%m%d')
+                    args = (tile, year_start, year_end)
+                    tasks.append((sensor, bound, runs[sensor], args))
+    return tasks
+
+
+def _with_budget(budget, func, *args):
+    """Run a search with the request budget of `search` (if any)."""
+    if budget is None:
+        return func(*args)
+    with aws.search_budget(budget):
+        return func(*args)
+
+
+def _search(sensors, tiles, start_date, end_date, full, level, cache, timeout,
+            fields, budget):
+    """Run the searches of `search` and merge their results."""
+    start, end = start_date.strftime('%Y%m%d'), end_date.strftime('%Y%m%d')
+    deadline = _deadline(timeout)
+    if fields is not None and 'acquisition_date' not in fields:
+        fields = list(fields) + ['acquisition_date']
+
+    def _landsat(tile):
+        results = landsat(**tile, full=full, cache=cache,
+                          timeout=_remaining(deadline), fields=fields)
+        records = sorted((r for r in results if start <= r['acquisition_date'] <= end),
+                         key=lambda r: r['acquisition_date'])
+        return SearchResults(records, partial=_is_partial(results))
+
+    def _cbers(tile):
+        results = cbers(
+            **tile, full=full, timeout=_remaining(deadline), fields=fields)
+        records = sorted((r for r in results if start <= r['acquisition_date'] <= end),
+                         key=lambda r: r['acquisition_date'])
+        return SearchResults(records, partial=_is_partial(results))
+
+    def _sentinel2(tile, year_start, year_end):
+        results = sentinel2(
+            **tile, full=full, level=level, start_date=year_start, end_date=year_end,
+            cache=cache, timeout=_remaining(deadline), fields=fields)
+        records = sorted(results, key=lambda r: r['acquisition_date'])
+        return SearchResults(records, partial=_is_partial(results))
+
+    tasks = _search_tasks(
+        sensors, tiles, start_date, end_date,
+        {'landsat': _landsat, 'cbers': _cbers, 'sentinel2': _sentinel2})
+    if not tasks:
+        return
+
+    # Not `_pool`: the searches submit their own requests to the shared executor.
+    pool = futures.ThreadPoolExecutor(max_workers=min(len(tasks), max_worker))
+    try:
+        jobs = {
+            _submit(pool, _with_budget, budget, func, *args): (sensor, bound, args[0])
+            for sensor, bound, func, args in tasks}
+        yield from _merge(jobs, deadline=deadline)
+    finally:
+        pool.shutdown(wait=deadline is None)
@@ -0,0 +1,189 @@
+"""Vectorized per-tile temporal statistics over search results.
+
+Records (as returned by `search.landsat`, `search.sentinel2` or `search.cbers`)
+are loaded once in a `Table` of NumPy arrays; every statistic is then computed
+for all the tiles at once with sorts and group reductions (no per-record loop).
+
+Requires numpy (`pip install aws-sat-api[stats]`).
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from aws_sat_api.catalog import record_cloud, record_key
+
+Table = namedtuple('Table', ['tiles', 'tile', 'date', 'cloud'])
+Table.__doc__ = """Search results as arrays.
+
+tiles: tile names (`sensor:tile`, see `tile_name`), tile: index in `tiles`
+for each record, date: acquisition dates (datetime64[D]), cloud: cloud
+coverage (float, NaN when unknown).
+"""
+
+
+def tile_name(record):
+    """Return the tile name of a record (same keys as `search.tiles_filter`)."""
+    return '{}:{}'.format(*record_key(record))
+
+
+def _parse_dates(dates):
+    """Convert YYYYMMDD strings (or integers) to datetime64[D]."""
+    dates = np.asarray(dates).astype(np.int64)
+    years = (dates // 10000 - 1970).astype('datetime64[Y]')
+    months = (dates // 100 % 100 - 1).astype('timedelta64[M]')
+    days = (dates % 100 - 1).astype('timedelta64[D]')
+    return (years + months).astype('datetime64[D]') + days
+
+
+def load(records):
+    """Load search results in a `Table`.
+
+    :param records: Iterable of scene records (need `acquisition_date`,
+        `cloud_coverage` is optional, read from the levels of joint records).
+    """
+    names, dates, clouds = [], [], []
+    for record in records:
+        names.append(tile_name(record))
+        dates.append(record['acquisition_date'])
+        cloud = record_cloud(record)
+        clouds.append(np.nan if cloud is None else cloud)
+
+    tiles, tile = np.unique(np.array(names, dtype=str), return_inverse=True)
+    return Table(
+        tiles=tiles,
+        tile=tile.astype(np.int64).ravel(),
+        date=_parse_dates(np.array(dates, dtype=str)),
+        cloud=np.array(clouds, dtype=np.float64))
+
+
+def _sort_groups(groups, values):
+    """Sort (group, value) pairs by group then value.
+
+    Pairs are packed in a single int64 key (group, value rank), which sorts an
+    order of magnitude faster than `np.lexsort`.
+    """
+    uniques, ranks = np.unique(values, return_inverse=True)
+    size = max(len(uniques), 1)
+    keys = np.sort(groups.astype(np.int64) * size + ranks.ravel())
+    return keys // size, uniques[keys % size]
+
+
+def _group_quantiles(groups, values, ngroups, q):
+    """Linear interpolated quantiles of values for each group.
+
+    Returns a (ngroups, len(q)) array, NaN for empty groups.
+    """
+    groups, values = _sort_groups(groups, values)
+    starts = np.searchsorted(groups, np.arange(ngroups))
+    counts = np.bincount(groups, minlength=ngroups)
+
+    q = np.asarray(q, dtype=np.float64)
+    pos = starts[:, None] + q[None, :] * np.maximum(counts - 1, 0)[:, None]
+    if not len(values):
+        return np.full(pos.shape, np.nan)
+
+    lower = np.clip(np.floor(pos).astype(np.int64), 0, len(values) - 1)
+    upper = np.clip(np.ceil(pos).astype(np.int64), 0, len(values) - 1)
+    result = values[lower] + (values[upper] - values[lower]) * (pos - np.floor(pos))
+    result[counts == 0] = np.nan
+    return result
+
+
+def _intervals(tile, date):
+    """Return the tile and length (days) of the intervals between unique dates."""
+    tile, date = _sort_groups(tile, date.astype(np.int64))
+    same = tile[1:] == tile[:-1]
+    gaps = np.diff(date)[same]
+    # Several scenes of a tile on the same day (e.g granules) are one revisit.
+    keep = gaps > 0
+    return tile[1:][same][keep], gaps[keep]
+
+
+def revisit(table):
+    """Revisit statistics per tile.
+
+    Returns a dict of arrays (one value per tile): count (unique acquisition
+    days), first, last, mean and median revisit interval (days).
+    """
+    ntiles = len(table.tiles)
+    tile, gaps = _intervals(table.tile, table.date)
+    intervals = np.bincount(tile, minlength=ntiles)
+
+    dates = table.date.astype(np.int64)
+    first = np.full(ntiles, np.iinfo(np.int64).max)
+    last = np.full(ntiles, np.iinfo(np.int64).min)
+    np.minimum.at(first, table.tile, dates)
+    np.maximum.at(last, table.tile, dates)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(intervals > 0, (last - first) / intervals, np.nan)
+
+    return {
+        'count': intervals + 1,
+        'first': first.astype('datetime64[D]'),
+        'last': last.astype('datetime64[D]'),
+        'mean': mean,
+        'median': _group_quantiles(tile, gaps.astype(np.float64), ntiles, [0.5])[:, 0]}
+
+
+def monthly_cloud(table, q=(0.25, 0.5, 0.75)):
+    """Cloud coverage distribution per tile and calendar month.
+
+    Scenes with unknown cloud coverage are ignored.
+
+    Returns a dict of (ntiles, 12) arrays: count, mean and one array per
+    quantile (keyed `p25`, `p50`...).
+    """
+    ntiles = len(table.tiles)
+    valid = ~np.isnan(table.cloud)
+    months = table.date[valid].astype('datetime64[M]').astype(np.int64) % 12
+    groups = table.tile[valid] * 12 + months
+    cloud = table.cloud[valid]
+
+    count = np.bincount(groups, minlength=ntiles * 12)
+    total = np.bincount(groups, weights=cloud, minlength=ntiles * 12)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+
+    quantiles = _group_quantiles(groups, cloud, ntiles * 12, q)
+    stats = {'count': count.reshape(ntiles, 12), 'mean': mean.reshape(ntiles, 12)}
+    for i, value in enumerate(q):
+        stats[f'p{round(value * 100)}'] = quantiles[:, i].reshape(ntiles, 12)
+    return stats
+
+
+def cloud_free_gap(table, max_cloud=10):
+    """Longest interval (days) between cloud free acquisitions, per tile.
+
+    A scene is cloud free when its cloud coverage is <= `max_cloud`.
+    Returns an array of days, NaN for tiles with less than two cloud free days.
+    """
+    clear = table.cloud <= max_cloud
+    tile, gaps = _intervals(table.tile[clear], table.date[clear])
+    longest = np.full(len(table.tiles), -1, dtype=np.int64)
+    np.maximum.at(longest, tile, gaps)
+    return np.where(longest >= 0, longest, np.nan)
+
+
+def summary(table, max_cloud=10):
+    """Yield one JSON serializable dict of statistics per tile."""
+    visits = revisit(table)
+    monthly = monthly_cloud(table)
+    gaps = cloud_free_gap(table, max_cloud=max_cloud)
+
+    def _value(value):
+        value = value.item()
+        return None if isinstance(value, float) and np.isnan(value) else value
+
+    for i, name in enumerate(table.tiles):
+        yield {
+            'tile': str(name),
+            'acquisitions': int(visits['count'][i]),
+            'first': str(visits['first'][i]),
+            'last': str(visits['last'][i]),
+            'revisit_mean': _value(visits['mean'][i]),
+            'revisit_median': _value(visits['median'][i]),
+            'longest_cloud_free_gap': _value(gaps[i]),
+            'monthly_cloud': {
+                key: [_value(v) for v in values[i]] for key, values in monthly.items()}}
@@ -0,0 +1,57 @@
+"""Request rate limiting and budgets."""
+
+import time
+import threading
+
+from aws_sat_api.errors import RequestBudgetExceeded
+
+
+class RateLimiter(object):
+    """Thread safe token bucket, `rate` requests per second with bursts of `burst`."""
+
+    def __init__(self, rate, burst=None):
+        """Initialize limiter with a full bucket."""
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait for a token."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens = self._tokens + (now - self._updated) * self.rate
+                self._tokens = min(self.burst, tokens)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RequestBudget(object):
+    """Thread safe count of the requests allowed, `max_requests` in total."""
+
+    def __init__(self, max_requests):
+        """Initialize budget."""
+        self.max_requests = max_requests
+        self.used = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self):
+        """Check if a request was refused."""
+        return self.rejected > 0
+
+    def acquire(self):
+        """Take a request, raise `RequestBudgetExceeded` once the budget is used up."""
+        with self._lock:
+            if self.used >= self.max_requests:
+                self.rejected += 1
+                raise RequestBudgetExceeded(
+                    f'Request budget of {self.max_requests} used up')
+            self.used += 1
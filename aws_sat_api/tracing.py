@@ -0,0 +1,135 @@
+"""Opt-in tracing of search stages and S3 requests.
+
+Spans are only recorded while a tracer is active:
+
+    with tracing.tracing(path='trace.json') as tracer:
+        search.sentinel2(22, 'K', 'HV')
+
+The trace file can be opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+_tracers = []
+_lock = threading.Lock()
+
+
+class Tracer(object):
+    """Collect spans and forward them to an optional callback.
+
+    Each span is a dict with `name`, `thread`, `thread_name`, `start` (epoch
+    seconds), `duration` (seconds) and `args` (prefix, key, retries...).
+    With `keep=False` spans are only forwarded, e.g for long running counters.
+    """
+
+    def __init__(self, callback=None, keep=True):
+        """Initialize tracer."""
+        self.callback = callback
+        self.keep = keep
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def record(self, span):
+        """Record a finished span."""
+        if self.keep:
+            with self._lock:
+                self.spans.append(span)
+        if self.callback is not None:
+            self.callback(span)
+
+    def to_chrome_trace(self):
+        """Return spans in Chrome trace event format."""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+
+        events = []
+        threads = {}
+        for span in spans:
+            threads[span['thread']] = span['thread_name']
+            events.append({
+                'name': span['name'],
+                'cat': span['name'].split('.')[0],
+                'ph': 'X',
+                'ts': span['start'] * 1e6,
+                'dur': span['duration'] * 1e6,
+                'pid': pid,
+                'tid': span['thread'],
+                'args': span['args']})
+
+        for tid, name in threads.items():
+            events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                'args': {'name': name}})
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        """Write spans to a Chrome trace (Perfetto compatible) JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+
+
+def enabled():
+    """Check if a tracer is active."""
+    return bool(_tracers)
+
+
+def start(tracer):
+    """Activate tracer."""
+    with _lock:
+        _tracers.append(tracer)
+
+
+def stop(tracer):
+    """Deactivate tracer."""
+    with _lock:
+        _tracers.remove(tracer)
+
+
+@contextmanager
+def tracing(path=None, callback=None, keep=True):
+    """Trace the enclosed code, optionally exporting the trace to `path`."""
+    tracer = Tracer(callback=callback, keep=keep or bool(path))
+    start(tracer)
+    try:
+        yield tracer
+    finally:
+        stop(tracer)
+        if path:
+            tracer.export(path)
+
+
+@contextmanager
+def span(name, **args):
+    """Time the enclosed code.
+
+    Yields the span arguments dict (or None when tracing is disabled) so that
+    callers can attach values known only at the end, like the retry count.
+    """
+    if not _tracers:
+        yield None
+        return
+
+    thread = threading.current_thread()
+    start_time = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield args
+    except Exception as err:
+        args['error'] = f'{type(err).__name__}: {err}'
+        raise
+    finally:
+        record = {
+            'name': name,
+            'thread': thread.ident,
+            'thread_name': thread.name,
+            'start': start_time,
+            'duration': time.perf_counter() - t0,
+            'args': args}
+        for tracer in list(_tracers):
+            tracer.record(record)
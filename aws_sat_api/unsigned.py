@@ -0,0 +1,76 @@
+"""Unsigned (anonymous) S3 functions for public buckets.
+
+Requests are sent over a shared urllib3 connection pool without credential
+resolution or request signing. Results match the `aws` module functions, which
+pass the bucket region (`aws.get_bucket_region`).
+"""
+
+import os
+from urllib.parse import quote
+from xml.etree import ElementTree
+
+import urllib3
+from botocore.exceptions import ClientError
+
+max_pool_connections = int(os.environ.get('MAX_POOL_CONNECTIONS', 50))
+
+http = urllib3.PoolManager(
+    maxsize=max_pool_connections,
+    retries=urllib3.Retry(
+        total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]))
+
+s3_ns = '{http://s3.amazonaws.com/doc/2006-03-01/}'
+
+
+def _raise_for_status(response, operation_name):
+    """Raise a botocore ClientError for S3 error responses."""
+    if response.status < 300:
+        return
+
+    error = {'Code': str(response.status), 'Message': response.reason}
+    try:
+        root = ElementTree.fromstring(response.data)
+        error['Code'] = root.findtext('Code', error['Code'])
+        error['Message'] = root.findtext('Message', error['Message'])
+    except ElementTree.ParseError:
+        pass
+
+    raise ClientError({
+        'Error': error,
+        'ResponseMetadata': {'HTTPStatusCode': response.status}}, operation_name)
+
+
+def endpoint(bucket, region):
+    """Return the region-matched virtual-hosted endpoint for a bucket."""
+    return f'https://{bucket}.s3.{region}.amazonaws.com'
+
+
+def list_directory(bucket, prefix, region):
+    """Anonymous s3 list directory."""
+    url = f'{endpoint(bucket, region)}/'
+    fields = {
+        'list-type': '2',
+        'prefix': prefix,
+        'delimiter': '/'}
+
+    directories = []
+    while True:
+        response = http.request('GET', url, fields=fields)
+        _raise_for_status(response, 'ListObjectsV2')
+
+        root = ElementTree.fromstring(response.data)
+        directories.extend(
+            p.text for p in root.iterfind(f'{s3_ns}CommonPrefixes/{s3_ns}Prefix'))
+
+        if root.findtext(f'{s3_ns}IsTruncated') != 'true':
+            break
+        fields['continuation-token'] = root.findtext(f'{s3_ns}NextContinuationToken')
+
+    return directories
+
+
+def get_object(bucket, key, region):
+    """Anonymous s3 get object content."""
+    response = http.request('GET', f'{endpoint(bucket, region)}/{quote(key)}')
+    _raise_for_status(response, 'GetObject')
+    return response.data
@@ -3,8 +3,11 @@
 import os
 import re
 import datetime
+from io import BytesIO
+from xml.etree import ElementTree
 
-from aws_sat_api.errors import (InvalidLandsatSceneId, InvalidCBERSSceneId)
+from aws_sat_api.errors import (
+    InvalidLandsatSceneId, InvalidSentinelSceneId, InvalidCBERSSceneId)
 
 
 def landsat_parse_scene_id(sceneid):
@@ -100,6 +103,77 @@ def cbers_parse_scene_id(sceneid):
 
     return meta
 
+
+def sentinel2_parse_scene_id(sceneid):
+    """Parse Sentinel-2 scene id (e.g S2A_tile_20171009_38SNG_1)."""
+    sentinel_pattern = (
+        r'^(?P<sat>S2[AB])'
+        r'_tile_'
+        r'(?P<acquisition_date>[0-9]{8})'
+        r'_'
+        r'(?P<utm_zone>[0-9]{1,2})'
+        r'(?P<latitude_band>[C-X])'
+        r'(?P<grid_square>[A-Z]{2})'
+        r'_'
+        r'(?P<num>[0-9]+)$')
+
+    match = re.match(sentinel_pattern, sceneid)
+    if not match:
+        raise InvalidSentinelSceneId('Could not match {}'.format(sceneid))
+
+    meta = match.groupdict()
+    date = meta['acquisition_date']
+    year, month, day = date[0:4], int(date[4:6]), int(date[6:8])
+    utm = meta['utm_zone'].lstrip('0')
+
+    meta['scene_id'] = sceneid
+    meta['utm_zone'] = zeroPad(utm, 2)
+    meta['key'] = 'tiles/{}/{}/{}/{}/{}/{}/{}/'.format(
+        utm, meta['latitude_band'], meta['grid_square'], year, month, day, meta['num'])
+
+    return meta
+
+
+CBERS_METADATA_FIELDS = {
+    'image/boundingBox/UL/latitude': 'ul_lat',
+    'image/boundingBox/UL/longitude': 'ul_lon',
+    'image/boundingBox/UR/latitude': 'ur_lat',
+    'image/boundingBox/UR/longitude': 'ur_lon',
+    'image/boundingBox/LR/latitude': 'lr_lat',
+    'image/boundingBox/LR/longitude': 'lr_lon',
+    'image/boundingBox/LL/latitude': 'll_lat',
+    'image/boundingBox/LL/longitude': 'll_lon',
+    'image/sunPosition/elevation': 'sun_elevation',
+    'image/sunPosition/sunAzimuth': 'sun_azimuth',
+    'image/cloudCoverPercentage': 'cloud_coverage'}
+
+
+def cbers_parse_metadata(content):
+    """Parse CBERS metadata XML.
+
+    The document is parsed as a stream and parsing stops as soon as all the
+    fields listed in `CBERS_METADATA_FIELDS` have been read.
+    """
+    meta = {}
+    path = []
+    for event, elem in ElementTree.iterparse(BytesIO(content), events=('start', 'end')):
+        tag = elem.tag.rsplit('}', 1)[-1]
+        if event == 'start':
+            path.append(tag)
+            continue
+
+        field = CBERS_METADATA_FIELDS.get('/'.join(path[1:]))
+        if field:
+            meta[field] = float(elem.text)
+            if len(meta) == len(CBERS_METADATA_FIELDS):
+                break
+
+        path.pop()
+        elem.clear()
+
+    return meta
+
+
 def zeroPad(n, l):
     """ Add leading 0."""
     return str(n).zfill(l)
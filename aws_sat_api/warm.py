@@ -0,0 +1,104 @@
+"""Cache warm-up.
+
+Run the searches of an AOI list (tile names as in `search.tiles_filter`, one per
+line) so the listings, scene metadata and sealed query results are in the cache
+before the first users ask for them:
+
+    landsat:178/119
+    sentinel2:22KHV
+    cbers:MUX/217/063
+"""
+
+import re
+import threading
+from collections import Counter
+from concurrent import futures
+
+from aws_sat_api import aws, search, tracing
+from aws_sat_api.throttle import RateLimiter
+
+tile_patterns = {
+    'landsat': r'^(?P<path>[0-9]{1,3})/(?P<row>[0-9]{1,3})$',
+    'sentinel2': r'^(?P<utm>[0-9]{1,2})(?P<lat>[C-X])(?P<grid>[A-Z]{2})$',
+    'cbers': (
+        r'^(?P<sensor>MUX|AWFI|PAN5M|PAN10M)'
+        r'/(?P<path>[0-9]{1,3})/(?P<row>[0-9]{1,3})$')}
+
+
+def parse_tile(name):
+    """Return the sensor and search keyword arguments of a tile name."""
+    sensor, _, tile = name.strip().partition(':')
+    match = re.match(tile_patterns.get(sensor, '$^'), tile)
+    if not match:
+        raise ValueError(f'Invalid tile: {name}')
+    return sensor, match.groupdict()
+
+
+def read_aoi(lines):
+    """Return the tile names of an AOI list, skipping blank and comment lines."""
+    return [line.strip() for line in lines if line.strip() and not line.startswith('#')]
+
+
+def _search(name, full, level, cache):
+    sensor, tile = parse_tile(name)
+    if sensor == 'landsat':
+        return search.landsat(**tile, full=full, cache=cache)
+    if sensor == 'sentinel2':
+        return search.sentinel2(**tile, full=full, level=level, cache=cache)
+    return search.cbers(**tile, full=full)
+
+
+def warm(tiles, full=True, level='l1c', concurrency=8, rate=None):
+    """Fill `aws.cache` with the listings and metadata of tiles.
+
+    The sealed query results are cached in the same backend (pass it as the
+    searches `cache` option to use them).
+
+    :param tiles: Tile names (e.g 'sentinel2:22KHV').
+    :param full: Fetch scene metadata.
+    :param level: Sentinel 2 processing level.
+    :param concurrency: Number of tiles searched at once.
+    :param rate: Maximum S3 requests per second.
+    :returns: Generator of progress dicts (tile, done, total, scenes, error,
+        requests sent and cache hits so far), as tiles complete.
+    """
+    if aws.cache is None:
+        raise ValueError('aws.cache must be set to a cache backend.')
+
+    tiles = list(tiles)
+    for name in tiles:
+        # Fail on invalid names before sending any request.
+        parse_tile(name)
+
+    counts = Counter()
+    lock = threading.Lock()
+
+    def _count(span):
+        if span['name'] not in ['s3.list', 's3.get']:
+            return
+        hit = span['args'].get('cache') or span['args'].get('negative_cache')
+        with lock:
+            counts['cache_hits' if hit else 'requests'] += 1
+
+    limiter = aws.rate_limiter
+    if rate is not None:
+        aws.rate_limiter = RateLimiter(rate)
+
+    try:
+        with tracing.tracing(callback=_count, keep=False), \
+                futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            jobs = {
+                executor.submit(_search, name, full, level, aws.cache): name
+                for name in tiles}
+            for done, job in enumerate(futures.as_completed(jobs), 1):
+                progress = {'tile': jobs[job], 'done': done, 'total': len(tiles)}
+                try:
+                    progress['scenes'] = len(job.result())
+                except Exception as err:
+                    progress['error'] = f'{type(err).__name__}: {err}'
+                with lock:
+                    progress.update(
+                        requests=counts['requests'], cache_hits=counts['cache_hits'])
+                yield progress
+    finally:
+        aws.rate_limiter = limiter
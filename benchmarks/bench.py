@@ -0,0 +1,255 @@
+"""CPU micro-benchmarks of the search hot paths.
+
+Scene id parsing, metadata record building (with `json.loads` of the metadata
+documents, S3 being replaced by in-memory fixtures), geometry formatting and
+the JSON lines serialization of the CLI, on synthetic inputs.
+
+Timings are also given in iterations of a pure-Python calibration loop, so
+runs from different machines can be compared. Without network access:
+
+    python benchmarks/bench.py                                  # print timings
+    python benchmarks/bench.py --save benchmarks/history.jsonl  # append to the history
+    python benchmarks/bench.py --baseline benchmarks/baseline.json --threshold 1.3
+    python benchmarks/bench.py --update-baseline benchmarks/baseline.json
+
+With `--baseline`, the exit code is 1 when a benchmark is `threshold` times
+slower than its baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import platform
+import argparse
+import subprocess
+from unittest import mock
+
+from aws_sat_api import aws, geometry, search, utils
+
+fixtures = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures')
+
+
+def _read(name):
+    with open(os.path.join(fixtures, name), 'rb') as f:
+        return f.read()
+
+
+def landsat_scene_ids(count):
+    """Return collection and pre-collection Landsat-8 scene ids."""
+    ids = []
+    for i in range(count):
+        path, row, day = 1 + i % 233, 1 + i % 248, 1 + i % 365
+        date = f'2018{1 + i % 12:02d}{1 + i % 28:02d}'
+        if i % 4:
+            ids.append(f'LC08_L1TP_{path:03d}{row:03d}_{date}_{date}_01_T1')
+        else:
+            ids.append(f'LC8{path:03d}{row:03d}2016{day:03d}LGN00')
+    return ids
+
+
+def sentinel2_paths(count):
+    """Return Sentinel-2 tiles paths."""
+    return [
+        f'tiles/{1 + i % 60}/K/HV/{2015 + i % 8}/{1 + i % 12}/{1 + i % 28}/{i % 2}/'
+        for i in range(count)]
+
+
+def records(count):
+    """Return full Landsat-8 records."""
+    mtl = _read('LC08_L1GT_178119_20180103_20180103_01_RT_MTL.json')
+    scene_ids = landsat_scene_ids(count)
+    with mock.patch.object(aws, 'get_object', return_value=mtl):
+        return [search.get_l8_info(scene_id, full=True) for scene_id in scene_ids]
+
+
+def _scene_id_cases(count):
+    """Scene id parsing."""
+    l8_ids = landsat_scene_ids(count)
+    s2_ids = [
+        f'S2A_tile_2017{1 + i % 12:02d}{1 + i % 28:02d}_{1 + i % 60:02d}KHV_{i % 2}'
+        for i in range(count)]
+
+    def landsat_parse_scene_id():
+        for scene_id in l8_ids:
+            utils.landsat_parse_scene_id(scene_id)
+
+    def sentinel2_parse_scene_id():
+        for scene_id in s2_ids:
+            utils.sentinel2_parse_scene_id(scene_id)
+
+    return [
+        ('landsat_parse_scene_id', landsat_parse_scene_id),
+        ('sentinel2_parse_scene_id', sentinel2_parse_scene_id)]
+
+
+def _metadata_cases(count):
+    """Metadata record building, S3 being replaced by the fixtures."""
+    l8_ids = landsat_scene_ids(count)
+    s2_paths = sentinel2_paths(count)
+    mtl = _read('LC08_L1GT_178119_20180103_20180103_01_RT_MTL.json')
+    tile_info = _read('tileInfo.json')
+    cbers_xml = _read('CBERS_4_MUX_20160416_217_063_L2_BAND6.xml')
+
+    def get_l8_info():
+        with mock.patch.object(aws, 'get_object', return_value=mtl):
+            for scene_id in l8_ids:
+                search.get_l8_info(scene_id, full=True)
+
+    def get_s2_info():
+        with mock.patch.object(aws, 'get_object', return_value=tile_info):
+            for path in s2_paths:
+                search.get_s2_info('sentinel-s2-l1c', path, full=True)
+
+    def cbers_parse_metadata():
+        for _ in range(count):
+            utils.cbers_parse_metadata(cbers_xml)
+
+    def metadata_json_loads():
+        for _ in range(count):
+            json.loads(mtl)
+
+    return [
+        ('get_l8_info', get_l8_info),
+        ('get_s2_info', get_s2_info),
+        ('cbers_parse_metadata', cbers_parse_metadata),
+        ('metadata_json_loads', metadata_json_loads)]
+
+
+def _geometry_cases(count):
+    """Geometry formatting."""
+    s2_geometry = json.loads(_read('tileInfo.json'))['tileGeometry']
+    # Distinct geometries, reprojected rings are memoized.
+    s2_records = [
+        {'scene_id': str(i), 'geometry': dict(s2_geometry, coordinates=[
+            [[x + i, y] for x, y in ring] for ring in s2_geometry['coordinates']])}
+        for i in range(count)]
+
+    def format_records_wgs84():
+        list(geometry.format_records(
+            s2_records, wgs84=True, precision=6, encoding='polyline'))
+
+    return [('format_records_wgs84', format_records_wgs84)]
+
+
+def _json_lines_cases(count):
+    """JSON lines serialization of the CLI."""
+    l8_records = records(count)
+
+    def cli_json_lines():
+        for record in geometry.format_records(l8_records):
+            json.dumps(record)
+
+    return [('cli_json_lines', cli_json_lines)]
+
+
+def cases(count):
+    """Return the benchmarks, as (name, function running `count` operations)."""
+    return (
+        _scene_id_cases(count) + _metadata_cases(count) + _geometry_cases(count)
+        + _json_lines_cases(count))
+
+
+calibration_loops = 200000
+
+
+def calibrate(repeat=5):
+    """Return the time (seconds) of an iteration of a pure-Python loop."""
+    def _work():
+        total = 0
+        for i in range(calibration_loops):
+            total += i % 7
+        return total
+
+    return min(timeit.repeat(_work, number=1, repeat=repeat)) / calibration_loops
+
+
+def run(count=10000, repeat=5, names=None):
+    """Run the benchmarks.
+
+    :param count: Operations per benchmark.
+    :param repeat: Runs per benchmark, the fastest is kept.
+    :param names: Benchmarks to run (default all).
+    :returns: Dict of the results by benchmark: microseconds per operation and
+        time per operation in calibration loop iterations.
+    """
+    unit = calibrate(repeat * 3)
+    timings = {}
+    for name, func in cases(count):
+        if names and name not in names:
+            continue
+        timings[name] = min(timeit.repeat(func, number=1, repeat=repeat))
+    # Calibrate again, the machine may have changed speed in between.
+    unit = min(unit, calibrate(repeat * 3))
+
+    results = {}
+    for name, best in timings.items():
+        results[name] = {
+            'us': round(best / count * 1e6, 3),
+            'relative': round(best / count / unit, 2)}
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return the benchmarks `threshold` times slower than their baseline."""
+    regressions = {}
+    for name, result in results.items():
+        if name in baseline:
+            ratio = result['relative'] / baseline[name]['relative']
+            if ratio > threshold:
+                regressions[name] = round(ratio, 2)
+    return regressions
+
+
+def _revision():
+    try:
+        output = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL)
+        return output.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('names', nargs='*', help='Benchmarks to run (default all)')
+    parser.add_argument(
+        '--count', type=int, default=10000, help='Operations per benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per benchmark')
+    parser.add_argument('--save', help='Append the results to this JSON lines history')
+    parser.add_argument('--baseline', help='Compare to this baseline')
+    parser.add_argument('--threshold', type=float, default=1.3, help='Maximum slowdown')
+    parser.add_argument('--update-baseline', help='Write the results as baseline')
+    options = parser.parse_args(args)
+
+    results = run(options.count, options.repeat, options.names)
+    for name, result in results.items():
+        print(f"{name:<28} {result['us']:>10.3f} us/op {result['relative']:>10.2f}")
+
+    if options.save:
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'revision': _revision(), 'python': platform.python_version(),
+            'results': results}
+        with open(options.save, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    if options.update_baseline:
+        with open(options.update_baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            regressions = compare(results, json.load(f), options.threshold)
+        for name, ratio in regressions.items():
+            message = f'Regression: {name} is {ratio}x slower than the baseline'
+            print(message, file=sys.stderr)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,10 +17,11 @@ def read(fname):
 
 
 # Runtime requirements.
-inst_reqs = ["boto3"]
+inst_reqs = ["boto3", "click", "urllib3"]
 
 extra_reqs = {
-    'test': ['mock', 'pytest', 'pytest-cov', 'codecov']}
+    'stats': ['numpy'],
+    'test': ['mock', 'pytest', 'pytest-cov', 'codecov', 'numpy']}
 
 setup(name='aws_sat_api',
       version=version,
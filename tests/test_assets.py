@@ -0,0 +1,162 @@
+"""tests aws_sat_api.assets"""
+
+import os
+import json
+import hashlib
+
+import pytest
+from mock import patch
+from click.testing import CliRunner
+
+from aws_sat_api import assets
+from aws_sat_api.scripts.cli import awssat
+
+data = bytes(range(256)) * 40
+
+
+class Body(object):
+    def __init__(self, content):
+        self.content = content
+
+    def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+def head(bucket, key, request_pays=False):
+    return {'size': len(data), 'etag': hashlib.md5(data).hexdigest()}
+
+
+def get_range(bucket, key, start, end, request_pays=False):
+    return Body(data[start:end + 1])
+
+
+landsat = {
+    'scene_id': 'LC08_L1TP_016037_20170813_20170814_01_RT', 'satellite': 'L8',
+    'key': 'c1/L8/016/037/LC08_L1TP_016037_20170813_20170814_01_RT/LC08_L1TP_016037_20170813_20170814_01_RT'}
+
+
+def test_expand():
+    """Should map records to their band objects."""
+    keys = [a['key'] for a in assets.expand(landsat, bands=['B4', 'BQA'])]
+    assert keys == [f"{landsat['key']}_B4.TIF", f"{landsat['key']}_BQA.TIF"]
+    assert len(assets.expand(landsat)) == 12
+
+    s2 = {'scene_id': 'S2A_tile_20170323_22KHV_0', 'utm_zone': 22, 'path': 'tiles/22/K/HV/2017/3/23/0/'}
+    band = assets.expand(s2, bands=['B8A'])[0]
+    assert band['bucket'] == 'sentinel-s2-l1c'
+    assert band['key'] == 'tiles/22/K/HV/2017/3/23/0/B8A.jp2'
+    assert band['request_pays']
+
+    bands = assets.expand(s2, bands=['B01', 'B04', 'B8A', 'B10', 'SCL'], level='l2a')
+    assert [a['bucket'] for a in bands] == ['sentinel-s2-l2a'] * 4
+    assert [a['key'] for a in bands] == [
+        'tiles/22/K/HV/2017/3/23/0/R60m/B01.jp2', 'tiles/22/K/HV/2017/3/23/0/R10m/B04.jp2',
+        'tiles/22/K/HV/2017/3/23/0/R20m/B8A.jp2', 'tiles/22/K/HV/2017/3/23/0/R20m/SCL.jp2']
+    assert len(assets.expand(s2)) == 13
+    assert len(assets.expand(s2, level='l2a')) == 12
+
+    joint = dict(s2, levels={'l1c': {}, 'l2a': {}})
+    bands = assets.expand(joint, bands=['B04'])
+    assert [(a['bucket'], a['key']) for a in bands] == [
+        ('sentinel-s2-l1c', 'tiles/22/K/HV/2017/3/23/0/B04.jp2'),
+        ('sentinel-s2-l2a', 'tiles/22/K/HV/2017/3/23/0/R10m/B04.jp2')]
+    bands = assets.expand(dict(s2, levels={'l2a': {}}), bands=['B04'], level='l1c')
+    assert [a['bucket'] for a in bands] == ['sentinel-s2-l2a']
+
+    cbers = {
+        'scene_id': 'CBERS_4_MUX_20171121_057_094_L2', 'satellite': 'CBERS', 'sensor': 'MUX',
+        'key': 'CBERS4/MUX/057/094/CBERS_4_MUX_20171121_057_094_L2'}
+    bands = assets.expand(cbers)
+    assert [a['band'] for a in bands] == [5, 6, 7, 8]
+    assert bands[0]['key'] == f"{cbers['key']}/CBERS_4_MUX_20171121_057_094_L2_BAND5.tif"
+
+
+@patch('aws_sat_api.assets.aws.get_object_range', side_effect=get_range)
+@patch('aws_sat_api.assets.aws.head_object', side_effect=head)
+def test_download(head_object, get_object_range, tmpdir):
+    """Should fetch the bands in ranges and skip complete files."""
+    objects = assets.expand(landsat, bands=['B4', 'B5'])
+    results = list(assets.download(objects, str(tmpdir), concurrency=4, part_size=1000))
+    assert sorted(r['status'] for r in results) == ['downloaded', 'downloaded']
+    assert get_object_range.call_count == 2 * 11
+    for result in results:
+        with open(result['path'], 'rb') as f:
+            assert f.read() == data
+        assert not os.path.exists(f"{result['path']}.part")
+
+    results = list(assets.download(objects, str(tmpdir), part_size=1000))
+    assert [r['status'] for r in results] == ['skipped', 'skipped']
+    assert get_object_range.call_count == 2 * 11
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='needs /proc')
+@patch('aws_sat_api.assets.aws.get_object_range')
+@patch('aws_sat_api.assets.aws.head_object', side_effect=head)
+def test_download_open_files(head_object, get_object_range, tmpdir):
+    """Should only keep files open while a range is written."""
+    open_files = []
+
+    def _get_range(bucket, key, start, end, request_pays=False):
+        open_files.append(len(os.listdir('/proc/self/fd')))
+        return get_range(bucket, key, start, end)
+
+    get_object_range.side_effect = _get_range
+    baseline = len(os.listdir('/proc/self/fd'))
+    objects = [dict(a, key=f"{i}/{a['key']}") for i in range(20) for a in assets.expand(landsat, bands=['B4'])]
+    results = list(assets.download(objects, str(tmpdir), concurrency=2, part_size=1000))
+    assert [r['status'] for r in results] == ['downloaded'] * 20
+    assert max(open_files) - baseline <= 4
+
+
+@patch('aws_sat_api.assets.aws.get_object_range')
+@patch('aws_sat_api.assets.aws.head_object', side_effect=head)
+def test_download_resume(head_object, get_object_range, tmpdir):
+    """Should only fetch the ranges missing after an interrupted download."""
+    def _fail_third(bucket, key, start, end, request_pays=False):
+        if start == 2000:
+            raise IOError('connection reset')
+        return get_range(bucket, key, start, end)
+
+    objects = assets.expand(landsat, bands=['B4'])
+    get_object_range.side_effect = _fail_third
+    result = list(assets.download(objects, str(tmpdir), concurrency=1, part_size=1000))[0]
+    assert result['status'] == 'error'
+    assert 'connection reset' in result['error']
+    assert os.path.exists(f"{result['path']}.parts")
+
+    get_object_range.reset_mock()
+    get_object_range.side_effect = get_range
+    result = list(assets.download(objects, str(tmpdir), part_size=1000))[0]
+    assert result['status'] == 'downloaded'
+    assert [c[0][2] for c in get_object_range.call_args_list] == [2000]
+    with open(result['path'], 'rb') as f:
+        assert f.read() == data
+
+
+@patch('aws_sat_api.assets.aws.get_object_range', side_effect=get_range)
+@patch('aws_sat_api.assets.aws.head_object')
+def test_download_checksum(head_object, get_object_range, tmpdir):
+    """Should reject files not matching their ETag."""
+    head_object.return_value = {'size': len(data), 'etag': 'bad'}
+    objects = assets.expand(landsat, bands=['B4'])
+    result = list(assets.download(objects, str(tmpdir), part_size=1000))[0]
+    assert result['status'] == 'error'
+    assert not os.path.exists(result['path'])
+    assert not os.path.exists(f"{result['path']}.part")
+
+    # Multipart ETags are not a MD5 of the content, only the size is checked.
+    head_object.return_value = {'size': len(data), 'etag': 'bad-2'}
+    result = list(assets.download(objects, str(tmpdir), part_size=1000))[0]
+    assert result['status'] == 'downloaded'
+
+
+@patch('aws_sat_api.assets.aws.get_object_range', side_effect=get_range)
+@patch('aws_sat_api.assets.aws.head_object', side_effect=head)
+def test_assets_cli(head_object, get_object_range, tmpdir):
+    """Should download the bands of JSON lines records."""
+    runner = CliRunner()
+    result = runner.invoke(
+        awssat, ['assets', str(tmpdir), '--band', 'B4', '--band', 'B5'], input=json.dumps(landsat) + '\n')
+    assert result.exit_code == 0
+    assert json.loads(result.output.splitlines()[-1]) == {'downloaded': 2, 'skipped': 0, 'error': 0}
@@ -1,13 +1,18 @@
 """tests aws_sat_api.aws"""
 
+import time
 from io import BytesIO
 
 import pytest
 
-from mock import patch
+from mock import Mock, patch
+from botocore import UNSIGNED
 from botocore.exceptions import ClientError
 
 from aws_sat_api import aws
+from aws_sat_api.cache import MemoryCache
+from aws_sat_api.errors import RequestBudgetExceeded
+from aws_sat_api.throttle import RateLimiter, RequestBudget
 
 
 @pytest.fixture(autouse=True)
@@ -21,6 +26,15 @@ def testing_env_var(monkeypatch):
                        '/tmp/asdfasdfaf/does/not/exist2')
 
 
+@pytest.fixture(autouse=True)
+def clear_clients():
+    aws.region_client.cache_clear()
+    aws.get_bucket_region.cache_clear()
+    yield
+    aws.region_client.cache_clear()
+    aws.get_bucket_region.cache_clear()
+
+
 @patch('aws_sat_api.aws.boto3_session')
 def test_aws_list_directory_valid(session):
     """Should work as expected
@@ -155,3 +169,110 @@ def test_aws_get_object_awserror(session):
 
     with pytest.raises(ClientError):
         aws.get_object(bucket, key)
+
+
+@patch('aws_sat_api.aws.boto3_session')
+def test_aws_get_bucket_region(session):
+    """Should read the region from the HEAD response and cache it
+    """
+
+    session.return_value.client.return_value.head_bucket.return_value = {
+        'ResponseMetadata': {'HTTPHeaders': {'x-amz-bucket-region': 'us-west-2'}}}
+
+    assert aws.get_bucket_region('landsat-pds') == 'us-west-2'
+    assert aws.get_bucket_region('landsat-pds') == 'us-west-2'
+    session.return_value.client.return_value.head_bucket.assert_called_once()
+    assert session.return_value.client.call_args[1]['config'].signature_version is UNSIGNED
+
+
+@patch('aws_sat_api.aws.boto3_session')
+def test_aws_get_bucket_region_error(session):
+    """Should read the region from an error response (e.g requester-pays bucket)
+    """
+
+    session.return_value.client.return_value.head_bucket.side_effect = ClientError({
+        'Error': {'Code': '403', 'Message': 'Forbidden'},
+        'ResponseMetadata': {'HTTPHeaders': {'x-amz-bucket-region': 'eu-central-1'}}}, 'head_bucket')
+
+    assert aws.get_bucket_region('sentinel-s2-l1c') == 'eu-central-1'
+
+
+@patch('aws_sat_api.aws.boto3_session')
+def test_aws_get_client_region(session):
+    """Should create one client per bucket region
+    """
+
+    session.return_value.client.return_value.head_bucket.side_effect = [
+        {'ResponseMetadata': {'HTTPHeaders': {'x-amz-bucket-region': 'eu-central-1'}}},
+        {'ResponseMetadata': {'HTTPHeaders': {'x-amz-bucket-region': 'eu-central-1'}}}]
+
+    assert aws.get_client('sentinel-s2-l1c') == aws.get_client('sentinel-s2-l2a')
+    regions = [c[1]['region_name'] for c in session.call_args_list]
+    assert regions == [aws.region, 'eu-central-1']
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_aws_cache(get_client, monkeypatch):
+    """Should read listings and objects from the cache."""
+    monkeypatch.setattr(aws, 'cache', MemoryCache())
+    client = get_client.return_value
+    client.get_paginator.return_value.paginate.return_value = [
+        {'CommonPrefixes': [{'Prefix': 'c1/L8/178/119/'}]}]
+    client.get_object.return_value = {'Body': BytesIO(b'data')}
+
+    for _ in range(2):
+        assert aws.list_directory('landsat-pds', 'c1/L8/178/') == ['c1/L8/178/119/']
+        assert aws.get_object('landsat-pds', 'c1/L8/178/119/index.html') == b'data'
+
+    assert client.get_paginator.call_count == 1
+    assert client.get_object.call_count == 1
+    assert aws.cache.get('list:landsat-pds/c1/L8/178/') == ['c1/L8/178/119/']
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_aws_rate_limiter(get_client, monkeypatch):
+    """Should wait for the rate limiter before each request."""
+    limiter = Mock()
+    monkeypatch.setattr(aws, 'rate_limiter', limiter)
+    get_client.return_value.get_object.return_value = {'Body': BytesIO(b'data')}
+    aws.get_object('landsat-pds', 'key')
+    assert limiter.acquire.call_count == 1
+
+
+def test_rate_limiter():
+    """Should throttle requests over the burst."""
+    limiter = RateLimiter(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(10):
+        limiter.acquire()
+    assert 0.08 < time.monotonic() - start < 0.5
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_aws_head_and_range(get_client):
+    """Should return the object size and ETag and request byte ranges."""
+    client = get_client.return_value
+    client.head_object.return_value = {'ContentLength': 10, 'ETag': '"abc"'}
+    client.get_object.return_value = {'Body': BytesIO(b'data')}
+
+    assert aws.head_object('sentinel-s2-l1c', 'key', request_pays=True) == {'size': 10, 'etag': 'abc'}
+    client.head_object.assert_called_once_with(Bucket='sentinel-s2-l1c', Key='key', RequestPayer='requester')
+
+    assert aws.get_object_range('landsat-pds', 'key', 2, 5).read() == b'data'
+    client.get_object.assert_called_once_with(Bucket='landsat-pds', Key='key', Range='bytes=2-5')
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_aws_request_budget(get_client, monkeypatch):
+    """Should refuse requests over the budget, cache hits are free."""
+    monkeypatch.setattr(aws, 'request_budget', RequestBudget(1))
+    monkeypatch.setattr(aws, 'cache', MemoryCache())
+    get_client.return_value.get_object.return_value = {'Body': BytesIO(b'data')}
+
+    assert aws.get_object('landsat-pds', 'key') == b'data'
+    assert aws.get_object('landsat-pds', 'key') == b'data'
+    assert not aws.request_budget.exhausted
+    with pytest.raises(RequestBudgetExceeded):
+        aws.get_object('landsat-pds', 'other')
+    assert aws.request_budget.used == 1
+    assert aws.request_budget.exhausted
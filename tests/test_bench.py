@@ -0,0 +1,35 @@
+"""tests benchmarks/bench.py"""
+
+import os
+import importlib.util
+
+spec = importlib.util.spec_from_file_location(
+    'bench', os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'bench.py'))
+bench = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench)
+
+
+def test_bench_run():
+    """Should run every benchmark."""
+    results = bench.run(count=10, repeat=1)
+    assert [name for name, _ in bench.cases(1)] == list(results)
+    assert all(r['us'] > 0 and r['relative'] > 0 for r in results.values())
+
+
+def test_bench_compare():
+    """Should report the benchmarks slower than the threshold."""
+    baseline = {'a': {'relative': 100}, 'b': {'relative': 100}}
+    results = {'a': {'relative': 110}, 'b': {'relative': 150}, 'c': {'relative': 1}}
+    assert bench.compare(results, baseline, 1.3) == {'b': 1.5}
+
+
+def test_bench_main(tmpdir):
+    """Should save the results and fail on regressions."""
+    history = str(tmpdir.join('history.jsonl'))
+    baseline = str(tmpdir.join('baseline.json'))
+    args = ['landsat_parse_scene_id', '--count', '10', '--repeat', '1']
+    assert bench.main(args + ['--save', history, '--update-baseline', baseline]) == 0
+    assert bench.main(args + ['--baseline', baseline, '--threshold', '1000']) == 0
+    assert bench.main(args + ['--baseline', baseline, '--threshold', '0']) == 1
+    with open(history) as f:
+        assert 'landsat_parse_scene_id' in f.read()
@@ -0,0 +1,295 @@
+"""tests aws_sat_api.cache"""
+
+import time
+import socket
+import threading
+import socketserver
+from io import BytesIO
+from collections import Counter
+from datetime import datetime, timezone
+
+import pytest
+from mock import patch
+
+from aws_sat_api import aws, search
+from aws_sat_api.cache import (
+    MemoryCache, DiskCache, RedisCache, NegativeCache, BloomFilter, from_url)
+from aws_sat_api.errors import RedisError
+
+
+def test_memory_cache():
+    """Should work as expected."""
+    cache = MemoryCache()
+    assert cache.get('a') is None
+    assert cache.get('a', {}) == {}
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    cache.set('b', 2, ttl=-1)
+    assert cache.get('b') is None
+    cache.delete('a')
+    assert cache.get('a') is None
+
+
+def test_negative_cache_expiry():
+    """Should forget empty prefixes after ttl."""
+    cache = NegativeCache(ttl=0.05)
+    cache.add('landsat-pds', 'c1/L8/001/001/')
+    assert cache.is_empty('landsat-pds', 'c1/L8/001/001/')
+    assert not cache.is_empty('landsat-pds', 'c1/L8/001/002/')
+    time.sleep(0.1)
+    assert not cache.is_empty('landsat-pds', 'c1/L8/001/001/')
+
+
+def test_negative_cache_recent():
+    """Should only keep recent dated prefixes for recent_ttl."""
+    cache = NegativeCache(ttl=60, recent_ttl=0.05)
+    today = datetime.now(timezone.utc).date()
+    recent = [
+        f'tiles/22/K/HV/{today.year}/',
+        f'tiles/22/K/HV/{today.year}/{today.month}/',
+        f'tiles/22/K/HV/{today.year}/{today.month}/{today.day}/']
+    sealed = ['tiles/22/K/HV/2017/', 'tiles/22/K/HV/2017/12/', 'tiles/22/K/HV/2017/2/28/', 'c1/L8/001/001/']
+    for prefix in recent + sealed:
+        cache.add('sentinel-s2-l1c', prefix)
+        assert cache.is_empty('sentinel-s2-l1c', prefix)
+
+    time.sleep(0.1)
+    assert not any(cache.is_empty('sentinel-s2-l1c', prefix) for prefix in recent)
+    assert all(cache.is_empty('sentinel-s2-l1c', prefix) for prefix in sealed)
+
+
+@patch('aws_sat_api.aws._list_directory')
+def test_list_directory_negative_cache(list_directory, monkeypatch):
+    """Should not list empty prefixes twice."""
+    monkeypatch.setattr(aws, 'negative_cache', NegativeCache())
+    list_directory.side_effect = [[], ['c1/L8/001/002/a/']]
+
+    assert aws.list_directory('landsat-pds', 'c1/L8/001/001/') == []
+    assert aws.list_directory('landsat-pds', 'c1/L8/001/001/') == []
+    assert aws.list_directory('landsat-pds', 'c1/L8/001/002/') == ['c1/L8/001/002/a/']
+    assert list_directory.call_count == 2
+
+
+def test_bloom_filter(tmpdir):
+    """Should have no false negatives and survive a round trip to disk."""
+    items = [f'sentinel2:{utm}K{grid}' for utm in range(1, 61) for grid in ['HV', 'HU', 'GV']]
+    bloom = BloomFilter.create(items, error_rate=0.01)
+    assert all(i in bloom for i in items)
+    false_positives = sum(f'landsat:{p}/{r}' in bloom for p in range(1, 101) for r in range(1, 11))
+    assert false_positives < 50
+
+    path = str(tmpdir.join('tiles.bloom'))
+    bloom.save(path)
+    loaded = BloomFilter.load(path)
+    assert all(i in loaded for i in items)
+    assert loaded.bits == bloom.bits
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_search_tiles_filter(list_directory, monkeypatch):
+    """Should skip tiles without data."""
+    monkeypatch.setattr(search, 'tiles_filter', BloomFilter.create(['landsat:178/119']))
+    list_directory.return_value = []
+
+    assert search.sentinel2(22, 'K', 'HV') == []
+    assert search.cbers(217, 63) == []
+    list_directory.assert_not_called()
+
+    search.landsat(178, 119)
+    assert list_directory.call_count == 2
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    """Minimal Redis server (GET, SET PX, MGET, DEL, SCAN, SELECT)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), RedisHandler)
+        self.data = {}
+        self.commands = Counter()
+
+    def get(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and expires < time.time():
+            return None
+        return value
+
+
+class RedisHandler(socketserver.StreamRequestHandler):
+
+    def bulk(self, value):
+        if value is None:
+            return b'$-1\r\n'
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def handle(self):
+        server = self.server
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                size = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(size + 2)[:-2])
+
+            command = args[0].decode().upper()
+            server.commands[command] += 1
+            if command == 'GET':
+                reply = self.bulk(server.get(args[1]))
+            elif command == 'MGET':
+                reply = b'*%d\r\n' % (len(args) - 1) + b''.join(self.bulk(server.get(k)) for k in args[1:])
+            elif command == 'SET':
+                expires = time.time() + int(args[4]) / 1000 if len(args) > 3 else None
+                server.data[args[1]] = (args[2], expires)
+                reply = b'+OK\r\n'
+            elif command == 'DEL':
+                reply = b':%d\r\n' % sum(server.data.pop(k, None) is not None for k in args[1:])
+            elif command == 'SCAN':
+                prefix = args[3].rstrip(b'*')
+                keys = [k for k in server.data if k.startswith(prefix)]
+                reply = b'*2\r\n' + self.bulk(b'0') + b'*%d\r\n' % len(keys) + b''.join(self.bulk(k) for k in keys)
+            elif command == 'SELECT':
+                reply = b'+OK\r\n'
+            else:
+                reply = b'-ERR unknown command\r\n'
+            self.wfile.write(reply)
+
+
+@pytest.fixture
+def redis_server():
+    server = RedisStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_disk_cache(tmpdir):
+    """Should store JSON and bytes values in files."""
+    cache = DiskCache(str(tmpdir))
+    cache.set('list:landsat-pds/c1/L8/178/', ['c1/L8/178/119/'])
+    cache.set('get:landsat-pds/key', b'data')
+    cache.set('expired', 1, ttl=-1)
+    assert cache.get('list:landsat-pds/c1/L8/178/') == ['c1/L8/178/119/']
+    assert cache.get('get:landsat-pds/key') == b'data'
+    assert cache.get('expired') is None
+    assert cache.get_many(['get:landsat-pds/key', 'missing']) == {'get:landsat-pds/key': b'data'}
+
+    # Shared by every instance on the directory.
+    assert DiskCache(str(tmpdir)).get('get:landsat-pds/key') == b'data'
+
+    cache.delete('get:landsat-pds/key')
+    assert cache.get('get:landsat-pds/key') is None
+    cache.clear()
+    assert cache.get('list:landsat-pds/c1/L8/178/') is None
+
+
+def test_redis_cache(redis_server):
+    """Should batch lookups in one MGET and writes in one pipeline."""
+    cache = RedisCache('127.0.0.1', redis_server.server_address[1], db=1)
+    cache.set_many({'a': {'scene_id': 'a'}, 'b': b'data'})
+    cache.set('c', 1, ttl=-1)
+    assert cache.get('a') == {'scene_id': 'a'}
+    assert cache.get('c') is None
+    assert cache.get('d', 'default') == 'default'
+
+    assert cache.get_many(['a', 'b', 'c', 'd']) == {'a': {'scene_id': 'a'}, 'b': b'data'}
+    assert redis_server.commands['MGET'] == 1
+    assert redis_server.commands['SELECT'] == 1
+
+    cache.delete('a')
+    assert cache.get('a') is None
+    cache.clear()
+    assert cache.get('b') is None
+    assert not redis_server.data
+
+    with pytest.raises(RedisError):
+        cache.execute(('FLUSHALL',))
+    assert cache.get('b') is None
+
+
+def test_from_url(tmpdir):
+    """Should create backends from urls."""
+    assert isinstance(from_url('memory://'), MemoryCache)
+    assert from_url(f'file://{tmpdir}').directory == str(tmpdir)
+    redis = from_url('redis://cache.local:6380/2')
+    assert (redis.host, redis.port, redis.db) == ('cache.local', 6380, 2)
+    with pytest.raises(ValueError):
+        from_url('ftp://host')
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_prefetch(get_client, redis_server, monkeypatch):
+    """Should read the prefetched keys without a lookup per request."""
+    cache = RedisCache('127.0.0.1', redis_server.server_address[1])
+    cache.set('get:landsat-pds/a', b'a')
+    monkeypatch.setattr(aws, 'cache', cache)
+    get_client.return_value.get_object.return_value = {'Body': BytesIO(b'b')}
+
+    with aws.prefetch([aws.object_key('landsat-pds', k) for k in ['a', 'b']]):
+        assert aws.get_object('landsat-pds', 'a') == b'a'
+        assert aws.get_object('landsat-pds', 'b') == b'b'
+
+    assert redis_server.commands['MGET'] == 1
+    assert redis_server.commands['GET'] == 0
+    assert get_client.return_value.get_object.call_count == 1
+    assert cache.get('get:landsat-pds/b') == b'b'
+    assert not aws._prefetched
+
+
+class FailingCache(MemoryCache):
+    """Backend whose server is down."""
+
+    def get(self, key, default=None):
+        raise ConnectionError('Connection refused')
+
+    def get_many(self, keys):
+        raise RedisError('LOADING Redis is loading the dataset in memory')
+
+    def set(self, key, value, ttl=None):
+        raise OSError('No space left on device')
+
+
+def test_backend_outage(tmpdir):
+    """Should treat unreachable backends as misses and skip writes."""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    cache = RedisCache('127.0.0.1', port, timeout=0.5)
+    cache.set('a', 1)
+    cache.set_many({'b': 2})
+    assert cache.get('a', 'default') == 'default'
+    assert cache.get_many(['a', 'b']) == {}
+    cache.delete('a')
+    cache.clear()
+
+    # Cache directory replaced by a file.
+    path = tmpdir.join('cache')
+    cache = DiskCache(str(path))
+    cache.set('a', 1)
+    path.remove()
+    path.write('')
+    cache.set('b', 2)
+    assert cache.get('a') is None
+    assert cache.get_many(['a', 'b']) == {}
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_aws_backend_outage(get_client, monkeypatch):
+    """Should send the requests when the cache backend fails."""
+    monkeypatch.setattr(aws, 'cache', FailingCache())
+    client = get_client.return_value
+    client.get_paginator.return_value.paginate.return_value = [
+        {'CommonPrefixes': [{'Prefix': 'c1/L8/178/119/'}]}]
+    client.get_object.return_value = {'Body': BytesIO(b'data')}
+
+    with aws.prefetch([aws.object_key('landsat-pds', 'key')]):
+        assert aws.get_object('landsat-pds', 'key') == b'data'
+    assert aws.list_directory('landsat-pds', 'c1/L8/178/') == ['c1/L8/178/119/']
+    assert client.get_object.call_count == 1
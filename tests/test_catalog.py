@@ -0,0 +1,178 @@
+"""tests aws_sat_api.catalog"""
+
+import os
+import json
+from datetime import datetime
+
+import pytest
+from mock import MagicMock
+from click.testing import CliRunner
+
+from aws_sat_api import catalog, search
+from aws_sat_api.cache import BloomFilter
+from aws_sat_api.errors import InvalidCatalog
+from aws_sat_api.scripts.cli import awssat
+
+fixture = os.path.join(os.path.dirname(__file__), 'fixtures/s2_search_2017.json')
+
+landsat_record = {
+    'acquisition_date': '20180103', 'cloud_coverage': 64.66, 'path': '178', 'row': '119',
+    'satellite': 'L8', 'scene_id': 'LC08_L1GT_178119_20180103_20180103_01_RT'}
+cbers_record = {
+    'acquisition_date': '20160416', 'path': '217', 'row': '063', 'satellite': 'CBERS',
+    'scene_id': 'CBERS_4_MUX_20160416_217_063_L2', 'sensor': 'MUX'}
+
+
+@pytest.fixture
+def s2_results():
+    with open(fixture, 'r') as f:
+        return json.loads(f.read())['results']
+
+
+def test_write_lookup(tmpdir, s2_results):
+    """Should write and read records by tile and date range."""
+    path = str(tmpdir.join('catalog.bin'))
+    records = list(reversed(s2_results)) + [landsat_record, cbers_record]
+    assert catalog.write(path, records) == 24
+
+    cat = catalog.Catalog(path)
+    assert len(cat) == 24
+
+    results = cat.lookup('sentinel2', '22KHV')
+    assert len(results) == 22
+    assert [r['acquisition_date'] for r in results] == sorted(r['acquisition_date'] for r in s2_results)
+
+    results = cat.lookup('sentinel2', '22KHV', start='20170201', end='20170228')
+    assert [r['acquisition_date'] for r in results] == [
+        '20170201', '20170211', '20170214', '20170221', '20170224']
+
+    assert cat.lookup('landsat', '178/119') == [landsat_record]
+    assert cat.lookup('landsat', '178/119', max_cloud=50) == []
+    assert cat.lookup('cbers', 'MUX/217/063') == [cbers_record]
+    assert cat.lookup('sentinel2', '22KHW') == []
+    assert cat.tiles() == [('landsat', '178/119'), ('sentinel2', '22KHV'), ('cbers', 'MUX/217/063')]
+    cat.close()
+
+
+def test_invalid(tmpdir):
+    """Should raise InvalidCatalog."""
+    path = str(tmpdir.join('catalog.bin'))
+    with open(path, 'wb') as f:
+        f.write(b'0' * 64)
+
+    with pytest.raises(InvalidCatalog):
+        catalog.Catalog(path)
+
+
+def test_search_backend(tmpdir, s2_results):
+    """Should serve search from the catalog."""
+    path = str(tmpdir.join('catalog.bin'))
+    catalog.write(path, s2_results + [landsat_record])
+    cat = catalog.Catalog(path)
+
+    results = search.sentinel2(
+        22, 'K', 'HV', start_date=datetime(2017, 1, 12), end_date=datetime(2017, 1, 12),
+        catalog=cat)
+    assert results == s2_results[:1]
+    assert search.landsat(178, 119, catalog=cat) == [landsat_record]
+
+
+def test_write_status(tmpdir, s2_results):
+    """Should skip the records with a status."""
+    path = str(tmpdir.join('catalog.bin'))
+    records = [
+        dict(s2_results[0], status='timeout'),
+        {'tile': 'sentinel2:22KHV', 'status': 'partial'},
+        {'scene_id': 'S2A_tile_20170115_22KHV_0', 'status': 'error'},
+        dict(landsat_record, status='error'),
+        s2_results[1]]
+    assert catalog.write(path, records) == 1
+    assert catalog.Catalog(path).lookup('sentinel2', '22KHV') == [s2_results[1]]
+
+
+def test_search_backend_levels(tmpdir, s2_results):
+    """Should serve the Sentinel 2 records of the requested level and search mode."""
+    l1c_path = str(tmpdir.join('l1c.bin'))
+    catalog.write(l1c_path, s2_results[:2])
+    l2a_path = str(tmpdir.join('l2a.bin'))
+    full_record = dict(s2_results[2], cloud_coverage=10.0, geometry=None, coverage=100)
+    catalog.write(l2a_path, [s2_results[3], full_record], level='l2a')
+
+    l1c, l2a = catalog.Catalog(l1c_path), catalog.Catalog(l2a_path)
+    assert search.sentinel2(22, 'K', 'HV', catalog=l1c) == s2_results[:2]
+    assert search.sentinel2(22, 'K', 'HV', level='l2a', catalog=l1c) == []
+    assert search.sentinel2(22, 'K', 'HV', level='l2a', catalog=l2a) == [full_record, s2_results[3]]
+    assert search.sentinel2(22, 'K', 'HV', level='l2a', full=True, catalog=l2a) == [full_record]
+    assert search.sentinel2(22, 'K', 'HV', levels=['l1c', 'l2a'], catalog=l2a) == []
+
+    joint_path = str(tmpdir.join('joint.bin'))
+    keys = search.s2_acquisition_keys
+    joint = dict(
+        {k: full_record[k] for k in keys},
+        levels={'l1c': {'browseURL': 'l1c'}, 'l2a': {'browseURL': 'l2a', 'cloud_coverage': 10.0}})
+    catalog.write(joint_path, [joint])
+    cat = catalog.Catalog(joint_path)
+    assert search.sentinel2(22, 'K', 'HV', catalog=cat) == []
+    assert search.sentinel2(22, 'K', 'HV', levels=['l1c', 'l2a'], catalog=cat) == [joint]
+    assert search.sentinel2(22, 'K', 'HV', levels=['l2a'], catalog=cat) == [
+        dict(joint, levels={'l2a': joint['levels']['l2a']})]
+    assert search.sentinel2(22, 'K', 'HV', levels=['l1c', 'l2a'], full=True, catalog=cat) == []
+
+
+def test_search_backend_fields(tmpdir, s2_results):
+    """Should validate and project the fields of catalog results."""
+    path = str(tmpdir.join('catalog.bin'))
+    catalog.write(path, s2_results + [landsat_record, cbers_record])
+    cat = catalog.Catalog(path)
+
+    assert search.landsat(178, 119, catalog=cat, fields=['scene_id', 'cloud_coverage']) == [
+        {'scene_id': landsat_record['scene_id'], 'cloud_coverage': 64.66}]
+    assert search.cbers(217, 63, catalog=cat, fields=['acquisition_date']) == [
+        {'acquisition_date': '20160416'}]
+    results = search.sentinel2(22, 'K', 'HV', catalog=cat, fields=['acquisition_date'])
+    assert results == [{'acquisition_date': d} for d in sorted(r['acquisition_date'] for r in s2_results)]
+
+    for func, args in [(search.landsat, (178, 119)), (search.cbers, (217, 63)),
+                       (search.sentinel2, (22, 'K', 'HV'))]:
+        with pytest.raises(ValueError):
+            func(*args, catalog=cat, fields=['foo'])
+
+
+def test_cli(tmpdir, s2_results):
+    """Should write a catalog from JSON lines."""
+    path = str(tmpdir.join('catalog.bin'))
+    lines = '\n'.join(json.dumps(r) for r in s2_results)
+    result = CliRunner().invoke(awssat, ['catalog', path], input=lines)
+    assert result.exit_code == 0
+    assert len(catalog.Catalog(path)) == 22
+
+    result = CliRunner().invoke(awssat, ['catalog', path, '--level', 'l2a'], input=lines)
+    assert result.exit_code == 0
+    assert catalog.Catalog(path).lookup('sentinel2', '22KHV', level='l1c') == []
+    assert len(catalog.Catalog(path).lookup('sentinel2', '22KHV', level='l2a')) == 22
+
+
+def test_build_tiles_filter(tmpdir):
+    """Should add the tiles of records, catalogs and the scene list."""
+    records = [
+        {'acquisition_date': '20170715', 'utm_zone': 22, 'latitude_band': 'K', 'grid_square': 'HV'},
+        {'acquisition_date': '20170716', 'utm_zone': 22, 'latitude_band': 'K', 'grid_square': 'HV'}]
+    path = str(tmpdir.join('catalog.bin'))
+    catalog.write(path, [{
+        'acquisition_date': '20160416', 'path': '217', 'row': '063', 'satellite': 'CBERS',
+        'scene_id': 'CBERS_4_MUX_20160416_217_063_L2', 'sensor': 'MUX'}])
+    index = MagicMock()
+    index.tiles.return_value = [('178', '119')]
+
+    bloom = catalog.build_tiles_filter(records, catalog=catalog.Catalog(path), index=index)
+    assert 'sentinel2:22KHV' in bloom
+    assert 'cbers:MUX/217/063' in bloom
+    assert 'landsat:178/119' in bloom
+
+    output = str(tmpdir.join('tiles.bloom'))
+    lines = ''.join(json.dumps(r) + '\n' for r in records)
+    result = CliRunner().invoke(awssat, ['tiles-filter', output, '-', '--catalog', path], input=lines)
+    assert result.exit_code == 0
+    bloom = BloomFilter.load(output)
+    assert 'sentinel2:22KHV' in bloom
+    assert 'cbers:MUX/217/063' in bloom
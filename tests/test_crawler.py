@@ -0,0 +1,113 @@
+"""tests aws_sat_api.crawler"""
+
+import os
+import json
+
+import pytest
+from mock import patch
+
+from aws_sat_api import crawler
+
+listing = {
+    'tiles/22/': ['tiles/22/K/'],
+    'tiles/22/K/': ['tiles/22/K/HU/', 'tiles/22/K/HV/']}
+
+
+def list_directory(bucket, prefix, **kwargs):
+    return listing.get(prefix, [])
+
+
+def test_list_shards():
+    """Should shard by UTM zone and WRS path."""
+    assert len(crawler.list_shards('sentinel2')) == 60
+    assert crawler.list_shards('landsat')[0] == 'landsat-001'
+    with pytest.raises(ValueError):
+        crawler.list_shards('modis')
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_list_tiles(list_directory_mock):
+    """Should list shard tiles."""
+    list_directory_mock.side_effect = list_directory
+    assert crawler.list_tiles('sentinel2-22') == [
+        dict(utm='22', lat='K', grid='HU'), dict(utm='22', lat='K', grid='HV')]
+
+    list_directory_mock.side_effect = [['c1/L8/178/119/', 'c1/L8/178/120/'], ['L8/178/119/', 'L8/178/246/']]
+    assert crawler.list_tiles('landsat-178') == [
+        dict(path='178', row='119'), dict(path='178', row='120'), dict(path='178', row='246')]
+
+
+@patch('aws_sat_api.search.sentinel2')
+@patch('aws_sat_api.aws.list_directory')
+def test_crawl_resume(list_directory_mock, sentinel2, tmpdir):
+    """Should resume from the last finished tile."""
+    list_directory_mock.side_effect = list_directory
+    outdir = str(tmpdir)
+
+    def _sentinel2(utm, lat, grid, **kwargs):
+        if grid == 'HV':
+            raise RuntimeError('interrupted')
+        return [{'scene_id': f'{utm}{lat}{grid}_{i}'} for i in range(3)]
+
+    sentinel2.side_effect = _sentinel2
+
+    # Simulate records written after the last checkpoint.
+    with open(os.path.join(outdir, 'sentinel2-22.jsonl'), 'w') as f:
+        f.write('{"partial": true}\n')
+
+    assert list(crawler.crawl('sentinel2', outdir, shards=['sentinel2-22'], processes=1)) == [
+        {'shard': 'sentinel2-22', 'error': 'RuntimeError: interrupted'}]
+
+    sentinel2.side_effect = lambda utm, lat, grid, **kwargs: [{'scene_id': f'{utm}{lat}{grid}_0'}]
+    summaries = list(crawler.crawl('sentinel2', outdir, shards=['sentinel2-22'], processes=1))
+    assert summaries == [{'shard': 'sentinel2-22', 'tiles': 1, 'records': 1, 'skipped': 1, 'failed': 0}]
+
+    with open(os.path.join(outdir, 'sentinel2-22.jsonl')) as f:
+        records = [json.loads(line)['scene_id'] for line in f]
+    assert records == ['22KHU_0', '22KHU_1', '22KHU_2', '22KHV_0']
+
+    # Finished shards are not crawled again.
+    assert list(crawler.crawl('sentinel2', outdir, shards=['sentinel2-22'], processes=1)) == summaries
+    assert os.path.exists(os.path.join(outdir, 'sentinel2-22.done'))
+
+
+@patch('aws_sat_api.search.landsat')
+@patch('aws_sat_api.aws.list_directory')
+def test_crawl_shard_error(list_directory_mock, landsat, tmpdir):
+    """Should report a failed shard and crawl the others."""
+    def _list_directory(bucket, prefix, **kwargs):
+        if prefix == 'c1/L8/001/':
+            raise ConnectionError('reset')
+        return [f'{prefix}001/']
+
+    list_directory_mock.side_effect = _list_directory
+    landsat.return_value = [{'scene_id': 'a'}]
+    summaries = list(crawler.crawl('landsat', str(tmpdir), shards=['landsat-001', 'landsat-002'], processes=1))
+    assert summaries == [
+        {'shard': 'landsat-001', 'error': 'ConnectionError: reset'},
+        {'shard': 'landsat-002', 'tiles': 1, 'records': 1, 'skipped': 0, 'failed': 0}]
+
+
+@patch('aws_sat_api.search.sentinel2')
+@patch('aws_sat_api.aws.list_directory')
+def test_crawl_incomplete_tile(list_directory_mock, sentinel2, tmpdir):
+    """Should not checkpoint tiles with failed scenes."""
+    list_directory_mock.side_effect = list_directory
+    outdir = str(tmpdir)
+
+    def _sentinel2(utm, lat, grid, **kwargs):
+        status = {'status': 'error'} if grid == 'HU' else {}
+        return [dict({'scene_id': f'{utm}{lat}{grid}_0'}, **status)]
+
+    sentinel2.side_effect = _sentinel2
+    summary = crawler.crawl_shard('sentinel2-22', outdir)
+    assert (summary['tiles'], summary['failed']) == (1, 1)
+    assert not os.path.exists(os.path.join(outdir, 'sentinel2-22.done'))
+
+    sentinel2.side_effect = lambda utm, lat, grid, **kwargs: [{'scene_id': f'{utm}{lat}{grid}_0'}]
+    summary = crawler.crawl_shard('sentinel2-22', outdir)
+    assert (summary['tiles'], summary['skipped'], summary['failed']) == (1, 1, 0)
+    assert os.path.exists(os.path.join(outdir, 'sentinel2-22.done'))
+
+    with open(os.path.join(outdir, 'sentinel2-22.jsonl')) as f:
+        assert [json.loads(line)['scene_id'] for line in f] == ['22KHV_0', '22KHU_0']
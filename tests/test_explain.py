@@ -0,0 +1,95 @@
+"""tests aws_sat_api.explain"""
+
+import json
+from datetime import datetime, timezone
+
+from mock import patch
+from click.testing import CliRunner
+
+from aws_sat_api import aws, explain, search
+from aws_sat_api.cache import BloomFilter, MemoryCache, NegativeCache
+from aws_sat_api.scripts.cli import awssat
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_landsat_estimate(get_client):
+    """Should estimate the scenes from the revisit time without request."""
+    estimate = explain.landsat(178, 119, full=True)
+    assert estimate['list'] == 2
+    assert estimate['get'] == estimate['scenes'] > 0
+    assert not estimate['exact']
+    assert explain.landsat(178, 119, full=False)['get'] == 0
+    assert explain.landsat(178, 119, fields=['scene_id'])['get'] == 0
+    get_client.assert_not_called()
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_landsat_estimate_cached(get_client, monkeypatch):
+    """Should use the cached listings and objects."""
+    monkeypatch.setattr(aws, 'cache', MemoryCache())
+    monkeypatch.setattr(aws, 'negative_cache', NegativeCache())
+    aws.negative_cache.add('landsat-pds', 'L8/178/119/')
+    scenes = [
+        'c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/',
+        'c1/L8/178/119/LC08_L1GT_178119_20180119_20180119_01_RT/']
+    aws.cache.set(aws.listing_key('landsat-pds', 'c1/L8/178/119/'), scenes)
+    aws.cache.set(aws.object_key(
+        'landsat-pds', f'{scenes[0]}LC08_L1GT_178119_20180103_20180103_01_RT_MTL.json'), b'{}')
+
+    estimate = explain.landsat(178, 119, full=True)
+    assert estimate == {
+        'sensor': 'landsat', 'tile': '178/119', 'list': 0, 'get': 1, 'scenes': 2,
+        'requester_pays': False, 'exact': True}
+    get_client.assert_not_called()
+
+
+def test_sentinel2_estimate():
+    """Should count the listings of the tiles tree."""
+    start = datetime(2017, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2017, 12, 31, tzinfo=timezone.utc)
+    estimate = explain.sentinel2(22, 'K', 'HV', full=True, start_date=start, end_date=end)
+    # 1 year, 12 months, 19 acquisitions at 10 days and 37 at 5 days.
+    assert estimate['scenes'] == 56
+    assert estimate['list'] == 1 + 12 + 56
+    assert estimate['get'] == 56
+    assert estimate['requester_pays']
+
+    joint = explain.sentinel2(22, 'K', 'HV', levels=['l1c', 'l2a'], start_date=start, end_date=end)
+    # No l2a acquisition in 2017, only the year is listed.
+    assert joint['list'] == estimate['list'] + 1
+    assert joint['get'] == 0
+
+
+def test_estimate_filtered(monkeypatch):
+    """Should not count requests for tiles without data."""
+    monkeypatch.setattr(search, 'tiles_filter', BloomFilter.create(['cbers:MUX/217/063']))
+    assert explain.landsat(178, 119, full=True)['list'] == 0
+    assert explain.sentinel2(22, 'K', 'HV')['list'] == 0
+    estimate = explain.cbers(217, 63, full=True)
+    assert estimate['list'] == 1
+    assert estimate['get'] == estimate['scenes'] > 0
+
+
+def test_explain_cli():
+    """Should print the estimates instead of searching."""
+    runner = CliRunner()
+    result = runner.invoke(awssat, ['landsat', '-pr', '178-119,178-120', '--explain'])
+    assert result.exit_code == 0
+    estimates = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [e['tile'] for e in estimates] == ['178/119', '178/120']
+    total = json.loads(result.stderr)
+    assert total['list'] == 4
+    assert total['get'] == sum(e['get'] for e in estimates)
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_max_requests_cli(get_client):
+    """Should stop after the request budget and reset it."""
+    get_client.return_value.get_paginator.return_value.paginate.return_value = [
+        {'CommonPrefixes': [{'Prefix': 'CBERS4/MUX/217/063/CBERS_4_MUX_20171121_217_063_L2/'}]}]
+    runner = CliRunner()
+    result = runner.invoke(awssat, ['--max-requests', '1', 'cbers', '-p', '217', '-r', '063', '--full'])
+    assert result.exit_code == 0
+    assert json.loads(result.stdout)['status'] == 'budget'
+    assert 'used up' in result.stderr
+    assert aws.request_budget is None
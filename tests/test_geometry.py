@@ -0,0 +1,110 @@
+"""tests aws_sat_api.geometry"""
+
+import os
+import json
+
+import pytest
+from mock import patch
+from click.testing import CliRunner
+
+from aws_sat_api import geometry
+from aws_sat_api.scripts.cli import awssat
+
+
+def test_s2_tile_geometry():
+    """Should match tileInfo.json tileGeometry."""
+    path = os.path.join(os.path.dirname(__file__), 'fixtures/tileInfo.json')
+    with open(path, 'r') as f:
+        tile_info = json.loads(f.read())
+
+    assert geometry.s2_tile_geometry(38, 'S', 'NG') == tile_info['tileGeometry']
+
+
+def test_s2_tile_geometry_grid():
+    """Should align tiles on the 60m grid."""
+    geom = geometry.s2_tile_geometry('31', 'U', 'DQ')
+    assert geom['coordinates'][0][0] == [399960.0, 5500020.0]
+    assert geom['crs']['properties']['name'] == 'urn:ogc:def:crs:EPSG:8.8.1:32631'
+
+    geom = geometry.s2_tile_geometry(22, 'K', 'HV')
+    assert geom['coordinates'][0][0] == [799980.0, 7500000.0]
+    assert geom['crs']['properties']['name'] == 'urn:ogc:def:crs:EPSG:8.8.1:32722'
+
+
+def test_utm_to_wgs84():
+    """Should convert UTM coordinates to longitude/latitude."""
+    assert geometry.utm_to_wgs84(500000, 0, 31) == (3.0, 0.0)
+    lon, lat = geometry.utm_to_wgs84(166021.4431, 0, 31)
+    assert lon == pytest.approx(0, abs=1e-7)
+    lon, lat = geometry.utm_to_wgs84(448251.9, 5411932.7, 31)
+    assert (lon, lat) == pytest.approx((2.2945, 48.8582), abs=1e-4)
+    lon, lat = geometry.utm_to_wgs84(500000, 10000000 - 0.9996 * 1105854.83, 22, south=True)
+    assert (lon, lat) == pytest.approx((-51, -10), abs=1e-6)
+
+
+def test_to_wgs84():
+    """Should reproject UTM geometries once and leave lon/lat ones unchanged."""
+    path = os.path.join(os.path.dirname(__file__), 'fixtures/tileInfo.json')
+    with open(path, 'r') as f:
+        tile_geometry = json.loads(f.read())['tileGeometry']
+
+    geom = geometry.to_wgs84(tile_geometry)
+    assert 'crs' not in geom
+    assert 'crs' in tile_geometry
+    assert geom['coordinates'][0][0] == pytest.approx([44.99977, 37.94759], abs=1e-5)
+    assert geom['coordinates'][0][0] == geom['coordinates'][0][-1]
+
+    lonlat = {'type': 'Polygon', 'coordinates': [[[1, 2], [3, 4], [1, 2]]]}
+    assert geometry.to_wgs84(lonlat) is lonlat
+
+
+def test_quantize():
+    """Should round coordinates and drop repeated positions."""
+    geom = {'type': 'Polygon', 'coordinates': [[[1.123456, 2.1], [1.123457, 2.1], [3.5, 4.25], [1.123456, 2.1]]]}
+    assert geometry.quantize(geom, 3)['coordinates'] == [[[1.123, 2.1], [3.5, 4.25], [1.123, 2.1]]]
+
+
+def test_encode():
+    """Should encode rings as flat arrays or polylines."""
+    ring = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+    assert geometry.encode_polyline(ring) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+    assert geometry.decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@') == ring
+
+    geom = {'type': 'Polygon', 'coordinates': [ring]}
+    assert geometry.encode(geom, 'flat') == {
+        'type': 'Polygon', 'encoding': 'flat',
+        'coordinates': [[38.5, -120.2, 40.7, -120.95, 43.252, -126.453]]}
+    encoded = geometry.encode(geom, 'polyline', precision=3)
+    assert encoded['precision'] == 3
+    assert geometry.decode_polyline(encoded['coordinates'][0], 3) == ring
+    assert geometry.encode(geom) is geom
+    with pytest.raises(ValueError):
+        geometry.encode(geom, 'wkb')
+
+
+def test_format_records():
+    """Should format the records and levels geometries."""
+    tile_geometry = geometry.s2_tile_geometry(38, 'S', 'NG')
+    records = [
+        {'scene_id': 'a', 'geometry': tile_geometry},
+        {'scene_id': 'b', 'levels': {'l1c': {'geometry': tile_geometry}}},
+        {'scene_id': 'c'}]
+    assert geometry.format_records(records) is records
+
+    formatted = geometry.format_records(records, wgs84=True, precision=4)
+    assert formatted[0]['geometry']['coordinates'][0][0] == [44.9998, 37.9476]
+    assert formatted[1]['levels']['l1c']['geometry'] == formatted[0]['geometry']
+    assert formatted[2] == {'scene_id': 'c'}
+    assert records[0]['geometry'] is tile_geometry
+
+
+@patch('aws_sat_api.search.sentinel2')
+def test_cli_geometry_options(sentinel2):
+    """Should format output geometries."""
+    sentinel2.return_value = [{'scene_id': 'a', 'geometry': geometry.s2_tile_geometry(38, 'S', 'NG')}]
+    result = CliRunner().invoke(
+        awssat, ['sentinel', '-t', '38SNG', '--wgs84', '--precision', '4', '--geometry-encoding', 'flat'])
+    assert not result.exception
+    geom = json.loads(result.output)['geometry']
+    assert geom['encoding'] == 'flat'
+    assert geom['coordinates'][0][:2] == [44.9998, 37.9476]
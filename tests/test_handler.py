@@ -0,0 +1,128 @@
+"""tests aws_sat_api.handler"""
+
+import gzip
+import json
+import base64
+
+import pytest
+from mock import patch
+
+from aws_sat_api import aws, handler, search
+from aws_sat_api.cache import MemoryCache
+
+
+@pytest.fixture(autouse=True)
+def cold_start():
+    """Reset the warm state between tests."""
+    yield
+    if search.executor is not None:
+        search.executor.shutdown()
+    search.executor = None
+    aws.negative_cache = None
+    handler.cache = None
+    handler.store = None
+
+
+records = [{'scene_id': f'S2A_tile_20170323_22KHV_{i}', 'acquisition_date': '20170323'} for i in range(50)]
+
+
+@patch('aws_sat_api.search.sentinel2')
+def test_handler(sentinel2):
+    """Should return gzip-compressed results and reuse the warm state."""
+    sentinel2.return_value = records
+    event = {'sensor': 'sentinel2', 'utm': '22', 'lat': 'K', 'grid': 'HV', 'full': 'false',
+             'start_date': '2017-03-01'}
+    response = handler.handler(event)
+    assert response['statusCode'] == 200
+    assert response['headers']['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(base64.b64decode(response['body']))) == records
+
+    args, kwargs = sentinel2.call_args
+    assert args == ('22', 'K', 'HV')
+    assert not kwargs['full']
+    assert kwargs['start_date'].year == 2017
+    assert isinstance(kwargs['cache'], MemoryCache)
+
+    executor = search.executor
+    handler.handler({'queryStringParameters': dict(event, sensor='sentinel2')})
+    assert search.executor is executor
+    assert sentinel2.call_args[1]['cache'] is kwargs['cache']
+
+
+@patch('aws_sat_api.search.landsat')
+def test_handler_offload(landsat, tmpdir, monkeypatch):
+    """Should offload large payloads to the object store."""
+    landsat.return_value = records
+    monkeypatch.setattr(handler, 'max_response_size', 100)
+
+    response = handler.handler({'sensor': 'landsat', 'path': '178', 'row': '119'})
+    assert response['statusCode'] == 413
+
+    handler.store = handler.LocalStore(str(tmpdir))
+    response = handler.handler({'sensor': 'landsat', 'path': '178', 'row': '119'}, None)
+    assert response['statusCode'] == 303
+    reference = json.loads(response['body'])
+    assert reference['count'] == 50
+    assert response['headers']['Location'] == reference['url']
+    with gzip.open(reference['location']) as f:
+        assert json.loads(f.read()) == records
+
+
+@patch('aws_sat_api.search.landsat')
+def test_handler_max_requests(landsat, monkeypatch):
+    """Should give each invocation its own request budget and flag partial results."""
+    def _search(*args, **kwargs):
+        budgets.append(aws.request_budget)
+        aws.request_budget.used = aws.request_budget.max_requests
+        if len(budgets) == 2:
+            aws.request_budget.rejected = 1
+        return records
+
+    budgets = []
+    landsat.side_effect = _search
+    monkeypatch.setattr(handler, 'max_requests', 10)
+
+    response = handler.handler({'sensor': 'landsat', 'path': '178', 'row': '119'})
+    assert 'X-Partial-Results' not in response['headers']
+    response = handler.handler({'sensor': 'landsat', 'path': '178', 'row': '119'})
+    assert response['headers']['X-Partial-Results'] == 'request-budget'
+    assert budgets[0] is not budgets[1]
+    assert aws.request_budget is None
+
+
+@patch('aws_sat_api.search.landsat')
+def test_handler_timeout(landsat):
+    """Should flag results missing dropped listings."""
+    landsat.return_value = search.SearchResults(records, partial=True)
+    response = handler.handler({'sensor': 'landsat', 'path': '178', 'row': '119', 'timeout': '1'})
+    assert response['statusCode'] == 200
+    assert response['headers']['X-Partial-Results'] == 'timeout'
+
+
+def test_handler_invalid():
+    """Should return client errors."""
+    assert handler.handler({'sensor': 'modis'})['statusCode'] == 400
+    assert handler.handler({'sensor': 'landsat'})['statusCode'] == 400
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_s3_store(get_client):
+    """Should put the object and return a pre-signed url."""
+    get_client.return_value.generate_presigned_url.return_value = 'https://url'
+    store = handler.S3Store('my-bucket', 'results')
+    reference = store.put('id.json.gz', b'data', 'application/json', 'gzip')
+    assert reference == {'location': 's3://my-bucket/results/id.json.gz', 'url': 'https://url'}
+    get_client.return_value.put_object.assert_called_once_with(
+        Bucket='my-bucket', Key='results/id.json.gz', Body=b'data',
+        ContentType='application/json', ContentEncoding='gzip')
+
+
+@patch('aws_sat_api.search.landsat')
+def test_handler_cache_url(landsat, tmpdir, monkeypatch):
+    """Should share the listings, objects and queries cache from CACHE_URL."""
+    landsat.return_value = []
+    monkeypatch.setattr(handler, 'cache_url', f'file://{tmpdir}')
+    handler.handler({'sensor': 'landsat', 'path': '178', 'row': '119'})
+    assert aws.cache is handler.cache
+    assert aws.cache.directory == str(tmpdir)
+    aws.cache = None
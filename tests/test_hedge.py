@@ -0,0 +1,96 @@
+"""tests aws_sat_api.hedge"""
+
+import time
+import threading
+
+import pytest
+from mock import patch
+
+from aws_sat_api import aws
+from aws_sat_api.hedge import Hedger
+
+
+def warm(hedger, op='s3.get', latency=0.01, count=20):
+    for _ in range(count):
+        hedger.record(op, latency)
+    hedger.requests = 1000
+
+
+def test_threshold():
+    """Should learn the latency percentile of each operation."""
+    hedger = Hedger(percentile=90, min_samples=10)
+    for i in range(9):
+        hedger.record('s3.get', i / 100)
+    assert hedger.threshold('s3.get') is None
+
+    for i in range(9, 100):
+        hedger.record('s3.get', i / 100)
+    assert hedger.threshold('s3.get') == 0.9
+    assert hedger.threshold('s3.list') is None
+
+
+def test_call_hedged():
+    """Should send a hedge after the threshold and return the first answer."""
+    hedger = Hedger()
+    warm(hedger)
+    calls = []
+    release = threading.Event()
+
+    def _request():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return 'slow'
+        return 'fast'
+
+    span = {}
+    assert hedger.call('s3.get', _request, span=span) == 'fast'
+    assert span['hedged']
+    assert hedger.hedges == 1
+    release.set()
+
+
+def test_call_budget():
+    """Should not hedge over budget."""
+    hedger = Hedger(budget=0)
+    warm(hedger)
+    calls = []
+
+    def _request():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'slow'
+
+    assert hedger.call('s3.get', _request) == 'slow'
+    assert len(calls) == 1
+    assert hedger.hedges == 0
+
+
+def test_call_error():
+    """Should fall back on the other attempt when the first answer fails."""
+    hedger = Hedger()
+    warm(hedger)
+    calls = []
+
+    def _request():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.05)
+            return 'slow'
+        raise ValueError('failed')
+
+    assert hedger.call('s3.get', _request) == 'slow'
+
+    with pytest.raises(ValueError):
+        Hedger().call('s3.get', lambda: int('a'))
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_aws_hedged(get_client, monkeypatch):
+    """Should hedge S3 requests when enabled."""
+    hedger = Hedger()
+    monkeypatch.setattr(aws, 'hedger', hedger)
+    get_client.return_value.get_object.return_value = {
+        'Body': type('Body', (), {'read': lambda self: b'data'})()}
+    assert aws.get_object('my-bucket', 'my-key') == b'data'
+    assert hedger.requests == 1
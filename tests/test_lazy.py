@@ -0,0 +1,101 @@
+"""tests aws_sat_api.lazy"""
+
+import json
+import threading
+
+import pytest
+
+from mock import Mock, patch
+
+from aws_sat_api import lazy, search
+
+
+def records(count, fetch=None):
+    fetch = fetch or (lambda r: {'cloud_coverage': int(r['scene_id'])})
+    loader = lazy.Loader(Mock(side_effect=fetch))
+    return loader, [lazy.LazyRecord({'scene_id': str(i)}, loader, ['cloud_coverage']) for i in range(count)]
+
+
+def test_lazy_record():
+    """Should fetch the metadata on first access of a metadata field."""
+    loader, (record,) = records(1)
+    assert record['scene_id'] == '0'
+    assert not loader.fetch.called
+    assert json.loads(json.dumps(record)) == {'scene_id': '0'}
+
+    assert record.get('cloud_coverage') == 0
+    assert record['cloud_coverage'] == 0
+    assert record.loaded
+    assert loader.fetch.call_count == 1
+    assert json.loads(json.dumps(record)) == {'scene_id': '0', 'cloud_coverage': 0}
+
+
+def test_lazy_coalesced():
+    """Should fetch the concurrent accesses in one batch."""
+    loader, items = records(10)
+    loader.window = 0.1
+    values = {}
+
+    def _access(record):
+        values[record['scene_id']] = record['cloud_coverage']
+
+    threads = [threading.Thread(target=_access, args=(r,)) for r in items[:5]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert values == {str(i): i for i in range(5)}
+    assert loader.batches == 1
+    assert loader.fetch.call_count == 5
+    assert not any(r.loaded for r in items[5:])
+
+
+def test_lazy_load():
+    """Should load a subset of records at once."""
+    loader, items = records(10)
+    assert lazy.load(r for r in items if int(r['scene_id']) % 2) == items[1::2]
+    assert loader.batches == 1
+    assert all(r.loaded for r in items[1::2])
+    assert not any(r.loaded for r in items[::2])
+
+    lazy.load(items[1::2])
+    assert loader.fetch.call_count == 5
+
+
+def test_lazy_error():
+    """Should raise the fetch errors on access."""
+    def _fail(record):
+        raise IOError('boom')
+
+    _, (record,) = records(1, fetch=_fail)
+    with pytest.raises(IOError):
+        record['cloud_coverage']
+    assert not record.loaded
+
+
+@patch('aws_sat_api.aws.get_object')
+@patch('aws_sat_api.aws.list_directory')
+def test_landsat_lazy(list_directory, get_object):
+    """Should only fetch the MTL of the inspected scenes."""
+    list_directory.side_effect = [
+        ['c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/',
+         'c1/L8/178/119/LC08_L1GT_178119_20180119_20180119_01_RT/'],
+        []]
+    get_object.return_value = json.dumps({'L1_METADATA_FILE': {
+        'IMAGE_ATTRIBUTES': {'CLOUD_COVER': 12.5},
+        'PRODUCT_METADATA': {f'CORNER_{c}_{a}_PRODUCT': 0 for c in ['UR', 'UL', 'LL', 'LR'] for a in ['LAT', 'LON']}}})
+
+    results = search.landsat(178, 119, full=True, lazy=True)
+    assert len(results) == 2
+    assert not get_object.called
+
+    recent = [r for r in results if r['acquisition_date'] > '20180110']
+    assert recent[0]['cloud_coverage'] == 12.5
+    assert get_object.call_count == 1
+    assert 'cloud_coverage' not in dict.keys(results[0])
+
+    with pytest.raises(ValueError):
+        search.landsat(178, 119, fields=['geometry'], lazy=True)
+    with pytest.raises(ValueError):
+        search.sentinel2(22, 'K', 'HV', levels=['l1c', 'l2a'], lazy=True)
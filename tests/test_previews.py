@@ -0,0 +1,105 @@
+"""tests aws_sat_api.previews"""
+
+import os
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+from click.testing import CliRunner
+
+from aws_sat_api import previews
+from aws_sat_api.scripts.cli import awssat
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.path.startswith('/missing'):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = self.path.encode() * 100
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), PreviewHandler)
+    httpd.connections = 0
+    httpd.requests = 0
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f'http://127.0.0.1:{httpd.server_address[1]}'
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def records(url, count):
+    return [{'scene_id': f'scene{i}', 'thumbURL': f'{url}/{i}_small.jpeg', 'browseURL': f'{url}/{i}.jpg'}
+            for i in range(count)]
+
+
+def test_preview_urls():
+    """Should name previews after the scene id."""
+    record = {'scene_id': 'a', 'browseURL': 'https://host/preview.jpg', 'thumbURL': None}
+    assert previews.preview_urls(record) == [('a_browse.jpg', 'https://host/preview.jpg')]
+
+
+def test_download(server, tmpdir):
+    """Should download concurrently over kept-alive connections and skip existing files."""
+    store = previews.DirectoryStore(str(tmpdir))
+    results = list(previews.download(records(server.url, 20), store, concurrency=2))
+    assert len(results) == 40
+    assert all(r['status'] == 'downloaded' for r in results)
+    assert server.connections <= 2
+    with open(os.path.join(str(tmpdir), 'scene3_thumb.jpeg'), 'rb') as f:
+        assert f.read() == b'/3_small.jpeg' * 100
+
+    results = list(previews.download(records(server.url, 21), store, fields=['thumbURL']))
+    assert sorted(r['status'] for r in results) == ['downloaded'] + ['skipped'] * 20
+    assert server.requests == 41
+
+
+def test_download_errors(server):
+    """Should report failed downloads."""
+    store = previews.LRUStore()
+    record = {'scene_id': 'a', 'browseURL': f'{server.url}/missing.jpg'}
+    result, = previews.download([record], store)
+    assert result['status'] == 'error'
+    assert not store.exists('a_browse.jpg')
+
+
+def test_lru_store():
+    """Should evict the least recently used previews."""
+    store = previews.LRUStore(max_bytes=10)
+    store.write('a', [b'aaaa'])
+    store.write('b', [b'bbbb'])
+    assert store.get('a') == b'aaaa'
+    store.write('c', [b'cccc'])
+    assert store.exists('a') and store.exists('c')
+    assert not store.exists('b')
+    assert store.size == 8
+
+
+def test_cli(server, tmpdir):
+    """Should download previews of JSON lines results."""
+    data = '\n'.join(json.dumps(r) for r in records(server.url, 3))
+    result = CliRunner().invoke(awssat, ['previews', str(tmpdir), '--field', 'browseURL'], input=data)
+    assert not result.exception
+    assert json.loads(result.output.splitlines()[-1]) == {'downloaded': 3, 'skipped': 0, 'error': 0}
@@ -0,0 +1,154 @@
+"""tests aws_sat_api.scene_list"""
+
+import os
+import gzip
+import json
+import time
+
+from mock import patch, MagicMock
+from click.testing import CliRunner
+
+from aws_sat_api import explain, search
+from aws_sat_api.scene_list import SceneList
+from aws_sat_api.scripts.cli import awssat
+
+scene_list = """productId,entityId,acquisitionDate,cloudCover,processingLevel,path,row,min_lat,min_lon,max_lat,max_lon,download_url
+LC08_L1GT_178119_20180119_20180119_01_RT,LC81781192018019LGN00,2018-01-19 04:43:51.373143,12.5,L1GT,178,119,-82.3,-55.4,-79.2,-36.2,https://s3-us-west-2.amazonaws.com/landsat-pds/c1/L8/178/119/LC08_L1GT_178119_20180119_20180119_01_RT/index.html
+LC08_L1GT_178119_20180103_20180103_01_RT,LC81781192018003LGN00,2018-01-03 04:43:55.373143,64.66,L1GT,178,119,-82.33114,-55.38046,-79.24248,-36.27662,https://s3-us-west-2.amazonaws.com/landsat-pds/c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/index.html
+LC08_L1TP_005004_20170410_20170414_01_T1,LC80050042017100LGN00,2017-04-10 15:42:16.140853,1.2,L1TP,5,4,78.1,-70.5,80.4,-60.2,https://s3-us-west-2.amazonaws.com/landsat-pds/c1/L8/005/004/LC08_L1TP_005004_20170410_20170414_01_T1/index.html
+"""
+
+
+def write_scene_list(directory):
+    path = os.path.join(str(directory), 'scene_list.gz')
+    with gzip.open(path, 'wt') as f:
+        f.write(scene_list)
+    return path
+
+
+def test_lookup(tmpdir):
+    """Should return the path/row scenes sorted by date."""
+    write_scene_list(tmpdir)
+    index = SceneList(directory=str(tmpdir))
+
+    scenes = index.lookup(178, 119)
+    assert [s['acquisition_date'] for s in scenes] == ['20180103', '20180119']
+    assert scenes[0]['cloud_coverage'] == 64.66
+    assert index.lookup('178', '119', start='20180110') == scenes[1:]
+    assert index.lookup(5, 4, end='20170410')[0]['scene_id'] == 'LC08_L1TP_005004_20170410_20170414_01_T1'
+    assert not index.lookup(1, 1)
+    assert index.last_date == '20180119'
+    assert index.tiles() == [('005', '004'), ('178', '119')]
+
+
+@patch('aws_sat_api.scene_list.unsigned.http')
+def test_refresh_not_modified(http, tmpdir):
+    """Should send a conditional request and keep the local file."""
+    path = write_scene_list(tmpdir)
+    with open(f'{path}.etag', 'w') as f:
+        f.write('"abc"')
+    os.utime(path, (0, 0))
+
+    http.request.return_value = MagicMock(status=304)
+    index = SceneList(directory=str(tmpdir))
+    assert not index.refresh()
+    assert http.request.call_args[1]['headers'] == {'If-None-Match': '"abc"'}
+    assert time.time() - os.path.getmtime(path) < 60
+
+
+@patch('aws_sat_api.scene_list.unsigned.http')
+def test_refresh_download(http, tmpdir):
+    """Should download the scene list."""
+    content = gzip.compress(scene_list.encode())
+    http.request.return_value = MagicMock(
+        status=200, headers={'ETag': '"def"'}, stream=MagicMock(return_value=[content]))
+
+    index = SceneList(directory=str(tmpdir.join('cache')))
+    assert len(index.lookup(178, 119)) == 2
+    with open(f'{index.path}.etag') as f:
+        assert f.read() == '"def"'
+
+
+@patch('aws_sat_api.aws.get_object')
+@patch('aws_sat_api.aws.list_directory')
+def test_landsat_index(list_directory, get_object, tmpdir):
+    """Should serve indexed scenes without metadata requests."""
+    path = write_scene_list(tmpdir)
+    os.utime(path, (0, 0))
+    index = SceneList(directory=str(tmpdir))
+    index.load()
+
+    list_directory.side_effect = [
+        [],
+        ['c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/',
+         'c1/L8/178/119/LC08_L1GT_178119_20180119_20180119_01_RT/',
+         'c1/L8/178/119/LC08_L1GT_178119_20180204_20180204_01_RT/']]
+    get_object.side_effect = Exception('No MTL')
+
+    with patch.object(index, 'update') as update:
+        results = search.landsat(178, 119, full=True, index=index)
+    assert [r['acquisition_date'] for r in results] == ['20180103', '20180119', '20180204']
+    assert results[0]['cloud_coverage'] == 64.66
+    assert results[0]['geometry']['coordinates'][0][0] == [-36.27662, -79.24248]
+    assert results[0]['partial']
+    assert 'sun_azimuth' not in results[0]
+    assert results[2]['status'] == 'error'
+    assert 'partial' not in results[2]
+    get_object.assert_called_once()
+    index._refresh_thread.join()
+    update.assert_called_once_with()
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_landsat_index_fresh(list_directory, tmpdir):
+    """Should not list the path/row while the index is fresh."""
+    write_scene_list(tmpdir)
+    index = SceneList(directory=str(tmpdir))
+    index.load()
+
+    results = search.landsat(178, 119, index=index)
+    assert [r['acquisition_date'] for r in results] == ['20180103', '20180119']
+    assert not list_directory.called
+    assert index._refresh_thread is None
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_landsat_index_not_loaded(list_directory, tmpdir):
+    """Should search without the index while it is loaded in the background."""
+    index = SceneList(directory=str(tmpdir))
+    list_directory.side_effect = [
+        [], ['c1/L8/178/119/LC08_L1GT_178119_20180204_20180204_01_RT/']]
+
+    with patch.object(index, 'update') as update:
+        results = search.landsat(178, 119, index=index)
+        index._refresh_thread.join()
+    assert [r['acquisition_date'] for r in results] == ['20180204']
+    assert 'partial' not in results[0]
+    update.assert_called_once_with()
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_landsat_index_explain(get_client, tmpdir):
+    """Should estimate no request while the index is fresh."""
+    write_scene_list(tmpdir)
+    index = SceneList(directory=str(tmpdir))
+    index.load()
+
+    estimate = explain.landsat(178, 119, full=True, index=index)
+    assert estimate == {
+        'sensor': 'landsat', 'tile': '178/119', 'list': 0, 'get': 0, 'scenes': 2,
+        'requester_pays': False, 'exact': True}
+    get_client.assert_not_called()
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_landsat_index_cli(list_directory, tmpdir):
+    """Should load the index before searching."""
+    write_scene_list(tmpdir)
+
+    with patch('aws_sat_api.scripts.cli.SceneList', lambda: SceneList(directory=str(tmpdir))):
+        result = CliRunner().invoke(awssat, ['landsat', '-p', '178', '-r', '119', '--simple', '--scene-list'])
+    assert result.exit_code == 0
+    scenes = [json.loads(line) for line in result.output.splitlines()]
+    assert [s['acquisition_date'] for s in scenes] == ['20180103', '20180119']
+    assert not list_directory.called
@@ -2,13 +2,18 @@
 
 import os
 import json
+import time
+import threading
 from io import BytesIO
-from datetime import date, datetime
+from datetime import date, datetime, timedelta, timezone
+from concurrent import futures
 
 import pytest
-from mock import patch
+from mock import Mock, patch
 
-from aws_sat_api import search
+from aws_sat_api import aws, search
+from aws_sat_api.cache import MemoryCache
+from aws_sat_api.throttle import RequestBudget
 from botocore.exceptions import ClientError
 
 
@@ -104,6 +109,11 @@ def test_get_s2_info_botoError(get_object):
         'path': 'tiles/38/S/NG/2017/10/9/1/',
         'sat': 'S2A',
         'scene_id': 'S2A_tile_20171009_38SNG_1',
+        'status': 'error',
+        'error': {
+            'key': 'tiles/38/S/NG/2017/10/9/1/tileInfo.json',
+            'type': 'ClientError',
+            'message': 'An error occurred (500) when calling the get_object operation: Error'},
         'utm_zone': '38'}
 
     assert search.get_s2_info(bucket, scene_path, full, s3, request_pays) == expected
@@ -261,6 +271,11 @@ def test_get_l8_info_botoError(get_object):
         'satellite': 'L8',
         'scene_id': 'LC81782462014232LGN00',
         'sensor': 'C',
+        'status': 'error',
+        'error': {
+            'key': 'L8/178/246/LC81782462014232LGN00/LC81782462014232LGN00_MTL.json',
+            'type': 'ClientError',
+            'message': 'An error occurred (500) when calling the get_object operation: Error'},
         'thumbURL':
             'https://landsat-pds.s3.amazonaws.com/L8/178/246/LC81782462014232LGN00/LC81782462014232LGN00_thumb_small.jpg'}
 
@@ -346,13 +361,13 @@ def test_get_l8_info_validFullc1(get_object):
     get_object.assert_called_once()
 
 
-@patch('aws_sat_api.search.boto3_session')
+@patch('aws_sat_api.aws.get_client')
 @patch('aws_sat_api.aws.list_directory')
-def test_landsat_valid(list_directory, session):
+def test_landsat_valid(list_directory, get_client):
     """Should work as expected
     """
 
-    session.return_value.client.return_value.get_object.return_value = True
+    get_client.return_value.get_object.return_value = True
 
     list_directory.side_effect = [
         ['c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/'],
@@ -363,13 +378,13 @@ def test_landsat_valid(list_directory, session):
     full = False
 
     assert list(search.landsat(path, row, full))
-    session.return_value.client.return_value.get_object.assert_not_called()
+    get_client.return_value.get_object.assert_not_called()
     assert list_directory.call_count == 2
 
 
-@patch('aws_sat_api.search.boto3_session')
+@patch('aws_sat_api.aws.get_client')
 @patch('aws_sat_api.aws.list_directory')
-def test_landsat_validFull(list_directory, session):
+def test_landsat_validFull(list_directory, get_client):
     """Should work as expected
     """
 
@@ -381,7 +396,7 @@ def test_landsat_validFull(list_directory, session):
     with open(path, 'rb') as f:
         L8 = {'Body': BytesIO(f.read())}
 
-    session.return_value.client.return_value.get_object.side_effect = [c1L8, L8]
+    get_client.return_value.get_object.side_effect = [c1L8, L8]
 
     list_directory.side_effect = [
         ['c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/'],
@@ -392,18 +407,16 @@ def test_landsat_validFull(list_directory, session):
     full = True
 
     assert list(search.landsat(path, row, full))
-    assert session.return_value.client.return_value.get_object.call_count == 2
+    assert get_client.return_value.get_object.call_count == 2
     assert list_directory.call_count == 2
 
 
-@patch('aws_sat_api.search.boto3_session')
+@patch('aws_sat_api.aws.get_client')
 @patch('aws_sat_api.aws.list_directory')
-def test_cbers_mux_valid(list_directory, session):
+def test_cbers_mux_valid(list_directory, get_client):
     """Should work as expected
     """
 
-    session.return_value.client.return_value = True
-
     list_directory.return_value = [
         'CBERS4/MUX/217/063/CBERS_4_MUX_20160416_217_063_L2/']
 
@@ -427,14 +440,13 @@ def test_cbers_mux_valid(list_directory, session):
 
     assert list(search.cbers(path, row)) == expected
 
-@patch('aws_sat_api.search.boto3_session')
+
+@patch('aws_sat_api.aws.get_client')
 @patch('aws_sat_api.aws.list_directory')
-def test_cbers_awfi_valid(list_directory, session):
+def test_cbers_awfi_valid(list_directory, get_client):
     """Should work as expected
     """
 
-    session.return_value.client.return_value = True
-
     list_directory.return_value = [
         'CBERS4/AWFI/123/093/CBERS_4_AWFI_20170411_123_093_L4/']
 
@@ -460,6 +472,18 @@ def test_cbers_awfi_valid(list_directory, session):
     assert list(search.cbers(path, row, sensor)) == expected
 
 
+def s2_listing(fixt):
+    """Return a list_directory mock answering from the s2_search_2017 fixture."""
+    listing = {'tiles/22/K/HV/2017/': fixt["months"]}
+    listing.update(zip(fixt["months"], fixt["days"]))
+    listing.update((v[0].rsplit('/', 2)[0] + '/', v) for v in fixt["versions"])
+
+    def list_directory(bucket, prefix, **kwargs):
+        return listing.get(prefix, [])
+
+    return list_directory
+
+
 @patch('aws_sat_api.aws.list_directory')
 def test_s2_date_filter(list_directory):
     start_date = datetime(2017, 1, 1)
@@ -469,10 +493,7 @@ def test_s2_date_filter(list_directory):
     with open(path, 'r') as f:
         fixt = json.loads(f.read())
 
-    list_directory.side_effect = [
-        fixt["months"],
-        *fixt["days"],
-        *fixt["versions"]]
+    list_directory.side_effect = s2_listing(fixt)
 
     results_date_filter = list(search.sentinel2(22, "K", "HV", start_date=start_date, end_date=end_date))
     assert len(results_date_filter) == 22
@@ -488,10 +509,7 @@ def test_s2_date_filter_single_day(list_directory):
     with open(path, 'r') as f:
         fixt = json.loads(f.read())
 
-    list_directory.side_effect = [
-        fixt["months"],
-        *fixt["days"],
-        *fixt["versions"]]
+    list_directory.side_effect = s2_listing(fixt)
 
     results_date_filter = list(search.sentinel2(22, "K", "HV", start_date=start_date, end_date=end_date))
     assert len(results_date_filter) == 1
@@ -505,3 +523,575 @@ def test_s2_date_exceptions():
 
     with pytest.raises(ValueError, match="Invalid date range"):
         search.sentinel2(22, "K", "HV", start_date=datetime(2017, 5, 1), end_date=datetime(2017, 1, 15))
+
+
+@patch('aws_sat_api.aws.get_object')
+@patch('aws_sat_api.aws.list_directory')
+def test_cbers_mux_validFull(list_directory, get_object):
+    """Should work as expected
+    """
+
+    path = os.path.join(os.path.dirname(__file__), f'fixtures/CBERS_4_MUX_20160416_217_063_L2_BAND6.xml')
+    with open(path, 'rb') as f:
+        get_object.return_value = f.read()
+
+    list_directory.return_value = [
+        'CBERS4/MUX/217/063/CBERS_4_MUX_20160416_217_063_L2/']
+
+    results = list(search.cbers('217', '063', full=True))
+    assert len(results) == 1
+    assert results[0]['cloud_coverage'] == 10.0
+    assert results[0]['sun_azimuth'] == 60.8923
+    assert results[0]['sun_elevation'] == 55.4417
+    assert results[0]['geometry'] == {
+        'type': 'Polygon',
+        'coordinates': [[
+            [-38.00537, -5.30152],
+            [-39.17389, -5.13718],
+            [-39.40582, -6.17185],
+            [-38.23563, -6.33641],
+            [-38.00537, -5.30152]]]}
+    assert get_object.call_args[0] == (
+        'cbers-meta-pds',
+        'CBERS4/MUX/217/063/CBERS_4_MUX_20160416_217_063_L2/CBERS_4_MUX_20160416_217_063_L2_BAND6.xml')
+
+
+@patch('aws_sat_api.aws.get_object')
+def test_get_cbers_info_botoError(get_object):
+    """Should return the simple record
+    """
+
+    get_object.side_effect = ClientError(
+        {'Error': {'Code': 500, 'Message': 'Error'}}, 'get_object')
+
+    info = search.get_cbers_info('CBERS_4_AWFI_20170411_123_093_L4', full=True)
+    assert 'geometry' not in info
+    assert info['scene_id'] == 'CBERS_4_AWFI_20170411_123_093_L4'
+    assert get_object.call_args[0][1].endswith('_BAND14.xml')
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_s2_date_filter_month_pruning(list_directory):
+    """Should not list months outside the date range."""
+    path = os.path.join(os.path.dirname(__file__), f'fixtures/s2_search_2017.json')
+    with open(path, 'r') as f:
+        fixt = json.loads(f.read())
+
+    list_directory.side_effect = s2_listing(fixt)
+
+    start_date = datetime(2017, 1, 1)
+    end_date = datetime(2017, 5, 15)
+    list(search.sentinel2(22, "K", "HV", start_date=start_date, end_date=end_date))
+    prefixes = [c[0][1] for c in list_directory.call_args_list]
+    assert 'tiles/22/K/HV/2017/6/' not in prefixes
+    # 1 year + 5 months + 22 days
+    assert len(prefixes) == 28
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_s2_sealed_cache(list_directory):
+    """Should serve the sealed range from cache."""
+    path = os.path.join(os.path.dirname(__file__), f'fixtures/s2_search_2017.json')
+    with open(path, 'r') as f:
+        fixt = json.loads(f.read())
+
+    list_directory.side_effect = s2_listing(fixt)
+    cache = MemoryCache()
+
+    start_date = datetime(2017, 1, 1)
+    end_date = datetime(2017, 5, 15)
+    results = list(search.sentinel2(22, "K", "HV", start_date=start_date, end_date=end_date, cache=cache))
+    assert results == fixt["results"]
+    assert cache.get('sentinel2:22KHV:l1c:0:2017')['end'] == '20170515'
+
+    list_directory.reset_mock()
+    results = list(search.sentinel2(22, "K", "HV", start_date=start_date, end_date=end_date, cache=cache))
+    assert results == fixt["results"]
+    list_directory.assert_not_called()
+
+    results = list(search.sentinel2(
+        22, "K", "HV", start_date=datetime(2017, 1, 12), end_date=datetime(2017, 1, 12), cache=cache))
+    assert results == fixt["results"][:1]
+    list_directory.assert_not_called()
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_s2_sealed_cache_tail(list_directory):
+    """Should only search the recent tail."""
+    list_directory.return_value = []
+    cache = MemoryCache()
+    now = datetime.now(timezone.utc)
+    for year in range(2015, now.year + 1):
+        cache.set(f'sentinel2:22KHV:l1c:0:{year}', {
+            'start': f'{year}0101', 'end': f'{year}1231', 'records': []})
+
+    search.sentinel2(22, "K", "HV", cache=cache)
+    years = range((now - timedelta(days=search.sealed_after_days)).year, now.year + 1)
+    assert [c[0][1] for c in list_directory.call_args_list] == [f'tiles/22/K/HV/{y}/' for y in years]
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_search_sealed_cache(list_directory):
+    """Should share the yearly sealed entries between search and sentinel2."""
+    list_directory.return_value = []
+    cache = MemoryCache()
+    tiles = {'sentinel2': [{'utm': 22, 'lat': 'K', 'grid': 'HV'}]}
+    start_date = datetime(2016, 1, 1, tzinfo=timezone.utc)
+    end_date = datetime(2019, 12, 31, tzinfo=timezone.utc)
+
+    assert list(search.search(['sentinel2'], tiles, start_date, end_date, cache=cache)) == []
+    assert list_directory.call_count == 4
+
+    list_directory.reset_mock()
+    assert list(search.search(['sentinel2'], tiles, start_date, end_date, cache=cache)) == []
+    assert search.sentinel2(22, 'K', 'HV', start_date=start_date, end_date=end_date, cache=cache) == []
+    list_directory.assert_not_called()
+
+
+@patch('aws_sat_api.search.get_l8_info')
+@patch('aws_sat_api.aws.list_directory')
+def test_landsat_sealed_cache(list_directory, get_l8_info):
+    """Should only fetch metadata for new scenes."""
+    list_directory.side_effect = [
+        ['c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/'],
+        ['L8/178/119/LC81781192017016LGN00/'],
+        ['c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/'],
+        ['L8/178/119/LC81781192017016LGN00/']]
+    get_l8_info.side_effect = lambda scene_id, **kwargs: {
+        'scene_id': scene_id, 'acquisition_date': scene_id[17:25] if '_' in scene_id else '20170116'}
+
+    cache = MemoryCache()
+    first = search.landsat(178, 119, cache=cache)
+    assert get_l8_info.call_count == 2
+    second = search.landsat(178, 119, cache=cache)
+    assert get_l8_info.call_count == 2
+    assert first == second
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_s2_joint_levels(list_directory):
+    """Should traverse both buckets and return one record per acquisition."""
+    listing = {
+        'sentinel-s2-l1c': {
+            'tiles/22/K/HV/2018/': ['tiles/22/K/HV/2018/1/'],
+            'tiles/22/K/HV/2018/1/': ['tiles/22/K/HV/2018/1/2/', 'tiles/22/K/HV/2018/1/7/'],
+            'tiles/22/K/HV/2018/1/2/': ['tiles/22/K/HV/2018/1/2/0/'],
+            'tiles/22/K/HV/2018/1/7/': ['tiles/22/K/HV/2018/1/7/0/']},
+        'sentinel-s2-l2a': {
+            'tiles/22/K/HV/2018/': ['tiles/22/K/HV/2018/1/'],
+            'tiles/22/K/HV/2018/1/': ['tiles/22/K/HV/2018/1/7/'],
+            'tiles/22/K/HV/2018/1/7/': ['tiles/22/K/HV/2018/1/7/0/']}}
+
+    list_directory.side_effect = lambda bucket, prefix, **kwargs: listing[bucket].get(prefix, [])
+
+    results = search.sentinel2(
+        22, "K", "HV", levels=['l1c', 'l2a'],
+        start_date=datetime(2018, 1, 1), end_date=datetime(2018, 1, 31))
+    assert len(results) == 2
+    assert list(results[0]['levels']) == ['l1c']
+    assert sorted(results[1]['levels']) == ['l1c', 'l2a']
+    assert results[1]['acquisition_date'] == '20180107'
+    assert results[1]['levels']['l2a']['browseURL']
+    assert list_directory.call_count == 7
+
+    with pytest.raises(Exception):
+        search.sentinel2(22, "K", "HV", levels=['l1c', 'l3'])
+
+
+def test_s2_join_complete_level():
+    """Should take the satellite of a joint record from a level with its tileInfo.json."""
+    path = 'tiles/22/K/HV/2018/1/7/0/'
+    failed = dict(
+        search.get_s2_info('sentinel-s2-l1c', path), status='error', error={'type': 'ClientError'})
+    complete = dict(
+        search.get_s2_info('sentinel-s2-l2a', path), sat='S2B', scene_id='S2B_tile_20180107_22KHV_0')
+
+    for scenes in [[('l1c', failed), ('l2a', complete)], [('l2a', complete), ('l1c', failed)]]:
+        record = search._sentinel2_join(scenes)[0]
+        assert record['sat'] == 'S2B'
+        assert record['scene_id'] == 'S2B_tile_20180107_22KHV_0'
+        assert record['levels']['l1c']['status'] == 'error'
+        assert list(record)[0] == 'sat'
+
+
+@patch('aws_sat_api.aws.get_object')
+@patch('aws_sat_api.aws.list_directory')
+def test_landsat_timeout(list_directory, get_object):
+    """Should return partial results once the timeout is reached."""
+    list_directory.side_effect = [
+        ['c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/'],
+        ['L8/178/119/LC81781192017016LGN00/']]
+
+    path = os.path.join(os.path.dirname(__file__), f'fixtures/LC08_L1GT_178119_20180103_20180103_01_RT_MTL.json')
+    with open(path, 'rb') as f:
+        mtl = f.read()
+
+    def slow_get_object(bucket, key, **kwargs):
+        if 'LC81781192017016LGN00' in key:
+            time.sleep(1)
+        return mtl
+
+    get_object.side_effect = slow_get_object
+
+    results = search.landsat(178, 119, full=True, timeout=0.2)
+    assert len(results) == 2
+    assert 'status' not in results[0]
+    assert results[0]['geometry']
+    assert results[1]['status'] == 'timeout'
+    assert 'geometry' not in results[1]
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_cbers_timeout_listing(list_directory):
+    """Should bound the CBERS listing by the timeout."""
+    def slow_list_directory(bucket, prefix, **kwargs):
+        time.sleep(0.5)
+        return ['CBERS4/MUX/217/063/CBERS_4_MUX_20160416_217_063_L2/']
+
+    list_directory.side_effect = slow_list_directory
+
+    start = time.monotonic()
+    results = search.cbers(217, 63, timeout=0.1)
+    assert time.monotonic() - start < 0.4
+    assert results == []
+    assert results.partial
+
+
+def test_map_deadline_passed():
+    """Should not submit anything once the deadline has passed."""
+    func = Mock()
+    deadline = search._deadline(0)
+    with search._pool(2, deadline) as executor:
+        assert search._map(executor, func, [1, 2], deadline=deadline, on_timeout=str) == ['1', '2']
+        assert not deadline.dropped
+        assert search._map(executor, func, [], deadline=deadline) == []
+        assert not deadline.dropped
+        assert search._map(executor, func, [1, 2], deadline=deadline) == []
+        assert deadline.dropped
+    assert not func.called
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_landsat_timeout_listing(list_directory):
+    """Should flag results partial when a listing is dropped."""
+    def slow_list_directory(bucket, prefix, **kwargs):
+        if prefix.startswith('L8'):
+            time.sleep(0.5)
+            return ['L8/178/119/LC81781192017016LGN00/']
+        return ['c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/']
+
+    list_directory.side_effect = slow_list_directory
+
+    results = search.landsat(178, 119, timeout=0.1)
+    assert [r['scene_id'] for r in results] == ['LC08_L1GT_178119_20180103_20180103_01_RT']
+    assert results.partial
+
+    results = search.landsat(178, 119)
+    assert len(results) == 2
+    assert not results.partial
+
+    tiles = {'landsat': [{'path': '178', 'row': '119'}]}
+    results = list(search.search(
+        ['landsat'], tiles, start_date=datetime(2017, 1, 1, tzinfo=timezone.utc),
+        end_date=datetime(2018, 12, 31, tzinfo=timezone.utc), timeout=0.1))
+    # The substream ends on the same deadline: cut by the merge, or flagged partial.
+    tile = {'path': '178', 'row': '119'}
+    assert results[0] in [
+        ('landsat', {'tile': tile, 'status': 'timeout'}), ('landsat', {'tile': tile, 'status': 'partial'})]
+    assert len(results) == (1 if results[0][1]['status'] == 'timeout' else 2)
+
+    partial = search.SearchResults([{'scene_id': 'a', 'acquisition_date': '20180103'}], partial=True)
+    with patch('aws_sat_api.search.landsat', return_value=partial):
+        results = list(search.search(
+            ['landsat'], tiles, start_date=datetime(2017, 1, 1, tzinfo=timezone.utc),
+            end_date=datetime(2018, 12, 31, tzinfo=timezone.utc)))
+    assert results == [
+        ('landsat', {'tile': {'path': '178', 'row': '119'}, 'status': 'partial'}),
+        ('landsat', {'scene_id': 'a', 'acquisition_date': '20180103'})]
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_landsat_request_budget(get_client, monkeypatch):
+    """Should stop sending requests once the budget is used up."""
+    client = get_client.return_value
+    client.get_paginator.return_value.paginate.side_effect = [
+        [{'CommonPrefixes': [{'Prefix': 'c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/'}]}],
+        [{'CommonPrefixes': [{'Prefix': 'c1/L8/178/119/LC08_L1GT_178119_20180119_20180119_01_RT/'}]}]]
+
+    path = os.path.join(os.path.dirname(__file__), f'fixtures/LC08_L1GT_178119_20180103_20180103_01_RT_MTL.json')
+    with open(path, 'rb') as f:
+        client.get_object.side_effect = lambda **kwargs: {'Body': BytesIO(f.read())}
+        monkeypatch.setattr(aws, 'request_budget', RequestBudget(3))
+        results = search.landsat(178, 119, full=True)
+
+    assert len(results) == 2
+    assert sorted(r.get('status', 'ok') for r in results) == ['budget', 'ok']
+    assert client.get_object.call_count == 1
+    assert aws.request_budget.exhausted
+
+    # Listings over the budget are dropped.
+    monkeypatch.setattr(aws, 'request_budget', RequestBudget(0))
+    assert search.landsat(178, 119, full=True) == []
+
+
+@patch('aws_sat_api.aws._list_directory')
+def test_s2_request_budget(_list_directory):
+    """Should flag listings cut by the budget as partial and never seal them."""
+    path = os.path.join(os.path.dirname(__file__), 'fixtures/s2_search_2017.json')
+    with open(path, 'r') as f:
+        fixt = json.loads(f.read())
+
+    listing = s2_listing(fixt)
+
+    def _list(bucket, prefix, **kwargs):
+        aws._throttle()
+        return listing(bucket, prefix)
+
+    _list_directory.side_effect = _list
+    cache = MemoryCache()
+    start_date = datetime(2017, 1, 1)
+    end_date = datetime(2017, 5, 15)
+
+    results = search.sentinel2(
+        22, "K", "HV", start_date=start_date, end_date=end_date, cache=cache, max_requests=5)
+    assert results.partial
+    assert len(results) < 22
+    assert cache.get('sentinel2:22KHV:l1c:0:2017') is None
+    assert aws.current_budget() is None
+
+    results = search.sentinel2(22, "K", "HV", start_date=start_date, end_date=end_date, cache=cache)
+    assert not results.partial
+    assert results == fixt["results"]
+
+    tiles = {'sentinel2': [{'utm': 22, 'lat': 'K', 'grid': 'HV'}]}
+    results = list(search.search(
+        ['sentinel2'], tiles, start_date=datetime(2016, 1, 1, tzinfo=timezone.utc),
+        end_date=datetime(2017, 5, 15, tzinfo=timezone.utc), max_requests=3))
+    assert ('sentinel2', {'tile': tiles['sentinel2'][0], 'status': 'partial'}) in results
+
+
+def test_plan_fields():
+    """Should pick the cheapest source for each field."""
+    assert search.plan_fields('sentinel2', ['acquisition_date', 'geometry']) == {
+        'acquisition_date': 'key', 'geometry': 'grid'}
+    assert search.plan_fields('landsat', ['geometry']) == {'geometry': 'metadata'}
+    assert search.plan_fields('landsat', ['geometry'], index=True) == {'geometry': 'index'}
+    assert search.plan_fields('landsat', ['sun_azimuth'], index=True) == {'sun_azimuth': 'metadata'}
+
+    with pytest.raises(ValueError):
+        search.plan_fields('cbers', ['tile'])
+
+
+@patch('aws_sat_api.aws.get_object')
+@patch('aws_sat_api.aws.list_directory')
+def test_s2_fields_geometry(list_directory, get_object):
+    """Should not fetch tileInfo.json for geometry."""
+    path = os.path.join(os.path.dirname(__file__), f'fixtures/s2_search_2017.json')
+    with open(path, 'r') as f:
+        fixt = json.loads(f.read())
+
+    list_directory.side_effect = s2_listing(fixt)
+
+    results = search.sentinel2(
+        22, "K", "HV", start_date=datetime(2017, 1, 1), end_date=datetime(2017, 5, 15),
+        fields=['acquisition_date', 'geometry'])
+    assert len(results) == 22
+    assert sorted(results[0]) == ['acquisition_date', 'geometry']
+    assert results[0]['geometry']['coordinates'][0][0] == [799980.0, 7500000.0]
+    get_object.assert_not_called()
+
+
+@patch('aws_sat_api.aws.get_object')
+@patch('aws_sat_api.aws.list_directory')
+def test_landsat_fields_metadata(list_directory, get_object):
+    """Should fetch the MTL for sun angles."""
+    path = os.path.join(os.path.dirname(__file__), f'fixtures/LC08_L1GT_178119_20180103_20180103_01_RT_MTL.json')
+    with open(path, 'rb') as f:
+        get_object.return_value = f.read()
+
+    list_directory.side_effect = [
+        ['c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/'], []]
+
+    results = search.landsat(178, 119, fields=['scene_id', 'sun_elevation'])
+    assert results == [{
+        'scene_id': 'LC08_L1GT_178119_20180103_20180103_01_RT', 'sun_elevation': 22.51092792}]
+
+
+@patch('aws_sat_api.aws.get_object')
+def test_get_scenes(get_object):
+    """Should fetch metadata of mixed scene ids without listing."""
+    fixtures = os.path.join(os.path.dirname(__file__), 'fixtures')
+    content = {}
+    for name in ['tileInfo.json', 'LC81782462014232LGN00_MTL.json', 'CBERS_4_MUX_20160416_217_063_L2_BAND6.xml']:
+        with open(os.path.join(fixtures, name), 'rb') as f:
+            content[name] = f.read()
+
+    def _get_object(bucket, key, **kwargs):
+        return content[[n for n in content if key.endswith(n.split('_')[-1])][0]]
+
+    get_object.side_effect = _get_object
+
+    scene_ids = [
+        'S2A_tile_20171009_38SNG_1',
+        'LC81782462014232LGN00',
+        'CBERS_4_MUX_20160416_217_063_L2',
+        'invalid']
+    results = search.get_scenes(scene_ids)
+
+    assert [r['scene_id'] for r in results] == [
+        'S2B_tile_20171009_38SNG_1', 'LC81782462014232LGN00', 'CBERS_4_MUX_20160416_217_063_L2', 'invalid']
+    assert results[0]['cloud_coverage'] == 5.01
+    assert results[0]['path'] == 'tiles/38/S/NG/2017/10/9/1/'
+    assert results[1]['cloud_coverage'] == 38.13
+    assert results[2]['cloud_coverage'] == 10.0
+    assert results[3]['status'] == 'error'
+    assert results[3]['error']['type'] == 'InvalidLandsatSceneId'
+    assert get_object.call_count == 3
+    assert 'sentinel-s2-l1c' in [c[0][0] for c in get_object.call_args_list]
+
+
+@patch('aws_sat_api.aws.get_object')
+def test_get_scenes_timeout(get_object):
+    """Should keep the Sentinel-2 level of the scenes not fetched in time."""
+    get_object.side_effect = lambda *args, **kwargs: time.sleep(0.5)
+
+    with patch('aws_sat_api.search.get_s2_info', wraps=search.get_s2_info) as get_s2_info:
+        results = search.get_scenes(['S2A_tile_20171009_38SNG_1'], level='l2a', timeout=0.1)
+
+    assert results[0]['status'] == 'timeout'
+    assert results[0]['path'] == 'tiles/38/S/NG/2017/10/9/1/'
+    assert [c[0][0] for c in get_s2_info.call_args_list] == ['sentinel-s2-l2a', 'sentinel-s2-l2a']
+
+
+@patch('aws_sat_api.aws.get_object')
+def test_get_scenes_sat(get_object):
+    """Should keep the satellite of the scene id when tileInfo.json is not read."""
+    get_object.side_effect = Exception('boom')
+
+    results = search.get_scenes(['S2B_tile_20171009_38SNG_1'], full=False)
+    assert results[0]['sat'] == 'S2B'
+    assert results[0]['scene_id'] == 'S2B_tile_20171009_38SNG_1'
+    assert 'status' not in results[0]
+
+    results = search.get_scenes(['S2B_tile_20171009_38SNG_1'])
+    assert results[0]['sat'] == 'S2B'
+    assert results[0]['scene_id'] == 'S2B_tile_20171009_38SNG_1'
+    assert results[0]['status'] == 'error'
+
+    get_object.side_effect = lambda *args, **kwargs: time.sleep(0.5)
+    results = search.get_scenes(['S2B_tile_20171009_38SNG_1'], timeout=0.1)
+    assert results[0]['sat'] == 'S2B'
+    assert results[0]['status'] == 'timeout'
+
+
+@patch('aws_sat_api.aws.prefetch')
+@patch('aws_sat_api.aws.get_object')
+def test_get_scenes_prefetch(get_object, prefetch):
+    """Should look up the scenes metadata in one batch."""
+    get_object.side_effect = Exception('boom')
+
+    search.get_scenes([
+        'S2B_tile_20171009_38SNG_1',
+        'LC81782462014232LGN00',
+        'CBERS_4_MUX_20160416_217_063_L2',
+        'invalid'], level='l2a')
+    assert list(prefetch.call_args[0][0]) == [
+        'get:sentinel-s2-l2a/tiles/38/S/NG/2017/10/9/1/tileInfo.json',
+        'get:landsat-pds/L8/178/246/LC81782462014232LGN00/LC81782462014232LGN00_MTL.json',
+        'get:cbers-meta-pds/CBERS4/MUX/217/063/CBERS_4_MUX_20160416_217_063_L2/'
+        'CBERS_4_MUX_20160416_217_063_L2_BAND6.xml']
+
+
+def test_pool_shared_executor(monkeypatch):
+    """Should reuse the shared executor without shutting it down."""
+    executor = futures.ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(search, 'executor', executor)
+    with search._pool(10) as pool:
+        assert pool is executor
+    assert executor.submit(int, '1').result() == 1
+    executor.shutdown()
+
+
+@patch('aws_sat_api.search.cbers')
+@patch('aws_sat_api.search.sentinel2')
+@patch('aws_sat_api.search.landsat')
+def test_search_merged(landsat, sentinel2, cbers):
+    """Should merge the sensor searches in acquisition date order."""
+    landsat.return_value = [
+        {'scene_id': 'l8-2', 'acquisition_date': '20170220'},
+        {'scene_id': 'l8-1', 'acquisition_date': '20160101'},
+        {'scene_id': 'l8-0', 'acquisition_date': '20140101'}]
+    cbers.return_value = [{'scene_id': 'cb-1', 'acquisition_date': '20161201'}]
+
+    def _sentinel2(utm, lat, grid, start_date=None, end_date=None, **kwargs):
+        return [{'scene_id': f's2-{start_date.year}', 'acquisition_date': f'{start_date.year}0715'}]
+
+    sentinel2.side_effect = _sentinel2
+
+    tiles = {
+        'landsat': [{'path': '178', 'row': '119'}],
+        'sentinel2': [{'utm': 22, 'lat': 'K', 'grid': 'HV'}],
+        'cbers': [{'path': '217', 'row': '063'}]}
+    results = list(search.search(
+        ['landsat', 'sentinel2', 'cbers'], tiles,
+        start_date=datetime(2015, 6, 1, tzinfo=timezone.utc),
+        end_date=datetime(2017, 12, 31, tzinfo=timezone.utc)))
+
+    assert [r['scene_id'] for _, r in results] == [
+        's2-2015', 'l8-1', 's2-2016', 'cb-1', 'l8-2', 's2-2017']
+    assert [s for s, _ in results] == [
+        'sentinel2', 'landsat', 'sentinel2', 'cbers', 'landsat', 'sentinel2']
+    assert sentinel2.call_count == 3
+    assert sentinel2.call_args_list[0][1]['start_date'] == datetime(2015, 6, 1, tzinfo=timezone.utc)
+
+    # Invalid arguments raise on call, before the results are iterated.
+    with pytest.raises(ValueError):
+        search.search(['modis'], {})
+    with pytest.raises(ValueError):
+        search.search(['landsat'], {}, start_date=datetime(2018, 1, 1), end_date=datetime(2017, 1, 1))
+
+
+@patch('aws_sat_api.search.sentinel2')
+@patch('aws_sat_api.search.landsat')
+def test_search_error(landsat, sentinel2):
+    """Should report a failed search and go on with the others."""
+    landsat.side_effect = ConnectionError('reset')
+    sentinel2.return_value = [{'scene_id': 's2', 'acquisition_date': '20170715'}]
+
+    tiles = {
+        'landsat': [{'path': '178', 'row': '119'}],
+        'sentinel2': [{'utm': 22, 'lat': 'K', 'grid': 'HV'}]}
+    results = list(search.search(
+        ['landsat', 'sentinel2'], tiles,
+        start_date=datetime(2017, 1, 1, tzinfo=timezone.utc),
+        end_date=datetime(2017, 12, 31, tzinfo=timezone.utc)))
+
+    assert len(results) == 2
+    sensor, error = results[0]
+    assert sensor == 'landsat'
+    assert error['status'] == 'error'
+    assert error['tile'] == {'path': '178', 'row': '119'}
+    assert error['error']['type'] == 'ConnectionError'
+    assert results[1] == ('sentinel2', {'scene_id': 's2', 'acquisition_date': '20170715'})
+
+
+@patch('aws_sat_api.search.sentinel2')
+def test_search_incremental(sentinel2):
+    """Should yield the oldest scenes before the recent searches complete."""
+    release = threading.Event()
+
+    def _sentinel2(utm, lat, grid, start_date=None, end_date=None, **kwargs):
+        if start_date.year == 2017:
+            assert release.wait(5)
+        return [{'scene_id': f's2-{start_date.year}', 'acquisition_date': f'{start_date.year}0315'}]
+
+    sentinel2.side_effect = _sentinel2
+
+    stream = search.search(
+        ['sentinel2'], {'sentinel2': [{'utm': 22, 'lat': 'K', 'grid': 'HV'}]},
+        start_date=datetime(2016, 1, 1, tzinfo=timezone.utc),
+        end_date=datetime(2017, 12, 31, tzinfo=timezone.utc))
+    assert next(stream)[1]['scene_id'] == 's2-2016'
+    release.set()
+    assert next(stream)[1]['scene_id'] == 's2-2017'
+    assert next(stream, None) is None
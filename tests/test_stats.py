@@ -0,0 +1,96 @@
+"""tests aws_sat_api.stats"""
+
+import json
+
+import pytest
+from click.testing import CliRunner
+
+np = pytest.importorskip('numpy')
+
+from aws_sat_api import stats  # noqa
+from aws_sat_api.scripts.cli import awssat  # noqa
+
+
+def s2(date, cloud, grid='HU', num=0):
+    return {
+        'utm_zone': '22', 'latitude_band': 'K', 'grid_square': grid,
+        'num': str(num), 'acquisition_date': date, 'cloud_coverage': cloud}
+
+
+records = [
+    s2('20170105', 5),
+    s2('20170105', 50, num=1),
+    s2('20170115', 80),
+    s2('20170125', 2),
+    s2('20170204', 60),
+    s2('20170224', 0),
+    s2('20170110', None, grid='HV'),
+    {'path': '178', 'row': '119', 'acquisition_date': '20170101', 'satellite': 'L8', 'sensor': 'C'},
+    {'path': '178', 'row': '119', 'acquisition_date': '20170117', 'satellite': 'L8', 'sensor': 'C'},
+    {'path': '217', 'row': '063', 'acquisition_date': '20170101', 'satellite': 'CBERS', 'sensor': 'MUX'}]
+
+
+def test_load():
+    """Should load records in arrays."""
+    table = stats.load(records)
+    assert list(table.tiles) == [
+        'cbers:MUX/217/063', 'landsat:178/119', 'sentinel2:22KHU', 'sentinel2:22KHV']
+    assert table.date[0] == np.datetime64('2017-01-05')
+    assert np.isnan(table.cloud[6])
+
+
+def test_load_joint():
+    """Should read the cloud coverage of joint records from their levels."""
+    joint = {k: v for k, v in s2('20170105', None).items() if k != 'cloud_coverage'}
+    joint['levels'] = {'l1c': {'status': 'error'}, 'l2a': {'cloud_coverage': 12.5}}
+    table = stats.load([joint, dict(joint, levels={'l1c': {}})])
+    assert list(table.tiles) == ['sentinel2:22KHU']
+    assert table.cloud[0] == 12.5
+    assert np.isnan(table.cloud[1])
+
+
+def test_revisit():
+    """Should compute revisit intervals per tile (same day scenes count once)."""
+    visits = stats.revisit(stats.load(records))
+    assert list(visits['count']) == [1, 2, 5, 1]
+    assert visits['mean'][2] == 12.5
+    assert visits['median'][2] == 10
+    assert visits['mean'][1] == 16
+    assert np.isnan(visits['mean'][0])
+    assert visits['first'][2] == np.datetime64('2017-01-05')
+    assert visits['last'][2] == np.datetime64('2017-02-24')
+
+
+def test_monthly_cloud():
+    """Should compute the monthly cloud distribution."""
+    monthly = stats.monthly_cloud(stats.load(records))
+    assert monthly['count'][2, 0] == 4
+    assert monthly['mean'][2, 0] == pytest.approx(34.25)
+    assert monthly['p50'][2, 0] == 27.5
+    assert monthly['p25'][2, 1] == 15
+    assert monthly['count'][3].sum() == 0
+    assert np.isnan(monthly['mean'][3, 0])
+
+
+def test_cloud_free_gap():
+    """Should compute the longest gap between cloud free scenes."""
+    gaps = stats.cloud_free_gap(stats.load(records), max_cloud=10)
+    assert gaps[2] == 30
+    assert np.isnan(gaps[3])
+
+
+def test_empty():
+    """Should handle empty results."""
+    assert list(stats.summary(stats.load([]))) == []
+
+
+def test_cli():
+    """Should output per-tile JSON statistics."""
+    data = '\n'.join(json.dumps(r) for r in records)
+    result = CliRunner().invoke(awssat, ['stats'], input=data)
+    assert not result.exception
+    tiles = [json.loads(line) for line in result.output.splitlines()]
+    assert tiles[2]['tile'] == 'sentinel2:22KHU'
+    assert tiles[2]['acquisitions'] == 5
+    assert tiles[2]['longest_cloud_free_gap'] == 30
+    assert tiles[3]['revisit_mean'] is None
@@ -0,0 +1,76 @@
+"""tests aws_sat_api.tracing"""
+
+import json
+from datetime import datetime
+
+import pytest
+from mock import patch
+from click.testing import CliRunner
+
+from aws_sat_api import search, tracing
+from aws_sat_api.scripts.cli import awssat
+
+
+def test_span_disabled():
+    """Should not record anything without tracer."""
+    assert not tracing.enabled()
+    with tracing.span('test', a=1) as span:
+        assert span is None
+
+
+def test_span_error():
+    """Should record errors and re-raise them."""
+    spans = []
+    with tracing.tracing(callback=spans.append):
+        with pytest.raises(ValueError):
+            with tracing.span('test'):
+                raise ValueError('boom')
+
+    assert spans[0]['args']['error'] == 'ValueError: boom'
+    assert not tracing.enabled()
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_trace_sentinel2(get_client, tmpdir):
+    """Should record search stages and S3 calls."""
+    listing = {
+        'tiles/22/K/HV/2017/': ['tiles/22/K/HV/2017/1/'],
+        'tiles/22/K/HV/2017/1/': ['tiles/22/K/HV/2017/1/12/'],
+        'tiles/22/K/HV/2017/1/12/': ['tiles/22/K/HV/2017/1/12/0/']}
+
+    def paginate(Prefix, **kwargs):
+        return [{
+            'CommonPrefixes': [{'Prefix': p} for p in listing.get(Prefix, [])],
+            'ResponseMetadata': {'RetryAttempts': 1 if Prefix.endswith('12/') else 0}}]
+
+    get_client.return_value.get_paginator.return_value.paginate.side_effect = paginate
+
+    path = str(tmpdir.join('trace.json'))
+    with tracing.tracing(path=path) as tracer:
+        search.sentinel2(22, 'K', 'HV', start_date=datetime(2017, 1, 1), end_date=datetime(2017, 1, 31))
+
+    names = [s['name'] for s in tracer.spans]
+    for name in ['sentinel2', 'sentinel2.years', 'sentinel2.months', 'sentinel2.days', 'sentinel2.info']:
+        assert name in names
+    lists = [s for s in tracer.spans if s['name'] == 's3.list']
+    assert len(lists) == 3
+    assert [s['args']['retries'] for s in lists if s['args']['prefix'].endswith('12/')] == [1]
+
+    with open(path) as f:
+        trace = json.load(f)
+    events = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+    assert len(events) == len(tracer.spans)
+    assert all(e['dur'] >= 0 for e in events)
+    assert any(e['ph'] == 'M' for e in trace['traceEvents'])
+
+
+@patch('aws_sat_api.aws.list_directory')
+def test_cli_trace(list_directory, tmpdir):
+    """Should write trace file."""
+    list_directory.return_value = []
+    path = str(tmpdir.join('trace.json'))
+    result = CliRunner().invoke(awssat, ['--trace', path, 'cbers', '-p', '217', '-r', '063'])
+    assert result.exit_code == 0
+    with open(path) as f:
+        names = [e['name'] for e in json.load(f)['traceEvents']]
+    assert 'cbers.list' in names
@@ -0,0 +1,80 @@
+"""tests aws_sat_api.unsigned"""
+
+import pytest
+
+from mock import patch, MagicMock
+from botocore.exceptions import ClientError
+
+from aws_sat_api import aws, unsigned
+
+list_page1 = b"""<?xml version="1.0" encoding="UTF-8"?>
+<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+<Name>landsat-pds</Name><Prefix>c1/L8/178/119/</Prefix><KeyCount>1</KeyCount>
+<MaxKeys>1</MaxKeys><Delimiter>/</Delimiter><IsTruncated>true</IsTruncated>
+<NextContinuationToken>token</NextContinuationToken>
+<CommonPrefixes><Prefix>c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/</Prefix></CommonPrefixes>
+</ListBucketResult>"""
+
+list_page2 = b"""<?xml version="1.0" encoding="UTF-8"?>
+<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+<Name>landsat-pds</Name><Prefix>c1/L8/178/119/</Prefix><KeyCount>1</KeyCount>
+<MaxKeys>1</MaxKeys><Delimiter>/</Delimiter><IsTruncated>false</IsTruncated>
+<CommonPrefixes><Prefix>c1/L8/178/119/LC08_L1GT_178119_20180119_20180119_01_RT/</Prefix></CommonPrefixes>
+</ListBucketResult>"""
+
+error = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Error><Code>NoSuchKey</Code><Message>The specified key does not exist.</Message></Error>"""
+
+
+def response(data=b'', status=200, headers=None):
+    return MagicMock(status=status, reason='', data=data, headers=headers or {})
+
+
+@patch('aws_sat_api.unsigned.http')
+def test_list_directory_valid(http):
+    """Should follow continuation tokens and return the prefixes
+    """
+
+    http.request.side_effect = [response(list_page1), response(list_page2)]
+
+    expected = [
+        'c1/L8/178/119/LC08_L1GT_178119_20180103_20180103_01_RT/',
+        'c1/L8/178/119/LC08_L1GT_178119_20180119_20180119_01_RT/']
+
+    assert unsigned.list_directory('landsat-pds', 'c1/L8/178/119/', 'us-west-2') == expected
+    assert http.request.call_args_list[0][0] == ('GET', 'https://landsat-pds.s3.us-west-2.amazonaws.com/')
+    assert http.request.call_args_list[1][1]['fields']['continuation-token'] == 'token'
+
+
+@patch('aws_sat_api.aws.get_bucket_region')
+@patch('aws_sat_api.unsigned.http')
+def test_get_object_valid(http, get_bucket_region):
+    """Should work as expected
+    """
+
+    get_bucket_region.return_value = 'us-west-2'
+    http.request.side_effect = [response(b'0101010')]
+
+    assert aws.get_object('landsat-pds', 'c1/L8/178/119/a_MTL.json', anonymous=True) == b'0101010'
+    assert http.request.call_args[0] == (
+        'GET', 'https://landsat-pds.s3.us-west-2.amazonaws.com/c1/L8/178/119/a_MTL.json')
+
+
+@patch('aws_sat_api.unsigned.http')
+def test_get_object_error(http):
+    """Should raise a 'ClientError' error
+    """
+
+    http.request.side_effect = [response(error, status=404)]
+
+    with pytest.raises(ClientError) as excinfo:
+        unsigned.get_object('landsat-pds', 'c1/L8/178/119/a_MTL.json', 'us-west-2')
+    assert excinfo.value.response['Error']['Code'] == 'NoSuchKey'
+
+
+def test_requester_pays_anonymous():
+    """Should raise a 'ValueError' error
+    """
+
+    with pytest.raises(ValueError):
+        aws.list_directory('sentinel-s2-l1c', 'tiles/', request_pays=True, anonymous=True)
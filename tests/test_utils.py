@@ -1,9 +1,12 @@
 """tests aws_sat_api.utils"""
 
+import os
+
 import pytest
 
 from aws_sat_api import utils
-from aws_sat_api.errors import (InvalidLandsatSceneId, InvalidCBERSSceneId)
+from aws_sat_api.errors import (
+    InvalidLandsatSceneId, InvalidSentinelSceneId, InvalidCBERSSceneId)
 
 
 def test_landsat_id_pre_invalid():
@@ -121,3 +124,50 @@ def test_zeroPad_valid():
 
 def test_zeroPad_validString():
     assert utils.zeroPad('3', 2) == '03'
+
+
+def test_cbers_parse_metadata():
+    """
+    Should work as expected (parse cbers metadata XML)
+    """
+
+    path = os.path.join(os.path.dirname(__file__), 'fixtures/CBERS_4_MUX_20160416_217_063_L2_BAND6.xml')
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    meta = utils.cbers_parse_metadata(content)
+    assert meta['cloud_coverage'] == 10.0
+    assert meta['sun_azimuth'] == 60.8923
+    assert meta['sun_elevation'] == 55.4417
+    assert meta['ul_lat'] == -5.13718
+    assert meta['ll_lon'] == -39.40582
+    assert len(meta) == len(utils.CBERS_METADATA_FIELDS)
+
+
+def test_sentinel2_id_invalid():
+    """
+    Should raise an error with invalid sceneid
+    """
+
+    scene = 'S2A_tile_20171009_38SNG'
+    with pytest.raises(InvalidSentinelSceneId):
+        utils.sentinel2_parse_scene_id(scene)
+
+
+def test_sentinel2_id_valid():
+    """
+    Should work as expected (parse sentinel-2 scene id)
+    """
+
+    scene = 'S2B_tile_20170112_07KHV_0'
+    expected_content = {
+        'sat': 'S2B',
+        'acquisition_date': '20170112',
+        'utm_zone': '07',
+        'latitude_band': 'K',
+        'grid_square': 'HV',
+        'num': '0',
+        'key': 'tiles/7/K/HV/2017/1/12/0/',
+        'scene_id': 'S2B_tile_20170112_07KHV_0'}
+
+    assert utils.sentinel2_parse_scene_id(scene) == expected_content
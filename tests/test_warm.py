@@ -0,0 +1,100 @@
+"""tests aws_sat_api.warm"""
+
+import json
+
+import pytest
+from mock import patch
+from click.testing import CliRunner
+
+from aws_sat_api import aws, warm
+from aws_sat_api.cache import MemoryCache
+from aws_sat_api.scripts.cli import awssat
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(aws, 'cache', None)
+    monkeypatch.setattr(aws, 'rate_limiter', None)
+
+
+def test_parse_tile():
+    """Should parse tile names."""
+    assert warm.parse_tile('landsat:178/119') == ('landsat', {'path': '178', 'row': '119'})
+    assert warm.parse_tile('sentinel2:22KHV') == ('sentinel2', {'utm': '22', 'lat': 'K', 'grid': 'HV'})
+    assert warm.parse_tile('cbers:MUX/217/063') == (
+        'cbers', {'sensor': 'MUX', 'path': '217', 'row': '063'})
+    with pytest.raises(ValueError):
+        warm.parse_tile('modis:h12v04')
+    with pytest.raises(ValueError):
+        warm.parse_tile('sentinel2:178/119')
+
+
+def test_read_aoi():
+    """Should skip blank and comment lines."""
+    assert warm.read_aoi(['# tiles\n', 'landsat:178/119\n', '\n']) == ['landsat:178/119']
+
+
+@patch('aws_sat_api.aws.get_client')
+def test_warm(get_client, monkeypatch):
+    """Should fill the cache and report requests and cache hits."""
+    get_client.return_value.get_paginator.return_value.paginate.return_value = [
+        {'CommonPrefixes': [{'Prefix': 'CBERS4/MUX/217/063/CBERS_4_MUX_20160416_217_063_L2/'}]}]
+
+    with pytest.raises(ValueError):
+        list(warm.warm(['cbers:MUX/217/063']))
+
+    monkeypatch.setattr(aws, 'cache', MemoryCache())
+    progress = list(warm.warm(['cbers:MUX/217/063'], full=False, rate=100))
+    assert progress == [{
+        'tile': 'cbers:MUX/217/063', 'done': 1, 'total': 1, 'scenes': 1,
+        'requests': 1, 'cache_hits': 0}]
+    assert aws.rate_limiter is None
+
+    progress = list(warm.warm(['cbers:MUX/217/063'], full=False))
+    assert progress[0]['requests'] == 0
+    assert progress[0]['cache_hits'] == 1
+
+
+@patch('aws_sat_api.search.landsat')
+def test_warm_rate_limiter(landsat, monkeypatch):
+    """Should restore the rate limiter when closed early or failing."""
+    landsat.return_value = []
+    limiter = object()
+    monkeypatch.setattr(aws, 'cache', MemoryCache())
+    monkeypatch.setattr(aws, 'rate_limiter', limiter)
+
+    progress = warm.warm(['landsat:178/119', 'landsat:178/120'], concurrency=1, rate=100)
+    next(progress)
+    assert aws.rate_limiter is not limiter
+    progress.close()
+    assert aws.rate_limiter is limiter
+
+    with patch('aws_sat_api.warm.tracing.tracing', side_effect=RuntimeError('failed')):
+        with pytest.raises(RuntimeError):
+            list(warm.warm(['landsat:178/119'], rate=100))
+    assert aws.rate_limiter is limiter
+
+
+@patch('aws_sat_api.search.landsat')
+def test_warm_errors(landsat, monkeypatch):
+    """Should report failed tiles and continue."""
+    landsat.side_effect = [RuntimeError('failed'), []]
+    monkeypatch.setattr(aws, 'cache', MemoryCache())
+    progress = list(warm.warm(['landsat:178/119', 'landsat:178/120'], concurrency=1))
+    assert progress[0]['error'] == 'RuntimeError: failed'
+    assert progress[1]['scenes'] == 0
+    assert landsat.call_args[1]['cache'] is aws.cache
+
+
+@patch('aws_sat_api.search.sentinel2')
+def test_warm_cli(sentinel2):
+    """Should print progress."""
+    sentinel2.return_value = [{}, {}]
+    result = CliRunner().invoke(awssat, ['warm'], input='sentinel2:22KHV\n')
+    assert not result.exception
+    lines = result.stderr.splitlines()
+    assert 'memory:// cache is lost on exit' in lines[0]
+    assert json.loads(lines[1])['scenes'] == 2
+
+    result = CliRunner().invoke(awssat, ['warm', '--cache', 'ftp://host'], input='sentinel2:22KHV\n')
+    assert result.exit_code == 1